@@ -0,0 +1,95 @@
+# Upload of finished samples in a background thread, while the next sample is computed.
+import logging
+import queue
+import threading
+from typing import Callable
+
+from bedboss.const import PKG_NAME, UPLOAD_QUEUE_DEPTH
+from bedboss.models import UploadResult
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# marks the end of the upload queue
+_STOP = None
+
+
+class BackgroundUploader:
+    """
+    Run uploads of finished samples (database, s3, qdrant) one at a time in a background thread.
+
+    At most `depth` samples wait for upload; when the queue is full, `submit` blocks until
+    the current upload finishes, so compute can't run far ahead of uploads. Results are
+    collected with `poll` and `close` in the calling thread, e.g. to update the Skipper
+    and sample statuses.
+    """
+
+    def __init__(self, depth: int = UPLOAD_QUEUE_DEPTH):
+        """
+        Args:
+            depth: Maximum number of samples waiting for upload.
+        """
+        self._queue = queue.Queue(maxsize=max(depth, 1))
+        self._results = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="bed-upload", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, key: str, bed_digest: str, upload: Callable[[], None]) -> None:
+        """
+        Add an upload to the queue. Blocks while the queue is full.
+
+        Args:
+            key: Identifier of the sample, returned with the result (e.g. sample name).
+            bed_digest: Bed file digest.
+            upload: Function that uploads the sample.
+        """
+        if self._closed:
+            raise RuntimeError("Uploader is closed")
+        self._queue.put((key, bed_digest, upload))
+
+    def poll(self) -> list[UploadResult]:
+        """
+        Get results of finished uploads, without waiting.
+
+        Returns:
+            List of upload results.
+        """
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def close(self) -> list[UploadResult]:
+        """
+        Wait for all queued uploads to finish, and stop the upload thread.
+
+        Returns:
+            Results of uploads that were not polled yet.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+        return self.poll()
+
+    def _run(self) -> None:
+        """
+        Upload queued samples until the queue is closed.
+        """
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            key, bed_digest, upload = item
+            try:
+                upload()
+                self._results.put(UploadResult(key=key, bed_digest=bed_digest))
+            except Exception as err:
+                _LOGGER.error(f"Upload of '{key}' ({bed_digest}) failed: {err}")
+                self._results.put(
+                    UploadResult(key=key, bed_digest=bed_digest, error=str(err))
+                )
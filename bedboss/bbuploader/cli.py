@@ -69,6 +69,24 @@ def upload_all(
     lite: bool = typer.Option(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
+    prefetch_window: int = typer.Option(
+        4,
+        help="Number of sample files downloaded ahead while the current sample is processed. 0 disables prefetching. [Default: 4]",
+    ),
+    workers: int = typer.Option(
+        1, help="Number of GSE projects processed at once. [Default: 1]"
+    ),
+    max_downloads: int = typer.Option(
+        4, help="Maximum number of downloads in flight across all workers. [Default: 4]"
+    ),
+    memory_limit: float = typer.Option(
+        None,
+        help="Memory limit in GB; new projects are not started while it's reached. [Default: None]",
+    ),
+    bulk_qdrant: bool = typer.Option(
+        False,
+        help="Index bed files in qdrant in large batches instead of one upsert per file. [Default: False]",
+    ),
 ):
     from .main import upload_all as upload_all_function
 
@@ -93,6 +111,11 @@ def upload_all(
         overwrite=overwrite,
         overwrite_bedset=overwrite_bedset,
         lite=lite,
+        prefetch_window=prefetch_window,
+        workers=workers,
+        max_downloads=max_downloads,
+        memory_limit=int(memory_limit * 1024**3) if memory_limit else None,
+        bulk_qdrant=bulk_qdrant,
     )
 
 
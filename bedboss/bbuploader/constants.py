@@ -1,9 +1,25 @@
 PKG_NAME = "bbuploader"
 
 FILE_FOLDER_NAME = "geo_files"
+WORKERS_FOLDER_NAME = "workers"
 
 DEFAULT_GEO_TAG = "samples"
 
+# number of status changes flushed to the database in one commit
+STATUS_COMMIT_BATCH_SIZE = 100
+
+# number of sample files downloaded ahead of processing
+PREFETCH_WINDOW = 4
+# maximum number of parallel downloads from one host
+PREFETCH_HOST_CONCURRENCY = 2
+# maximum size of prefetched files waiting for processing (bytes)
+PREFETCH_DISK_BUDGET = 1024 * 1024 * 1024
+
+# maximum number of downloads in flight across all concurrent upload workers
+MAX_PARALLEL_DOWNLOADS = 4
+# seconds between memory checks while the memory limit is reached
+MEMORY_POLL_INTERVAL = 5
+
 
 class STATUS:
     SUCCESS = "SUCCESS"
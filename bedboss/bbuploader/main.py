@@ -1,5 +1,6 @@
 import logging
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from importlib.metadata import version as _pkg_version
 from typing import Literal
 
@@ -11,13 +12,16 @@ from geniml.exceptions import GenimlBaseError
 from pephubclient import PEPHubClient
 from pephubclient.helpers import MessageHandler
 from pephubclient.models import SearchReturnModel
-from sqlalchemy import and_, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from bedboss.background_upload import BackgroundUploader
 from bedboss.bbuploader.constants import (
     DEFAULT_GEO_TAG,
     FILE_FOLDER_NAME,
+    MAX_PARALLEL_DOWNLOADS,
     PKG_NAME,
+    PREFETCH_WINDOW,
     STATUS,
 )
 from bedboss.bbuploader.metadata_extractor import find_assay, find_cell_line
@@ -27,22 +31,24 @@ from bedboss.bbuploader.models import (
     BedBossRequired,
     ProjectProcessingStatus,
 )
+from bedboss.bbuploader.prefetch import Prefetcher
 from bedboss.bbuploader.utils import (
+    BatchCommitter,
     build_gse_identifier,
-    create_gsm_sub_name,
     middle_underscored,
 )
 from bedboss.bedboss import run_all
 from bedboss.bedbuncher.bedbuncher import run_bedbuncher
 from bedboss.bedstat.r_service import RServiceManager
-from bedboss.const import MAX_FILE_SIZE
-from bedboss.exceptions import BedBossException, QualityException
+from bedboss.const import MAX_FILE_SIZE, UPLOAD_QUEUE_DEPTH
+from bedboss.exceptions import BedBossException, FetchException, QualityException
+from bedboss.fetcher import fetch_file
+from bedboss.models import UploadResult
+from bedboss.qdrant_index.upload import BulkQdrantIndexer
 from bedboss.refgenome_validator.main import ReferenceValidator
 from bedboss.skipper import Skipper
 from bedboss.utils import (
     calculate_time,
-    download_file,
-    run_initial_qc,
     standardize_genome_name,
 )
 from bedboss.utils import standardize_pep as pep_standardizer
@@ -78,6 +84,11 @@ def upload_all(
     overwrite=False,
     overwrite_bedset=False,
     lite=False,
+    prefetch_window: int = PREFETCH_WINDOW,
+    workers: int = 1,
+    max_downloads: int = MAX_PARALLEL_DOWNLOADS,
+    memory_limit: int = None,
+    bulk_qdrant: bool = False,
 ):
     """
     Main function responsible for processing bed files from PEPHub.
@@ -101,14 +112,24 @@ def upload_all(
         use_skipper: Use skipper to skip already processed files logged locally.
         reinit_skipper: If True, skipper will be reinitialized and all log files cleaned.
         lite: Lite mode, skipping statistic processing for memory optimization and time saving.
+        prefetch_window: Number of sample files downloaded ahead (from the current and next projects)
+            while the current sample is processed. 0 disables prefetching.
+        workers: Number of GSE projects processed at once, each in its own process. Default: 1.
+        max_downloads: Maximum number of downloads in flight across all workers (if workers > 1).
+        memory_limit: Memory limit in bytes of the uploader with all its workers. New projects are
+            not started while it's reached (if workers > 1). If None, memory is not limited.
+        bulk_qdrant: Index bed files in qdrant in batches (of all processed projects) instead of
+            one upsert per file.
     """
 
     phc = PEPHubClient()
     os.makedirs(outfolder, exist_ok=True)
 
+    # with several workers, models are loaded in the worker processes
+    init_ml = not lite and workers <= 1
     _LOGGER.info(f"Initializing BedBaseAgent with config: '{bedbase_config}'")
-    bbagent = BedBaseAgent(config=bedbase_config, init_ml=not lite)
-    _LOGGER.info(f"BedBaseAgent initialized (ML enabled: {not lite})")
+    bbagent = BedBaseAgent(config=bedbase_config, init_ml=init_ml)
+    _LOGGER.info(f"BedBaseAgent initialized (ML enabled: {init_ml})")
 
     genome = standardize_genome_name(genome, reference_validator=reference_validator)
     if genome:
@@ -131,6 +152,57 @@ def upload_all(
     count = 0
     total_projects = len(pep_annotation_list.results)
 
+    if workers > 1:
+        gse_list = []
+        with Session(bbagent.config.db_engine.engine) as session:
+            gse_statuses, _ = _preload_statuses(
+                session,
+                [
+                    build_gse_identifier(gse_pep.name, geo_tag)
+                    for gse_pep in pep_annotation_list.results
+                ],
+            )
+        for gse_pep in pep_annotation_list.results[:download_limit]:
+            skip_reason = _gse_skip_reason(
+                gse_statuses.get(build_gse_identifier(gse_pep.name, geo_tag)),
+                rerun=rerun,
+                run_failed=run_failed,
+                run_skipped=run_skipped,
+            )
+            if skip_reason:
+                _LOGGER.info(skip_reason)
+            else:
+                gse_list.append(gse_pep.name)
+
+        from bedboss.bbuploader.parallel import upload_gse_parallel
+
+        _LOGGER.info(f"Processing {len(gse_list)} projects with {workers} workers")
+        upload_gse_parallel(
+            gse_list=gse_list,
+            bedbase_config=bedbase_config,
+            bbagent=bbagent,
+            outfolder=outfolder,
+            geo_tag=geo_tag,
+            workers=workers,
+            max_downloads=max_downloads,
+            memory_limit=memory_limit,
+            prefetch_window=prefetch_window,
+            bulk_qdrant=bulk_qdrant,
+            lite=lite,
+            preload=preload,
+            rerun=rerun,
+            run_failed=run_failed,
+            run_skipped=run_skipped,
+            create_bedset=create_bedset,
+            genome=genome,
+            standardize_pep=standardize_pep,
+            use_skipper=use_skipper,
+            reinit_skipper=reinit_skipper,
+            overwrite=overwrite,
+            overwrite_bedset=overwrite_bedset,
+        )
+        return None
+
     pm_out_folder = os.path.join(os.path.abspath(outfolder), "pipeline_manager")
     _LOGGER.info(f"Pipeline info folder = '{pm_out_folder}'")
     pm = pypiper.PipelineManager(
@@ -147,46 +219,119 @@ def upload_all(
         _LOGGER.info("Lite mode: R service disabled")
         r_service = None
 
-    for gse_pep in pep_annotation_list.results:
-        count += 1
-        gse_id = build_gse_identifier(gse_pep.name, geo_tag)
-        with Session(bbagent.config.db_engine.engine) as session:
+    # embeddings of all projects are upserted together
+    qdrant_indexer = BulkQdrantIndexer(bbagent) if bulk_qdrant and not lite else None
+
+    if prefetch_window > 0:
+        prefetcher = Prefetcher(
+            spool_folder=os.path.join(outfolder, FILE_FOLDER_NAME),
+            window=prefetch_window,
+            remove_cancelled=not preload,
+        )
+        # next project is loaded from PEPHub in the background, so its files can be prefetched
+        project_loader = ThreadPoolExecutor(max_workers=1)
+    else:
+        prefetcher = None
+        project_loader = None
+    next_project: Future | None = None
+    next_project_index = None
+
+    gse_ids = [
+        build_gse_identifier(gse_pep.name, geo_tag)
+        for gse_pep in pep_annotation_list.results
+    ]
+
+    # one session for the whole page, so preloaded status rows stay attached to it.
+    # Rows are not expired on commit, otherwise each of them would be reloaded separately
+    with Session(bbagent.config.db_engine.engine, expire_on_commit=False) as session:
+        gse_statuses, gsm_statuses = _preload_statuses(session, gse_ids)
+        committer = BatchCommitter(session)
+
+        def schedule_project(project: peprs.Project, project_gse_id: str) -> None:
+            # the PEP is standardized later, so the genome can't be matched yet
+            _schedule_project(
+                prefetcher,
+                project,
+                geo_tag=geo_tag,
+                sample_statuses=gsm_statuses.get(project_gse_id),
+                rerun=rerun,
+                skipper=(
+                    Skipper(output_path=outfolder, name=project_gse_id)
+                    if use_skipper and not reinit_skipper
+                    else None
+                ),
+                genome=None if standardize_pep else genome,
+            )
+
+        def is_skipped(index: int) -> bool:
+            return bool(
+                _gse_skip_reason(
+                    gse_statuses.get(gse_ids[index]),
+                    rerun=rerun,
+                    run_failed=run_failed,
+                    run_skipped=run_skipped,
+                )
+            )
+
+        for index, gse_pep in enumerate(pep_annotation_list.results):
+            count += 1
+            gse_id = gse_ids[index]
             MessageHandler.print_success(f"{'##' * 30}")
             MessageHandler.print_success(
                 f"#### Processing: '{gse_id}'. #### Processing {count} / {total_projects}. ####"
             )
 
-            gse_status = session.scalar(
-                select(GeoGseStatus).where(GeoGseStatus.gse == gse_id)
+            gse_status = gse_statuses.get(gse_id)
+            skip_reason = _gse_skip_reason(
+                gse_status, rerun=rerun, run_failed=run_failed, run_skipped=run_skipped
             )
+            if skip_reason:
+                _LOGGER.info(skip_reason)
+                continue
 
-            if gse_status:
-                if gse_status.status == STATUS.SUCCESS and not rerun:
-                    _LOGGER.info(
-                        f"Skipping: '{gse_id}' - already processed and rerun set to false"
-                    )
-                    continue
-
-                elif (
-                    gse_status.status == STATUS.FAIL
-                    or gse_status.status == STATUS.PROCESSING
-                ) and not run_failed:
-                    _LOGGER.info("Reprocessing of failed set to false, exiting.")
-                    continue
-
-                elif (
-                    gse_status.status == STATUS.SKIPPED
-                    or gse_status.status == STATUS.PARTIAL
-                ) and not run_skipped:
-                    _LOGGER.info(
-                        f"Run skipped files set to false, exiting. GSE: {gse_id}"
-                    )
-                    continue
-
-            else:
+            if not gse_status:
                 gse_status = GeoGseStatus(gse=gse_id, status=STATUS.PROCESSING)
                 session.add(gse_status)
-                session.commit()
+                gse_statuses[gse_id] = gse_status
+                committer.add()
+
+            project = None
+            if prefetcher:
+                try:
+                    if next_project and next_project_index == index:
+                        # samples were scheduled when the project was loaded
+                        project = next_project.result()
+                    else:
+                        project = _load_project(gse_pep.name, geo_tag)
+                        schedule_project(project, gse_id)
+                except Exception as err:
+                    _LOGGER.warning(
+                        f"Unable to preload project '{gse_pep.name}'. Error: {err}"
+                    )
+                next_project = None
+
+                # projects that will be skipped are not loaded
+                next_project_index = next(
+                    (
+                        next_index
+                        for next_index in range(index + 1, total_projects)
+                        if not is_skipped(next_index)
+                    ),
+                    None,
+                )
+                if next_project_index is not None and count < download_limit:
+                    next_project = project_loader.submit(
+                        _load_project,
+                        pep_annotation_list.results[next_project_index].name,
+                        geo_tag,
+                    )
+                    next_project.add_done_callback(
+                        lambda future, next_gse_id=gse_ids[next_project_index]: (
+                            schedule_project(future.result(), next_gse_id)
+                            if not future.exception()
+                            else None
+                        )
+                    )
 
             try:
                 upload_result = _upload_gse(
@@ -208,22 +353,35 @@ def upload_all(
                     lite=lite,
                     r_service=r_service,
                     pm=pm,
+                    project=project,
+                    prefetcher=prefetcher,
+                    sample_statuses=gsm_statuses.get(gse_id, {}),
+                    committer=committer,
+                    qdrant_indexer=qdrant_indexer,
                 )
             except Exception as err:
                 _LOGGER.error(
                     f"Processing of '{gse_pep.name}' failed with error: {err}"
                 )
+                _cancel_project(prefetcher, project)
                 gse_status.status = STATUS.FAIL
                 gse_status.error = str(err)
-                session.commit()
+                committer.commit()
                 continue
 
             status_parser(gse_status, upload_result)
-            session.commit()
+            committer.commit()
 
             if count >= download_limit:
                 break
 
+        committer.commit()
+
+    if qdrant_indexer:
+        qdrant_indexer.flush()
+    if prefetcher:
+        project_loader.shutdown(wait=True, cancel_futures=True)
+        prefetcher.close()
     pm.stop_pipeline()
 
     return None
@@ -426,7 +584,7 @@ def upload_gse(
     _LOGGER.info(f"BedBaseAgent initialized (ML enabled: {not lite})")
     gse_id = build_gse_identifier(gse, geo_tag)
 
-    with Session(bbagent.config.db_engine.engine) as session:
+    with Session(bbagent.config.db_engine.engine, expire_on_commit=False) as session:
         _LOGGER.info(f"Processing: '{gse_id}'")
 
         gse_status = session.scalar(
@@ -515,6 +673,205 @@ def status_parser(
         gse_status.status = STATUS.FAIL
 
 
+def _preload_statuses(
+    session: Session, gse_ids: list[str]
+) -> tuple[dict[str, GeoGseStatus], dict[str, dict[str, GeoGsmStatus]]]:
+    """
+    Load statuses of GSE projects and all their samples, with one query for projects and one for samples.
+
+    Args:
+        session: Opened session to the database.
+        gse_ids: GSE identifiers (as stored in the database).
+
+    Returns:
+        GSE statuses by GSE identifier, and sample statuses by GSE identifier and sample name.
+    """
+    gse_statuses = {
+        gse_status.gse: gse_status
+        for gse_status in session.scalars(
+            select(GeoGseStatus).where(GeoGseStatus.gse.in_(gse_ids))
+        )
+    }
+    gse_by_id = {gse_status.id: gse_status.gse for gse_status in gse_statuses.values()}
+
+    gsm_statuses = {gse_id: {} for gse_id in gse_statuses}
+    if gse_by_id:
+        for sample_status in session.scalars(
+            select(GeoGsmStatus).where(GeoGsmStatus.gse_status_id.in_(list(gse_by_id)))
+        ):
+            gse_id = gse_by_id[sample_status.gse_status_id]
+            gsm_statuses[gse_id][sample_status.sample_name] = sample_status
+
+    _LOGGER.info(
+        f"Preloaded statuses of {len(gse_statuses)} projects and "
+        f"{sum(len(samples) for samples in gsm_statuses.values())} samples"
+    )
+    return gse_statuses, gsm_statuses
+
+
+def _gse_skip_reason(
+    gse_status: GeoGseStatus | None,
+    rerun: bool = False,
+    run_failed: bool = True,
+    run_skipped: bool = False,
+) -> str | None:
+    """
+    Check if GSE project should be skipped based on its status.
+
+    Args:
+        gse_status: GSE status of project (SQLAlchemy object), or None if project wasn't processed yet.
+        rerun: Rerun processing of the series.
+        run_failed: Rerun failed projects.
+        run_skipped: Rerun skipped projects.
+
+    Returns:
+        Reason of skipping, or None if project should be processed.
+    """
+    if not gse_status:
+        return None
+    if gse_status.status == STATUS.SUCCESS and not rerun:
+        return (
+            f"Skipping: '{gse_status.gse}' - already processed and rerun set to false"
+        )
+    if (
+        gse_status.status == STATUS.FAIL or gse_status.status == STATUS.PROCESSING
+    ) and not run_failed:
+        return "Reprocessing of failed set to false, exiting."
+    if (
+        gse_status.status == STATUS.SKIPPED or gse_status.status == STATUS.PARTIAL
+    ) and not run_skipped:
+        return f"Run skipped files set to false, exiting. GSE: {gse_status.gse}"
+    return None
+
+
+def _load_project(gse: str, geo_tag: str = DEFAULT_GEO_TAG) -> peprs.Project:
+    """
+    Load GEO project from PEPHub.
+
+    Args:
+        gse: GEO series number.
+        geo_tag: GEO tag to use when loading projects from PEPHub ('samples' or 'series').
+
+    Returns:
+        peprs Project.
+    """
+    _LOGGER.info(f"Loading project from PEPHub: 'bedbase/{gse}:{geo_tag}'")
+    project = peprs.Project.from_pephub(f"bedbase/{gse}:{geo_tag}")
+    _LOGGER.info(f"Loaded project with {len(project.samples)} samples")
+    return project
+
+
+def _is_sample_skipped(
+    project_sample,
+    geo_tag: str = DEFAULT_GEO_TAG,
+    sample_statuses: dict[str, GeoGsmStatus] | None = None,
+    rerun: bool = False,
+    skipper: Skipper | None = None,
+    genome: str | None = None,
+) -> bool:
+    """
+    Check if a sample will be skipped by _upload_gse without processing its file.
+
+    Args:
+        project_sample: peprs sample.
+        geo_tag: GEO tag of the project ('samples' or 'series').
+        sample_statuses: Sample statuses of the project by sample name.
+        rerun: Samples that were processed successfully are processed again.
+        skipper: Skipper of the project.
+        genome: Standardized genome that samples are filtered for.
+
+    Returns:
+        True if the sample will be skipped.
+    """
+    if skipper:
+        sample_gsm = project_sample.get("sample_geo_accession", "").lower()
+        sample_sample_name = project_sample.get("sample_name", "").lower()
+        if skipper.is_processed(f"{sample_gsm}_{sample_sample_name}"):
+            return True
+
+    sample_status = (sample_statuses or {}).get(project_sample.get("sample_name"))
+    if sample_status and sample_status.status == STATUS.SUCCESS and not rerun:
+        return True
+
+    if genome:
+        if geo_tag == "samples":
+            ref_genome = (project_sample.get("ref_genome") or "").strip()
+        else:
+            ref_genome = "undefined"
+        if ref_genome != genome:
+            return True
+    return False
+
+
+def _schedule_project(
+    prefetcher: Prefetcher,
+    project: peprs.Project,
+    max_file_size: int = 20 * 1000000,
+    geo_tag: str = DEFAULT_GEO_TAG,
+    sample_statuses: dict[str, GeoGsmStatus] | None = None,
+    rerun: bool = False,
+    skipper: Skipper | None = None,
+    genome: str | None = None,
+) -> None:
+    """
+    Schedule prefetching of project sample files. Files that are too big for initial QC,
+    and files of samples that will be skipped, are not scheduled.
+
+    Args:
+        prefetcher: Prefetcher object.
+        project: peprs Project.
+        max_file_size: Maximum file size in bytes. Default: 20MB.
+        geo_tag: GEO tag of the project ('samples' or 'series').
+        sample_statuses: Sample statuses of the project by sample name.
+        rerun: Samples that were processed successfully are processed again.
+        skipper: Skipper of the project.
+        genome: Standardized genome that samples are filtered for.
+    """
+    for project_sample in project.samples:
+        file_size = int(project_sample.get("file_size") or 0)
+        if not project_sample.get("file_url") or file_size > max_file_size:
+            continue
+        if _is_sample_skipped(
+            project_sample,
+            geo_tag=geo_tag,
+            sample_statuses=sample_statuses,
+            rerun=rerun,
+            skipper=skipper,
+            genome=genome,
+        ):
+            continue
+        prefetcher.schedule(project_sample.file_url, expected_size=file_size)
+
+
+def _cancel_project(
+    prefetcher: Prefetcher | None, project: peprs.Project | None
+) -> None:
+    """
+    Cancel prefetching of project sample files (e.g. project is skipped).
+
+    Args:
+        prefetcher: Prefetcher object.
+        project: peprs Project.
+    """
+    if not prefetcher or not project:
+        return
+    for project_sample in project.samples:
+        if project_sample.get("file_url"):
+            prefetcher.cancel(project_sample.file_url)
+
+
+def _cancel_sample(prefetcher: Prefetcher | None, project_sample) -> None:
+    """
+    Cancel prefetching of a skipped sample file.
+
+    Args:
+        prefetcher: Prefetcher object.
+        project_sample: peprs sample with bed file url.
+    """
+    if prefetcher and project_sample.get("file_url"):
+        prefetcher.cancel(project_sample.file_url)
+
+
 def _upload_gse(
     gse: str,
     bedbase_config: str | BedBaseAgent,
@@ -535,6 +892,12 @@ def _upload_gse(
     max_file_size: int = 20 * 1000000,
     r_service: RServiceManager = None,
     pm: pypiper.PipelineManager = None,
+    project: peprs.Project = None,
+    prefetcher: Prefetcher = None,
+    sample_statuses: dict[str, GeoGsmStatus] = None,
+    committer: BatchCommitter = None,
+    upload_queue_depth: int = UPLOAD_QUEUE_DEPTH,
+    qdrant_indexer: BulkQdrantIndexer = None,
 ) -> ProjectProcessingStatus:
     """
     Upload bed files from GEO series to BedBase.
@@ -554,11 +917,22 @@ def _upload_gse(
         overwrite_bedset: Overwrite existing bedset.
         use_skipper: Use skipper to skip already processed files logged locally.
         reinit_skipper: If True, skipper will be reinitialized and all logs cleaned.
-        preload: Pre-download files to the local folder (used for faster reproducibility).
+        preload: Keep downloaded files in the local folder (used for faster reproducibility).
+            If False, each file is removed after it is processed.
         lite: Lite mode, skipping statistic processing for memory optimization and time saving.
         max_file_size: Maximum file size in bytes. Default: 20MB.
         pm: PipelineManager object.
         r_service: RServiceManager object.
+        project: Already loaded peprs Project. If None, project is loaded from PEPHub.
+        prefetcher: Prefetcher object. If provided, sample files are downloaded ahead of processing,
+            and downloads of skipped samples are cancelled.
+        sample_statuses: Preloaded sample statuses of the project by sample name. If None, they are
+            loaded with one query.
+        committer: BatchCommitter used to commit status changes in batches. If None, it's created for sa_session.
+        upload_queue_depth: Number of processed samples uploaded in the background while the next sample
+            is processed. 0 uploads every sample before the next one starts.
+        qdrant_indexer: BulkQdrantIndexer object. If provided, bed files are indexed in qdrant in batches,
+            the caller flushes the remaining batch.
 
     Returns:
         ProjectProcessingStatus with counts of processed, skipped, and failed samples.
@@ -574,17 +948,30 @@ def _upload_gse(
 
     os.makedirs(outfolder, exist_ok=True)
 
-    _LOGGER.info(f"Loading project from PEPHub: 'bedbase/{gse}:{geo_tag}'")
-    project = peprs.Project.from_pephub(f"bedbase/{gse}:{geo_tag}")
-    _LOGGER.info(f"Loaded project with {len(project.samples)} samples")
+    if not project:
+        project = _load_project(gse, geo_tag)
 
     if standardize_pep:
         project = pep_standardizer(project)
 
+    if not committer:
+        committer = BatchCommitter(sa_session)
+    if sample_statuses is None:
+        sample_statuses = {}
+        if gse_status_sa_model.id is not None:
+            sample_statuses = {
+                sample_status.sample_name: sample_status
+                for sample_status in sa_session.scalars(
+                    select(GeoGsmStatus).where(
+                        GeoGsmStatus.gse_status_id == gse_status_sa_model.id
+                    )
+                )
+            }
+
     project_status = ProjectProcessingStatus(number_of_samples=len(project.samples))
     uploaded_files = []
     gse_status_sa_model.number_of_files = len(project.samples)
-    sa_session.commit()
+    committer.add()
 
     total_sample_number = len(project.samples)
 
@@ -596,6 +983,18 @@ def _upload_gse(
     else:
         skipper_obj = None
 
+    if prefetcher:
+        _schedule_project(
+            prefetcher,
+            project,
+            max_file_size=max_file_size,
+            geo_tag=geo_tag,
+            sample_statuses=sample_statuses,
+            rerun=rerun,
+            skipper=skipper_obj,
+            genome=genome,
+        )
+
     if not pm:
         pm_out_folder = os.path.join(os.path.abspath(outfolder), "pipeline_manager")
         _LOGGER.info(f"Pipeline info folder = '{pm_out_folder}'")
@@ -616,186 +1015,230 @@ def _upload_gse(
     else:
         r_service = r_service
 
-    for counter, project_sample in enumerate(project.samples):
-        _LOGGER.info(f">> Processing {counter + 1} / {total_sample_number}")
-        sample_gsm = project_sample.get("sample_geo_accession", "").lower()
-        sample_sample_name = project_sample.get("sample_name", "").lower()
-
-        if skipper_obj:
-            is_processed = skipper_obj.is_processed(
-                f"{sample_gsm}_{sample_sample_name}"
-            )
-            if is_processed:
-                _LOGGER.info(
-                    f"Skipping: '{sample_gsm}_{sample_sample_name}' - already processed"
-                )
-                uploaded_files.append(is_processed)
-                continue
+    uploader = BackgroundUploader(upload_queue_depth) if upload_queue_depth else None
+    # samples waiting for upload: upload key -> (skipper key, sample status)
+    pending_uploads = {}
+
+    def report_uploads(results: list[UploadResult]) -> None:
+        for result in results:
+            skipper_key, upload_status = pending_uploads.pop(result.key)
+            if result.error:
+                upload_status.status = STATUS.FAIL
+                upload_status.error = result.error
+                project_status.number_of_failed += 1
+                if skipper_obj:
+                    skipper_obj.add_failed(skipper_key, f"Error: {result.error}")
+            else:
+                uploaded_files.append(result.bed_digest)
+                if skipper_obj:
+                    skipper_obj.add_processed(skipper_key, result.bed_digest)
+                upload_status.status = STATUS.SUCCESS
+                upload_status.bed_id = result.bed_digest
+                project_status.number_of_processed += 1
+            committer.add()
 
-        required_metadata = process_pep_sample(
-            bed_sample=project_sample,
-            geo_tag=geo_tag,
-        )
+    try:
+        for counter, project_sample in enumerate(project.samples):
+            _LOGGER.info(f">> Processing {counter + 1} / {total_sample_number}")
+            sample_gsm = project_sample.get("sample_geo_accession", "").lower()
+            sample_sample_name = project_sample.get("sample_name", "").lower()
 
-        sample_status = sa_session.scalar(
-            select(GeoGsmStatus).where(
-                and_(
-                    GeoGsmStatus.sample_name == required_metadata.sample_name,
-                    GeoGsmStatus.gse_status_id == gse_status_sa_model.id,
+            if skipper_obj:
+                is_processed = skipper_obj.is_processed(
+                    f"{sample_gsm}_{sample_sample_name}"
                 )
-            )
-        )
+                if is_processed:
+                    _LOGGER.info(
+                        f"Skipping: '{sample_gsm}_{sample_sample_name}' - already processed"
+                    )
+                    uploaded_files.append(is_processed)
+                    _cancel_sample(prefetcher, project_sample)
+                    continue
 
-        if not sample_status:
-            sample_status = GeoGsmStatus(
-                gse_status_mapper=gse_status_sa_model,
-                sample_name=required_metadata.sample_name,
-                gsm=sample_gsm,
-                status=STATUS.PROCESSING,
+            required_metadata = process_pep_sample(
+                bed_sample=project_sample,
+                geo_tag=geo_tag,
             )
-            sa_session.add(sample_status)
-            sa_session.commit()
-        else:
-            if sample_status.status == STATUS.SUCCESS and not rerun:
-                _LOGGER.info(
-                    f"Skipping: '{required_metadata.sample_name}' - already processed"
-                )
-                uploaded_files.append(sample_status.bed_id)
-                project_status.number_of_processed += 1
-                continue
 
-        sample_status.genome = required_metadata.ref_genome
-        # to upload files only with a specific genome
-        if genome:
-            if required_metadata.ref_genome != genome:
-                _LOGGER.info(
-                    f"Skipping: '{required_metadata.sample_name}' - genome mismatch. Expected: '{genome}' Found: '{required_metadata.ref_genome}'"
+            sample_status = sample_statuses.get(required_metadata.sample_name)
+
+            if not sample_status:
+                sample_status = GeoGsmStatus(
+                    gse_status_mapper=gse_status_sa_model,
+                    sample_name=required_metadata.sample_name,
+                    gsm=sample_gsm,
+                    status=STATUS.PROCESSING,
                 )
-                sample_status.status = STATUS.SKIPPED
+                sa_session.add(sample_status)
+                sample_statuses[required_metadata.sample_name] = sample_status
+                committer.add()
+            else:
+                if sample_status.status == STATUS.SUCCESS and not rerun:
+                    _LOGGER.info(
+                        f"Skipping: '{required_metadata.sample_name}' - already processed"
+                    )
+                    uploaded_files.append(sample_status.bed_id)
+                    project_status.number_of_processed += 1
+                    _cancel_sample(prefetcher, project_sample)
+                    continue
 
-                sa_session.commit()
-                project_status.number_of_skipped += 1
+            sample_status.genome = required_metadata.ref_genome
+            # to upload files only with a specific genome
+            if genome:
+                if required_metadata.ref_genome != genome:
+                    _LOGGER.info(
+                        f"Skipping: '{required_metadata.sample_name}' - genome mismatch. Expected: '{genome}' Found: '{required_metadata.ref_genome}'"
+                    )
+                    sample_status.status = STATUS.SKIPPED
 
-                continue
+                    committer.add()
+                    project_status.number_of_skipped += 1
+                    _cancel_sample(prefetcher, project_sample)
 
-        _LOGGER.info(
-            f"Processing global_sample_id: '{required_metadata.pep.global_sample_id}' file: '{required_metadata.sample_name}' gse: '{gse}', geo_tag: '{geo_tag}'"
-        )
-        sample_status.status = STATUS.PROCESSING
-        sa_session.commit()
+                    continue
 
-        sample_status.file_size = project_sample.get("file_size", 0)
-        sample_status.source_submission_date = project_sample.get(
-            "sample_submission_date", None
-        )
+            _LOGGER.info(
+                f"Processing global_sample_id: '{required_metadata.pep.global_sample_id}' file: '{required_metadata.sample_name}' gse: '{gse}', geo_tag: '{geo_tag}'"
+            )
+            sample_status.status = STATUS.PROCESSING
+            # pending changes are flushed before the sample is processed
+            committer.commit()
 
-        try:
-            if int(project_sample.get("file_size") or 0) > max_file_size:
-                raise QualityException(
-                    f"File size is too big. {int(project_sample.get('file_size', 0)) / 1000000} MB"
-                )
+            sample_status.file_size = project_sample.get("file_size", 0)
+            sample_status.source_submission_date = project_sample.get(
+                "sample_submission_date", None
+            )
 
-            # to speed up the process, we can run initial QC on the file
-            qc_file_size = run_initial_qc(project_sample.file_url)
-            if qc_file_size > 0:
-                sample_status.file_size = qc_file_size
-        except QualityException as err:
-            _LOGGER.error(f"Processing of '{sample_gsm}' failed with error: {str(err)}")
-            sample_status.status = STATUS.FAIL
-            sample_status.error = str(err)
-            if err.file_size > 0:
-                sample_status.file_size = min(
-                    err.file_size, MAX_FILE_SIZE
-                )  # we need to limit file size to MAX_FILE_SIZE for DB storage
-            project_status.number_of_failed += 1
+            try:
+                if int(project_sample.get("file_size") or 0) > max_file_size:
+                    raise QualityException(
+                        f"File size is too big. {int(project_sample.get('file_size', 0)) / 1000000} MB"
+                    )
 
-            if skipper_obj:
-                skipper_obj.add_failed(
-                    f"{sample_gsm}_{sample_sample_name}", f"Error: {str(err)}"
+                # the file is downloaded once with initial QC, later steps use the local copy
+                if prefetcher:
+                    fetched_file = prefetcher.get(project_sample.file_url)
+                else:
+                    fetched_file = fetch_file(
+                        project_sample.file_url,
+                        spool_folder=os.path.join(outfolder, FILE_FOLDER_NAME),
+                    )
+                sample_status.file_size = fetched_file.file_size
+            except (QualityException, FetchException) as err:
+                _LOGGER.error(
+                    f"Processing of '{sample_gsm}' failed with error: {str(err)}"
                 )
-            sa_session.commit()
-            continue
+                sample_status.status = STATUS.FAIL
+                sample_status.error = str(err)
+                if getattr(err, "file_size", 0) > 0:
+                    sample_status.file_size = min(
+                        err.file_size, MAX_FILE_SIZE
+                    )  # we need to limit file size to MAX_FILE_SIZE for DB storage
+                project_status.number_of_failed += 1
+
+                if skipper_obj:
+                    skipper_obj.add_failed(
+                        f"{sample_gsm}_{sample_sample_name}", f"Error: {str(err)}"
+                    )
+                committer.add()
+                continue
 
-        if preload:
-            gsm_folder = create_gsm_sub_name(sample_gsm)
-            files_path = os.path.join(outfolder, FILE_FOLDER_NAME, gsm_folder)
-            os.makedirs(files_path, exist_ok=True)
-            file_abs_path = os.path.abspath(
-                os.path.join(files_path, project_sample.file)
-            )
-            _LOGGER.info(f"Downloading file to: '{file_abs_path}'")
-            download_file(project_sample.file_url, file_abs_path, no_fail=True)
-        else:
-            file_abs_path = required_metadata.file_path
+            file_abs_path = os.path.abspath(fetched_file.path)
 
-        try:
-            original_genome = required_metadata.ref_genome
-            # This code will standardize or predict genome if not provided
-            required_metadata.ref_genome = standardize_genome_name(
-                required_metadata.ref_genome,
-                file_abs_path,
-                reference_validator=reference_validator,
-            )
-            if original_genome != required_metadata.ref_genome:
-                _LOGGER.info(
-                    f"Genome standardized: '{original_genome}' -> '{required_metadata.ref_genome}'"
+            try:
+                original_genome = required_metadata.ref_genome
+                # This code will standardize or predict genome if not provided
+                required_metadata.ref_genome = standardize_genome_name(
+                    required_metadata.ref_genome,
+                    file_abs_path,
+                    reference_validator=reference_validator,
                 )
+                if original_genome != required_metadata.ref_genome:
+                    _LOGGER.info(
+                        f"Genome standardized: '{original_genome}' -> '{required_metadata.ref_genome}'"
+                    )
 
-            _LOGGER.info(
-                f"Starting bed processing for '{required_metadata.sample_name}' (genome: {required_metadata.ref_genome})"
-            )
-            file_digest = run_all(
-                name=required_metadata.title,
-                input_file=file_abs_path,
-                input_type=required_metadata.type,
-                outfolder=os.path.join(outfolder, "outputs"),
-                genome=required_metadata.ref_genome,
-                bedbase_config=bedbase_config,
-                narrowpeak=required_metadata.narrowpeak,
-                other_metadata=required_metadata.pep.model_dump(),
-                upload_s3=True,
-                upload_qdrant=True,
-                force_overwrite=overwrite,
-                lite=lite,
-                pm=pm,
-                r_service=r_service,
-                reference_genome_validator=reference_validator,
-            )
-            _LOGGER.info(
-                f"Successfully processed '{required_metadata.sample_name}' -> digest: {file_digest}"
-            )
-            uploaded_files.append(file_digest)
-            if skipper_obj:
-                skipper_obj.add_processed(
-                    f"{sample_gsm}_{sample_sample_name}", file_digest
+                _LOGGER.info(
+                    f"Starting bed processing for '{required_metadata.sample_name}' (genome: {required_metadata.ref_genome})"
                 )
-            sample_status.status = STATUS.SUCCESS
-            sample_status.bed_id = file_digest
-            project_status.number_of_processed += 1
-
-        except BedBossException as exc:
-            _LOGGER.error(f"Processing of '{sample_gsm}' failed with error: {str(exc)}")
-            sample_status.status = STATUS.FAIL
-            sample_status.error = str(exc)
-            project_status.number_of_failed += 1
-
-            if skipper_obj:
-                skipper_obj.add_failed(
-                    f"{sample_gsm}_{sample_sample_name}", f"Error: {str(exc)}"
+                file_digest = run_all(
+                    name=required_metadata.title,
+                    input_file=file_abs_path,
+                    input_type=required_metadata.type,
+                    outfolder=os.path.join(outfolder, "outputs"),
+                    genome=required_metadata.ref_genome,
+                    bedbase_config=bedbase_config,
+                    narrowpeak=required_metadata.narrowpeak,
+                    other_metadata=required_metadata.pep.model_dump(),
+                    upload_s3=True,
+                    upload_qdrant=True,
+                    force_overwrite=overwrite,
+                    lite=lite,
+                    pm=pm,
+                    r_service=r_service,
+                    reference_genome_validator=reference_validator,
+                    uploader=uploader,
+                    upload_key=str(counter),
+                    qdrant_indexer=qdrant_indexer,
                 )
+                _LOGGER.info(
+                    f"Successfully processed '{required_metadata.sample_name}' -> digest: {file_digest}"
+                )
+                if uploader:
+                    # status is set when the background upload is finished
+                    pending_uploads[str(counter)] = (
+                        f"{sample_gsm}_{sample_sample_name}",
+                        sample_status,
+                    )
+                else:
+                    uploaded_files.append(file_digest)
+                    if skipper_obj:
+                        skipper_obj.add_processed(
+                            f"{sample_gsm}_{sample_sample_name}", file_digest
+                        )
+                    sample_status.status = STATUS.SUCCESS
+                    sample_status.bed_id = file_digest
+                    project_status.number_of_processed += 1
+
+            except BedBossException as exc:
+                _LOGGER.error(
+                    f"Processing of '{sample_gsm}' failed with error: {str(exc)}"
+                )
+                sample_status.status = STATUS.FAIL
+                sample_status.error = str(exc)
+                project_status.number_of_failed += 1
 
-        except GenimlBaseError as exc:
-            _LOGGER.error(f"Processing of '{sample_gsm}' failed with error: {str(exc)}")
-            sample_status.status = STATUS.FAIL
-            sample_status.error = str(exc)
-            project_status.number_of_failed += 1
+                if skipper_obj:
+                    skipper_obj.add_failed(
+                        f"{sample_gsm}_{sample_sample_name}", f"Error: {str(exc)}"
+                    )
 
-            if skipper_obj:
-                skipper_obj.add_failed(
-                    f"{sample_gsm}_{sample_sample_name}", f"Error: {str(exc)}"
+            except GenimlBaseError as exc:
+                _LOGGER.error(
+                    f"Processing of '{sample_gsm}' failed with error: {str(exc)}"
                 )
+                sample_status.status = STATUS.FAIL
+                sample_status.error = str(exc)
+                project_status.number_of_failed += 1
 
-        sa_session.commit()
+                if skipper_obj:
+                    skipper_obj.add_failed(
+                        f"{sample_gsm}_{sample_sample_name}", f"Error: {str(exc)}"
+                    )
+            finally:
+                if not preload:
+                    # removed even if processing failed with an unexpected error
+                    os.remove(file_abs_path)
+
+            committer.add()
+            if uploader:
+                report_uploads(uploader.poll())
+    finally:
+        # also on unexpected errors, so no uploads are left running or unreported
+        if uploader:
+            # bedset can be created only from uploaded files
+            report_uploads(uploader.close())
+        committer.commit()
 
     if create_bedset and uploaded_files:
         _LOGGER.info(f"Creating bedset for: '{gse_id}'")
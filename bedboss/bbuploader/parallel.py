@@ -0,0 +1,383 @@
+import atexit
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from importlib.metadata import version as _pkg_version
+
+import pypiper
+from bbconf import BedBaseAgent
+from bbconf.db_utils import GeoGseStatus
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bedboss.bbuploader.constants import (
+    DEFAULT_GEO_TAG,
+    FILE_FOLDER_NAME,
+    MAX_PARALLEL_DOWNLOADS,
+    MEMORY_POLL_INTERVAL,
+    PKG_NAME,
+    PREFETCH_WINDOW,
+    STATUS,
+    WORKERS_FOLDER_NAME,
+)
+from bedboss.bbuploader.models import ProjectProcessingStatus
+from bedboss.bbuploader.prefetch import Prefetcher
+from bedboss.bbuploader.utils import BatchCommitter, build_gse_identifier
+from bedboss.bedstat.r_service import RServiceManager, find_free_port
+from bedboss.qdrant_index.upload import BulkQdrantIndexer
+
+__version__ = _pkg_version("bedboss")
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# state of the current worker process, set by _init_worker
+_WORKER = {}
+
+
+def _process_tree_rss(pid: int) -> int:
+    """
+    Resident memory of a process and all its descendants (e.g. upload workers and their R services).
+
+    Linux only, on other systems 0 is returned.
+
+    Args:
+        pid: Root process id.
+
+    Returns:
+        Resident memory in bytes.
+    """
+    if not os.path.isdir("/proc"):
+        return 0
+
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # process name may contain spaces, fields are counted after it
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss[int(entry)] = int(fields[21])
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total * os.sysconf("SC_PAGE_SIZE")
+
+
+def _init_worker(
+    bedbase_config: str,
+    outfolder: str,
+    lite: bool,
+    preload: bool,
+    prefetch_window: int,
+    bulk_qdrant: bool,
+    download_semaphore,
+    worker_counter,
+) -> None:
+    """
+    Initialize upload worker process, with its own database connection, pipeline manager
+    and R service.
+
+    Per-project state (Skipper logs, downloaded files, outputs and checkpoints) is kept in
+    the shared working directory, so it doesn't depend on which worker runs a project.
+    Only pipeline manager logs are kept in the worker's own subfolder.
+
+    Args:
+        bedbase_config: Path to bedbase configuration file.
+        outfolder: Main working directory.
+        lite: Lite mode, skipping statistic processing.
+        preload: Keep downloaded files in the local folder.
+        prefetch_window: Number of sample files downloaded ahead.
+        bulk_qdrant: Index bed files in qdrant in batches, flushed when the worker stops.
+        download_semaphore: Semaphore shared by all workers, limiting downloads in flight.
+        worker_counter: Shared counter used to number workers.
+    """
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"[worker_{worker_index}] %(levelname)s %(name)s: %(message)s",
+    )
+
+    worker_folder = os.path.join(
+        os.path.abspath(outfolder), WORKERS_FOLDER_NAME, f"worker_{worker_index}"
+    )
+    os.makedirs(worker_folder, exist_ok=True)
+
+    _WORKER["outfolder"] = os.path.abspath(outfolder)
+    _WORKER["bbagent"] = BedBaseAgent(config=bedbase_config, init_ml=not lite)
+    _WORKER["pm"] = pypiper.PipelineManager(
+        name="bedboss-pipeline",
+        outfolder=os.path.join(worker_folder, "pipeline_manager"),
+        version=__version__,
+        recover=True,
+    )
+    _WORKER["r_service"] = None if lite else RServiceManager(port=find_free_port())
+    _WORKER["prefetcher"] = Prefetcher(
+        spool_folder=os.path.join(_WORKER["outfolder"], FILE_FOLDER_NAME),
+        window=prefetch_window,
+        remove_cancelled=not preload,
+        download_semaphore=download_semaphore,
+    )
+    _WORKER["qdrant_indexer"] = (
+        BulkQdrantIndexer(_WORKER["bbagent"]) if bulk_qdrant and not lite else None
+    )
+    atexit.register(_stop_worker)
+    _LOGGER.info(f"Upload worker {worker_index} initialized in: '{worker_folder}'")
+
+
+def _stop_worker() -> None:
+    """
+    Stop prefetcher, R service and pipeline manager of the worker process, and upsert
+    remaining qdrant points.
+    """
+    if _WORKER["qdrant_indexer"]:
+        _WORKER["qdrant_indexer"].flush()
+    _WORKER["prefetcher"].close()
+    if _WORKER["r_service"]:
+        _WORKER["r_service"].terminate_service()
+    _WORKER["pm"].stop_pipeline()
+
+
+def _process_gse(
+    gse: str,
+    geo_tag: str,
+    rerun: bool,
+    run_failed: bool,
+    run_skipped: bool,
+    upload_kwargs: dict,
+) -> ProjectProcessingStatus | None:
+    """
+    Process one GSE project in the worker process.
+
+    Project and sample statuses are loaded and updated in the worker's own session. The
+    final project status is committed in one transaction together with remaining sample statuses.
+
+    Args:
+        gse: GEO series number.
+        geo_tag: GEO tag to use when loading projects from PEPHub ('samples' or 'series').
+        rerun: Rerun processing of the series.
+        run_failed: Rerun failed projects.
+        run_skipped: Rerun skipped projects.
+        upload_kwargs: Other arguments of _upload_gse.
+
+    Returns:
+        Project processing status, or None if project was skipped or failed.
+    """
+    from bedboss.bbuploader.main import (
+        _cancel_project,
+        _gse_skip_reason,
+        _load_project,
+        _preload_statuses,
+        _upload_gse,
+        status_parser,
+    )
+
+    gse_id = build_gse_identifier(gse, geo_tag)
+    bbagent = _WORKER["bbagent"]
+    prefetcher = _WORKER["prefetcher"]
+
+    with Session(bbagent.config.db_engine.engine, expire_on_commit=False) as session:
+        gse_statuses, gsm_statuses = _preload_statuses(session, [gse_id])
+        gse_status = gse_statuses.get(gse_id)
+        # status could have been changed since projects were dispatched
+        skip_reason = _gse_skip_reason(
+            gse_status, rerun=rerun, run_failed=run_failed, run_skipped=run_skipped
+        )
+        if skip_reason:
+            _LOGGER.info(skip_reason)
+            return None
+
+        committer = BatchCommitter(session)
+        if not gse_status:
+            gse_status = GeoGseStatus(gse=gse_id, status=STATUS.PROCESSING)
+            session.add(gse_status)
+            committer.add()
+
+        project = None
+        try:
+            project = _load_project(gse, geo_tag)
+            upload_result = _upload_gse(
+                gse=gse,
+                bedbase_config=bbagent,
+                outfolder=_WORKER["outfolder"],
+                geo_tag=geo_tag,
+                sa_session=session,
+                gse_status_sa_model=gse_status,
+                rerun=rerun,
+                r_service=_WORKER["r_service"],
+                pm=_WORKER["pm"],
+                project=project,
+                prefetcher=prefetcher,
+                sample_statuses=gsm_statuses.get(gse_id, {}),
+                committer=committer,
+                qdrant_indexer=_WORKER["qdrant_indexer"],
+                **upload_kwargs,
+            )
+        except Exception as err:
+            _LOGGER.error(f"Processing of '{gse}' failed with error: {err}")
+            _cancel_project(prefetcher, project)
+            gse_status.status = STATUS.FAIL
+            gse_status.error = str(err)
+            committer.commit()
+            return None
+
+        status_parser(gse_status, upload_result)
+        committer.commit()
+        return upload_result
+
+
+def _mark_failed(bbagent: BedBaseAgent, gse_id: str, error: str) -> None:
+    """
+    Mark GSE project as failed, e.g. when its worker process crashed.
+
+    Args:
+        bbagent: BedBaseAgent object.
+        gse_id: GSE identifier (as stored in the database).
+        error: Error message.
+    """
+    with Session(bbagent.config.db_engine.engine) as session:
+        gse_status = session.scalar(
+            select(GeoGseStatus).where(GeoGseStatus.gse == gse_id)
+        )
+        if not gse_status:
+            gse_status = GeoGseStatus(gse=gse_id)
+            session.add(gse_status)
+        gse_status.status = STATUS.FAIL
+        gse_status.error = error
+        session.commit()
+
+
+def upload_gse_parallel(
+    gse_list: list[str],
+    bedbase_config: str,
+    bbagent: BedBaseAgent,
+    outfolder: str,
+    geo_tag: str = DEFAULT_GEO_TAG,
+    workers: int = 2,
+    max_downloads: int = MAX_PARALLEL_DOWNLOADS,
+    memory_limit: int | None = None,
+    prefetch_window: int = PREFETCH_WINDOW,
+    bulk_qdrant: bool = False,
+    lite: bool = False,
+    preload: bool = True,
+    rerun: bool = False,
+    run_failed: bool = True,
+    run_skipped: bool = False,
+    **upload_kwargs,
+) -> None:
+    """
+    Process several GSE projects at once, each in its own worker process.
+
+    Every worker has its own database session, pipeline manager (logged in
+    outfolder/workers/worker_N) and R service; project state is kept in outfolder, as in the
+    serial upload. Downloads in flight are limited across all workers, and
+    a new project is started only while the uploader (with all workers and R services) uses
+    less than memory_limit bytes of memory.
+
+    Args:
+        gse_list: GEO series numbers to process.
+        bedbase_config: Path to bedbase configuration file.
+        bbagent: BedBaseAgent object of the main process.
+        outfolder: Working directory.
+        geo_tag: GEO tag to use when loading projects from PEPHub ('samples' or 'series').
+        workers: Number of worker processes.
+        max_downloads: Maximum number of downloads in flight across all workers.
+        memory_limit: Memory limit in bytes. If None, memory is not limited.
+        prefetch_window: Number of sample files downloaded ahead by each worker.
+        bulk_qdrant: Index bed files in qdrant in batches; each worker keeps its own batch.
+        lite: Lite mode, skipping statistic processing for memory optimization and time saving.
+        preload: Keep downloaded files in the local folder.
+        rerun: Rerun processing of the series.
+        run_failed: Rerun failed projects.
+        run_skipped: Rerun skipped projects.
+        **upload_kwargs: Other arguments of _upload_gse (e.g. genome, create_bedset, overwrite).
+    """
+    # PipelineManager and R services can't be safely forked
+    ctx = multiprocessing.get_context("spawn")
+    download_semaphore = ctx.BoundedSemaphore(max_downloads)
+    worker_counter = ctx.Value("i", 0)
+
+    pending = deque(gse_list)
+    running = {}
+    total = len(gse_list)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(
+            bedbase_config,
+            outfolder,
+            lite,
+            preload,
+            prefetch_window,
+            bulk_qdrant,
+            download_semaphore,
+            worker_counter,
+        ),
+    ) as executor:
+        while pending or running:
+            while pending and len(running) < workers:
+                if running and memory_limit:
+                    used_memory = _process_tree_rss(os.getpid())
+                    if used_memory >= memory_limit:
+                        _LOGGER.info(
+                            f"Memory limit reached ({used_memory / 1024**3:.1f} GB), waiting for running projects"
+                        )
+                        break
+                gse = pending.popleft()
+                _LOGGER.info(
+                    f"#### Starting: '{gse}'. #### {total - len(pending)} / {total}. ####"
+                )
+                future = executor.submit(
+                    _process_gse,
+                    gse,
+                    geo_tag,
+                    rerun,
+                    run_failed,
+                    run_skipped,
+                    dict(upload_kwargs, lite=lite, preload=preload),
+                )
+                running[future] = gse
+
+            done, _ = wait(
+                running, timeout=MEMORY_POLL_INTERVAL, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                gse = running.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as err:
+                    # worker was killed (e.g. out of memory), the pool can't be used anymore
+                    # and all projects in flight are lost
+                    for lost_gse in [gse, *running.values()]:
+                        _mark_failed(
+                            bbagent,
+                            build_gse_identifier(lost_gse, geo_tag),
+                            f"Worker process died: {err}",
+                        )
+                    raise
+                except Exception as err:
+                    _LOGGER.error(f"Processing of '{gse}' failed with error: {err}")
+                    _mark_failed(bbagent, build_gse_identifier(gse, geo_tag), str(err))
+                    continue
+                if result:
+                    _LOGGER.info(
+                        f"Processing of '{gse}' finished: "
+                        f"{result.number_of_processed}/{result.number_of_samples} processed, "
+                        f"{result.number_of_skipped} skipped, {result.number_of_failed} failed"
+                    )
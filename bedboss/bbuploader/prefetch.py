@@ -0,0 +1,263 @@
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from bedboss.bbuploader.constants import (
+    PKG_NAME,
+    PREFETCH_DISK_BUDGET,
+    PREFETCH_HOST_CONCURRENCY,
+    PREFETCH_WINDOW,
+)
+from bedboss.fetcher import FetchedFile, fetch_file
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+
+class _PrefetchItem:
+    """
+    One scheduled download.
+    """
+
+    def __init__(self, url: str, expected_size: int):
+        self.url = url
+        self.size = expected_size
+        self.future: Future | None = None
+        self.cancelled = False
+
+
+class Prefetcher:
+    """
+    Download GEO sample files ahead of processing.
+
+    Scheduled urls are downloaded in order in background threads, while the current
+    sample is processed. At most `window` downloads are started but not yet taken with
+    `get`, downloads of one host are limited to `host_concurrency` at a time, and a new
+    download doesn't start while prefetched files would exceed `disk_budget` bytes.
+    Files are downloaded with fetch_file into the same spool folder as regular downloads.
+    """
+
+    def __init__(
+        self,
+        spool_folder: str,
+        window: int = PREFETCH_WINDOW,
+        host_concurrency: int = PREFETCH_HOST_CONCURRENCY,
+        disk_budget: int = PREFETCH_DISK_BUDGET,
+        remove_cancelled: bool = True,
+        download_semaphore=None,
+    ):
+        """
+        Args:
+            spool_folder: Folder where downloaded files are stored.
+            window: Number of files downloaded ahead.
+            host_concurrency: Maximum number of parallel downloads from one host.
+            disk_budget: Maximum size in bytes of prefetched files that were not taken yet.
+            remove_cancelled: Remove files of cancelled downloads. Set to False to keep them in the spool.
+            download_semaphore: Semaphore that limits downloads in flight, shared with other prefetchers
+                (e.g. multiprocessing semaphore shared by upload workers). If None, only window limits apply.
+        """
+        self.spool_folder = spool_folder
+        self.window = window
+        self.host_concurrency = host_concurrency
+        self.disk_budget = disk_budget
+        self.remove_cancelled = remove_cancelled
+        self.download_semaphore = download_semaphore
+
+        # reentrant, since done callbacks run in the calling thread if the future is already finished
+        self._lock = threading.RLock()
+        self._pending: deque[_PrefetchItem] = deque()
+        self._items: dict[str, _PrefetchItem] = {}
+        self._started = 0
+        self._host_semaphores: dict[str, threading.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(window, 1), thread_name_prefix="prefetch"
+        )
+
+    def schedule(self, url: str, expected_size: int = 0) -> None:
+        """
+        Add a url to the end of the download queue.
+
+        Args:
+            url: Remote url of the file.
+            expected_size: Expected file size in bytes (e.g. from GEO metadata), used for the disk budget.
+        """
+        with self._lock:
+            if url in self._items:
+                return
+            item = _PrefetchItem(url, int(expected_size or 0))
+            self._items[url] = item
+            self._pending.append(item)
+            self._dispatch()
+
+    def get(self, url: str) -> FetchedFile:
+        """
+        Get a downloaded file, waiting for its download to finish.
+
+        Urls that were not scheduled (or were cancelled) are downloaded right away.
+
+        Args:
+            url: Remote url of the file.
+
+        Returns:
+            FetchedFile object.
+
+        Raises:
+            QualityException: If the file fails initial QC.
+            FetchException: If the file can't be downloaded.
+        """
+        with self._lock:
+            item = self._items.get(url)
+            if item and not item.future:
+                # not started yet, so it is downloaded in this thread
+                self._pending.remove(item)
+                self._items.pop(url)
+                item = None
+
+        if not item:
+            return self._fetch(url)
+        try:
+            return item.future.result()
+        finally:
+            with self._lock:
+                self._release(item)
+
+    def cancel(self, url: str) -> None:
+        """
+        Cancel a scheduled download (e.g. sample is skipped), and remove its file if it was already downloaded.
+
+        Args:
+            url: Remote url of the file.
+        """
+        with self._lock:
+            item = self._items.get(url)
+            if not item:
+                return
+            if not item.future:
+                self._pending.remove(item)
+                self._items.pop(url)
+                return
+            item.cancelled = True
+            if item.future.done():
+                self._release(item)
+                self._remove_file(item)
+
+    def close(self) -> None:
+        """
+        Cancel all scheduled downloads and remove files that were not taken.
+        """
+        with self._lock:
+            self._pending.clear()
+            for item in self._items.values():
+                item.cancelled = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for item in list(self._items.values()):
+                self._release(item)
+                self._remove_file(item)
+
+    def _reserved_bytes(self) -> int:
+        """Bytes of started downloads that were not taken yet."""
+        return sum(item.size for item in self._items.values() if item.future)
+
+    def _dispatch(self) -> None:
+        """
+        Start downloads from the head of the queue, while the window and disk budget allow.
+        Must be called with the lock held.
+        """
+        while self._pending and self._started < self.window:
+            item = self._pending[0]
+            # one file is always allowed, even if it's larger than the budget
+            if self._started and self._reserved_bytes() + item.size > self.disk_budget:
+                break
+            self._pending.popleft()
+            self._started += 1
+            item.future = self._executor.submit(self._download, item)
+            item.future.add_done_callback(lambda _, item=item: self._on_done(item))
+
+    def _download(self, item: _PrefetchItem) -> FetchedFile:
+        """
+        Download a scheduled file.
+
+        Args:
+            item: Scheduled download.
+
+        Returns:
+            FetchedFile object.
+        """
+        _LOGGER.debug(f"Prefetching: {item.url}")
+        return self._fetch(item.url)
+
+    def _fetch(self, url: str) -> FetchedFile:
+        """
+        Download a file, limiting parallel downloads per host and downloads in flight.
+
+        Args:
+            url: Remote url of the file.
+
+        Returns:
+            FetchedFile object.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._host_semaphores.setdefault(
+                host, threading.Semaphore(self.host_concurrency)
+            )
+        with semaphore:
+            if not self.download_semaphore:
+                return fetch_file(url, spool_folder=self.spool_folder)
+            with self.download_semaphore:
+                return fetch_file(url, spool_folder=self.spool_folder)
+
+    def _on_done(self, item: _PrefetchItem) -> None:
+        """
+        Update the disk budget with the real file size, and clean up cancelled downloads.
+
+        Args:
+            item: Finished download.
+        """
+        with self._lock:
+            if not item.future.cancelled() and not item.future.exception():
+                item.size = item.future.result().file_size
+            if item.cancelled:
+                self._release(item)
+                self._remove_file(item)
+            self._dispatch()
+
+    def _release(self, item: _PrefetchItem) -> None:
+        """
+        Remove a started download from the window. Must be called with the lock held.
+
+        Args:
+            item: Started download.
+        """
+        if self._items.get(item.url) is item:
+            self._items.pop(item.url)
+            self._started -= 1
+            self._dispatch()
+
+    def _remove_file(self, item: _PrefetchItem) -> None:
+        """
+        Remove the file of a cancelled download, unless another scheduled url has the same content.
+
+        Args:
+            item: Cancelled download.
+        """
+        future = item.future
+        if not self.remove_cancelled:
+            return
+        if not future or not future.done() or future.cancelled() or future.exception():
+            return
+        path = future.result().path
+        for other in self._items.values():
+            if (
+                other.future
+                and other.future.done()
+                and not other.future.cancelled()
+                and not other.future.exception()
+                and other.future.result().path == path
+            ):
+                return
+        if os.path.exists(path):
+            os.remove(path)
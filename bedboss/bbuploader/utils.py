@@ -2,7 +2,13 @@ import logging
 import os
 import urllib.request
 
-from bedboss.bbuploader.constants import DEFAULT_GEO_TAG, PKG_NAME
+from sqlalchemy.orm import Session
+
+from bedboss.bbuploader.constants import (
+    DEFAULT_GEO_TAG,
+    PKG_NAME,
+    STATUS_COMMIT_BATCH_SIZE,
+)
 
 _LOGGER = logging.getLogger(PKG_NAME)
 
@@ -79,3 +85,34 @@ def middle_underscored(s: str) -> str:
         return s
     parts = s.split("_")
     return "_".join(parts[1:-1])
+
+
+class BatchCommitter:
+    """
+    Commit status changes in batches, instead of one commit per change.
+    """
+
+    def __init__(self, session: Session, batch_size: int = STATUS_COMMIT_BATCH_SIZE):
+        """
+        Args:
+            session: Opened session to the database.
+            batch_size: Number of changes committed at once.
+        """
+        self.session = session
+        self.batch_size = batch_size
+        self._pending = 0
+
+    def add(self) -> None:
+        """
+        Register a change, and commit if the batch is full.
+        """
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.commit()
+
+    def commit(self) -> None:
+        """
+        Commit all pending changes.
+        """
+        self.session.commit()
+        self._pending = 0
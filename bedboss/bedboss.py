@@ -1,9 +1,10 @@
 import datetime
 import logging
+import multiprocessing
 import os
+import queue
 import subprocess
 from importlib.metadata import version as _pkg_version
-from urllib.parse import urlparse
 
 import bbconf
 import peprs
@@ -11,34 +12,46 @@ import pypiper
 import yaml
 from bbconf.bbagent import BedBaseAgent
 from bbconf.const import DEFAULT_LICENSE
+from bbconf.db_utils import Bed
 from bbconf.models.base_models import FileModel
 from geniml.bbclient import BBClient
 from pephubclient import PEPHubClient
 from pephubclient.helpers import MessageHandler as m
 from pephubclient.helpers import is_registry_path
 from peprs.eido import validate_project
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 __version__ = _pkg_version("bedboss")
+from bedboss.background_upload import BackgroundUploader
 from bedboss.bedbuncher import run_bedbuncher
 from bedboss.bedmaker.bedmaker import make_all
 from bedboss.bedstat.bedstat import bedstat
-from bedboss.bedstat.r_service import RServiceManager
-from bedboss.const import MAX_FILE_SIZE_QC, PKG_NAME
+from bedboss.bedstat.r_service import RServiceManager, RServicePool
+from bedboss.const import (
+    MAX_FILE_SIZE_QC,
+    PKG_NAME,
+    SPOOL_FOLDER_NAME,
+    UPLOAD_QUEUE_DEPTH,
+)
 from bedboss.exceptions import BedBossException, QualityException
+from bedboss.fetcher import fetch_file, is_remote
 from bedboss.models import (
     BedClassificationUpload,
     BedSetAnnotations,
     FilesUpload,
     PlotsUpload,
     StatsUpload,
+    UploadResult,
 )
+from bedboss.qdrant_index.upload import BulkQdrantIndexer
 from bedboss.refgenome_validator.main import ReferenceValidator
+from bedboss.refgenome_validator.models import CompatibilityConcise
 from bedboss.refgenome_validator.utils import predict_from_compatibility_resutlts
 from bedboss.skipper import Skipper
 from bedboss.utils import (
     calculate_time,
     get_genome_digest,
-    run_initial_qc,
     standardize_genome_name,
 )
 from bedboss.utils import standardize_pep as pep_standardizer
@@ -46,6 +59,23 @@ from bedboss.utils import standardize_pep as pep_standardizer
 _LOGGER = logging.getLogger(PKG_NAME)
 
 
+def is_bed_processed(bbagent: BedBaseAgent, bed_digest: str) -> bool:
+    """
+    Check if the bed file exists in the database and is marked as processed.
+
+    It's a primary key lookup, so it's cheap enough to run before heavy stages.
+
+    Args:
+        bbagent: BedBaseAgent object.
+        bed_digest: Bed file digest.
+
+    Returns:
+        True if the bed file is already processed.
+    """
+    with Session(bbagent.config.db_engine.engine) as session:
+        return bool(session.scalar(select(Bed.processed).where(Bed.id == bed_digest)))
+
+
 def requirements_check() -> None:
     """Check if all requirements are installed."""
     _LOGGER.info("Checking requirements...")
@@ -80,13 +110,19 @@ def run_all(
     upload_qdrant: bool = False,
     upload_s3: bool = False,
     lite: bool = False,
+    native_stats: bool = False,
+    stats_cache: bool = False,
+    checkpoints: bool = True,
     # Universes
     universe: bool = False,
     universe_method: str = None,
     universe_bedset: str = None,
     pm: pypiper.PipelineManager = None,
-    r_service: RServiceManager = None,
+    r_service: RServiceManager | RServicePool = None,
     reference_genome_validator: ReferenceValidator = None,
+    uploader: BackgroundUploader = None,
+    upload_key: str = None,
+    qdrant_indexer: BulkQdrantIndexer = None,
 ) -> str:
     """
     Run bedboss: bedmaker -> bedqc -> bedclassifier -> bedstat -> upload to s3, qdrant, and bedbase.
@@ -113,12 +149,21 @@ def run_all(
         upload_qdrant: Whether to upload to qdrant. Default: False.
         upload_s3: Whether to upload to s3.
         lite: Whether to run lite version of the pipeline. Default: False.
+        native_stats: Whether to compute statistics with NumPy instead of R. Default: False.
+        stats_cache: Whether to cache statistics and reuse them for the same digest. Default: False.
+        checkpoints: Whether to checkpoint completed stages in outfolder/checkpoints, so a rerun
+            after a failure resumes at the first incomplete stage. Default: True.
         universe: Whether to add the sample as the universe. Default: False.
         universe_method: Method used to create the universe.
         universe_bedset: Bedset identifier for the universe.
         pm: Pypiper object.
-        r_service: RServiceManager object that will run R services.
+        r_service: RServiceManager or RServicePool object that will run R services.
         reference_genome_validator: ReferenceValidator object that will validate reference genome compatibility.
+        uploader: BackgroundUploader object. If provided, the upload is queued and the digest is
+            returned before it finishes; upload result is reported by the uploader.
+        upload_key: Key of the upload result (e.g. sample name). Default: bed digest.
+        qdrant_indexer: BulkQdrantIndexer object. If provided (and upload_qdrant is set), the bed file
+            is indexed in qdrant in batches with other files, instead of one upsert on upload.
 
     Returns:
         Bed digest string.
@@ -149,20 +194,23 @@ def run_all(
     else:
         stop_pipeline = False
 
-    if urlparse(input_file).scheme in ("http", "https", "ftp"):
+    if is_remote(input_file):
         _LOGGER.info(
-            "Remote input detected. Running initial_qc to inspect remote file size."
+            "Remote input detected. Downloading it with initial QC of the remote file."
+        )
+        input_file = fetch_file(
+            input_file, spool_folder=os.path.join(outfolder, SPOOL_FOLDER_NAME)
+        ).path
+
+    def is_duplicate(bed_digest: str) -> bool:
+        # duplicates of already processed files (e.g. the same file in several GEO series)
+        # skip classification, bigBed, statistics, validation and upload
+        return (
+            not update
+            and not force_overwrite
+            and not universe
+            and is_bed_processed(bbagent, bed_digest)
         )
-        file_size = run_initial_qc(input_file)
-
-        if file_size > MAX_FILE_SIZE_QC:
-            raise QualityException(
-                f"Remote file size {file_size} exceeds the maximum allowed size of {bbconf.MAX_REMOTE_FILE_SIZE}. Please download the file and provide a local path."
-            )
-        else:
-            _LOGGER.info(
-                f"Remote file size {file_size} is within the allowed limit. Proceeding with processing."
-            )
 
     bed_metadata = make_all(
         input_file=input_file,
@@ -175,7 +223,43 @@ def run_all(
         chrom_sizes=chrom_sizes,
         lite=lite,
         pm=pm,
+        checkpoint_inputs=(
+            {
+                "bedboss": __version__,
+                "genome": genome,
+                "input_type": input_type,
+                "narrowpeak": narrowpeak,
+                "check_qc": check_qc,
+                "rfg_config": str(rfg_config) if rfg_config else None,
+                "chrom_sizes": chrom_sizes,
+                "lite": lite,
+                "native_stats": native_stats,
+                "ensdb": ensdb,
+                "open_signal_matrix": open_signal_matrix,
+            }
+            if checkpoints
+            else None
+        ),
+        skip=is_duplicate,
     )
+    checkpoint = bed_metadata.checkpoint
+
+    if bed_metadata.skipped:
+        _LOGGER.info(
+            f"Bed file '{bed_metadata.bed_digest}' is already processed. Skipping. "
+            "Use update or force_overwrite to process it again."
+        )
+        if uploader:
+            # nothing to upload, but the result is reported in order with queued uploads
+            uploader.submit(
+                upload_key or bed_metadata.bed_digest,
+                bed_metadata.bed_digest,
+                lambda: None,
+            )
+        if stop_pipeline:
+            pm.stop_pipeline()
+        return bed_metadata.bed_digest
+
     if not other_metadata:
         other_metadata = {"sample_name": name}
 
@@ -185,6 +269,9 @@ def run_all(
     if lite:
         statistics_dict = {}
         statistics_dict["number_of_regions"] = len(bed_metadata.bed_object)
+    elif checkpoint and checkpoint.is_done("bedstat"):
+        _LOGGER.info("Using checkpointed statistics")
+        statistics_dict = checkpoint.get("bedstat")
     else:
         statistics_dict = bedstat(
             bedfile=bed_metadata.bed_file,
@@ -197,7 +284,12 @@ def run_all(
             rfg_config=rfg_config,
             pm=pm,
             r_service=r_service,
+            native_stats=native_stats,
+            parsed_bed=bed_metadata.parsed_bed,
+            use_cache=stats_cache,
         )
+        if checkpoint and not just_db_commit:
+            checkpoint.save("bedstat", statistics_dict)
 
     if "mean_region_width" not in statistics_dict:
         statistics_dict["mean_region_width"] = (
@@ -248,13 +340,28 @@ def run_all(
         non_compliant_columns=bed_metadata.non_compliant_columns,
         header=bed_metadata.bed_object.header,
     )
-    if not reference_genome_validator:
-        reference_genome_validator = ReferenceValidator()
     if validate_reference:
-        _LOGGER.info("Validating reference genome")
-        ref_valid_stats = reference_genome_validator.determine_compatibility(
-            bedfile=bed_metadata.bed_object, concise=True
-        )
+        if checkpoint and checkpoint.is_done("validation"):
+            _LOGGER.info("Using checkpointed reference genome validation")
+            ref_valid_stats = {
+                genome_digest: CompatibilityConcise(**compatibility)
+                for genome_digest, compatibility in checkpoint.get("validation").items()
+            }
+        else:
+            _LOGGER.info("Validating reference genome")
+            if not reference_genome_validator:
+                reference_genome_validator = ReferenceValidator()
+            ref_valid_stats = reference_genome_validator.determine_compatibility(
+                bedfile=bed_metadata.bed_object, concise=True
+            )
+            if checkpoint:
+                checkpoint.save(
+                    "validation",
+                    {
+                        genome_digest: compatibility.model_dump(mode="json")
+                        for genome_digest, compatibility in ref_valid_stats.items()
+                    },
+                )
         predicted_alias, predicted_digest = predict_from_compatibility_resutlts(
             ref_valid_stats
         )
@@ -267,47 +374,78 @@ def run_all(
     else:
         ref_valid_stats = None
 
-    if update:
-        bbagent.bed.update(
-            identifier=bed_metadata.bed_digest,
-            stats=stats.model_dump(exclude_unset=True),
-            metadata=other_metadata,
-            plots=plots.model_dump(exclude_unset=True),
-            files=files.model_dump(exclude_unset=True),
-            classification=classification.model_dump(exclude_unset=True),
-            ref_validation=ref_valid_stats,
-            license_id=license_id,
-            upload_qdrant=upload_qdrant and not lite,
-            upload_s3=upload_s3,
-            local_path=outfolder,
-            overwrite=True,
-            processed=not lite,
-            nofail=True,
-        )
-    else:
-        bbagent.bed.add(
-            identifier=bed_metadata.bed_digest,
-            stats=stats.model_dump(exclude_unset=True),
-            metadata=other_metadata,
-            plots=plots.model_dump(exclude_unset=True),
-            files=files.model_dump(exclude_unset=True),
-            classification=classification.model_dump(exclude_unset=True),
-            ref_validation=ref_valid_stats,
-            license_id=license_id,
-            upload_qdrant=upload_qdrant and not lite,
-            upload_s3=upload_s3,
-            local_path=outfolder,
-            overwrite=force_overwrite,
-            processed=not lite,
-            nofail=True,
-        )
+    def upload() -> None:
+        if update:
+            bbagent.bed.update(
+                identifier=bed_metadata.bed_digest,
+                stats=stats.model_dump(exclude_unset=True),
+                metadata=other_metadata,
+                plots=plots.model_dump(exclude_unset=True),
+                files=files.model_dump(exclude_unset=True),
+                classification=classification.model_dump(exclude_unset=True),
+                ref_validation=ref_valid_stats,
+                license_id=license_id,
+                upload_qdrant=upload_qdrant and not lite and not qdrant_indexer,
+                upload_s3=upload_s3,
+                local_path=outfolder,
+                overwrite=True,
+                processed=not lite,
+                nofail=True,
+            )
+        else:
+            bbagent.bed.add(
+                identifier=bed_metadata.bed_digest,
+                stats=stats.model_dump(exclude_unset=True),
+                metadata=other_metadata,
+                plots=plots.model_dump(exclude_unset=True),
+                files=files.model_dump(exclude_unset=True),
+                classification=classification.model_dump(exclude_unset=True),
+                ref_validation=ref_valid_stats,
+                license_id=license_id,
+                upload_qdrant=upload_qdrant and not lite and not qdrant_indexer,
+                upload_s3=upload_s3,
+                local_path=outfolder,
+                overwrite=force_overwrite,
+                processed=not lite,
+                nofail=True,
+            )
 
-    if universe:
-        bbagent.bed.add_universe(
-            bedfile_id=bed_metadata.bed_digest,
-            bedset_id=universe_bedset,
-            construct_method=universe_method,
+        if qdrant_indexer and upload_qdrant and not lite:
+            try:
+                qdrant_indexer.add(
+                    bed_metadata.bed_digest,
+                    bed_metadata.bed_object,
+                    {
+                        **other_metadata,
+                        "name": name,
+                        "genome_alias": classification.genome_alias,
+                        "genome_digest": classification.genome_digest,
+                    },
+                )
+            except Exception as err:
+                # file stays unindexed, and can be indexed later with `bedboss qdrant reindex`
+                _LOGGER.warning(
+                    f"Unable to index '{bed_metadata.bed_digest}' in qdrant: {err}"
+                )
+
+        if universe:
+            bbagent.bed.add_universe(
+                bedfile_id=bed_metadata.bed_digest,
+                bedset_id=universe_bedset,
+                construct_method=universe_method,
+            )
+
+        # upload is the last stage, so checkpoints of the completed run are not needed anymore
+        if checkpoint:
+            checkpoint.clear()
+
+    if uploader:
+        # upload runs in the background, while the caller continues with the next sample
+        uploader.submit(
+            upload_key or bed_metadata.bed_digest, bed_metadata.bed_digest, upload
         )
+    else:
+        upload()
 
     if stop_pipeline:
         pm.stop_pipeline()
@@ -316,6 +454,316 @@ def run_all(
     return bed_metadata.bed_digest
 
 
+def _pep_sample_kwargs(
+    pep_sample: peprs.Sample,
+    output_folder: str,
+    license_id: str,
+    rfg_config: str,
+    check_qc: bool,
+    ensdb: str,
+    just_db_commit: bool,
+    force_overwrite: bool,
+    update: bool,
+    upload_qdrant: bool,
+    upload_s3: bool,
+    lite: bool,
+) -> dict:
+    """
+    Build run_all keyword arguments for one PEP sample.
+
+    Only plain, picklable values are returned, so the result can be sent to a worker process.
+    Per-process objects (bedbase agent, pipeline manager, R service, validator) are added by the caller.
+
+    Args:
+        pep_sample: PEP sample.
+        output_folder: Output folder.
+        license_id: Default license identifier, used if sample has no license.
+        rfg_config: Path to the genome config file (refgenie).
+        check_qc: Whether to run quality control during bedmaking.
+        ensdb: A full path to the ensdb gtf file.
+        just_db_commit: Whether save only to the database.
+        force_overwrite: Whether to overwrite the existing record.
+        update: Whether to update the record in the database.
+        upload_qdrant: Whether to execute qdrant indexing.
+        upload_s3: Whether to upload to s3.
+        lite: Whether to run lite version of the pipeline.
+
+    Returns:
+        Dictionary of run_all arguments.
+
+    Raises:
+        QualityException: If the file size declared in the PEP exceeds the QC limit.
+    """
+    if pep_sample.get("file_size", None):
+        if int(pep_sample.file_size) > MAX_FILE_SIZE_QC:
+            raise QualityException(
+                f"File size {pep_sample.file_size} exceeds the maximum allowed size of {MAX_FILE_SIZE_QC}. Please provide a smaller file or set check_qc to False to skip this check."
+            )
+
+    file_type = pep_sample.get("file_type")
+    is_narrow_peak = bool(file_type) and file_type.lower() == "narrowpeak"
+
+    return dict(
+        input_file=pep_sample.input_file,
+        input_type=pep_sample.input_type,
+        genome=pep_sample.genome,
+        name=pep_sample.sample_name,
+        license_id=pep_sample.get("license_id") or license_id,
+        narrowpeak=is_narrow_peak,
+        chrom_sizes=pep_sample.get("chrom_sizes"),
+        open_signal_matrix=pep_sample.get("open_signal_matrix"),
+        other_metadata=pep_sample.to_dict(),
+        outfolder=output_folder,
+        rfg_config=rfg_config,
+        check_qc=check_qc,
+        ensdb=ensdb,
+        just_db_commit=just_db_commit,
+        force_overwrite=force_overwrite,
+        update=update,
+        upload_qdrant=upload_qdrant,
+        upload_s3=upload_s3,
+        universe=pep_sample.get("universe"),
+        universe_method=pep_sample.get("universe_method"),
+        universe_bedset=pep_sample.get("universe_bedset"),
+        lite=lite,
+    )
+
+
+def _pep_worker(
+    worker_id: int,
+    bedbase_config: str,
+    output_folder: str,
+    lite: bool,
+    upload_queue_depth: int,
+    bulk_qdrant: bool,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    """
+    Worker process of the parallel insert_pep engine.
+
+    Each worker owns its bedbase agent, pypiper sub-manager, R service (on its own port),
+    reference validator and background uploader, and processes samples from the task queue
+    until it receives None.
+
+    Args:
+        worker_id: Worker index, used to separate pypiper output folders.
+        bedbase_config: Bedbase configuration file path.
+        output_folder: Output folder.
+        lite: Whether to run lite version of the pipeline (no R service).
+        upload_queue_depth: Number of finished samples uploaded in the background while the next
+            sample is processed. 0 uploads every sample before the next one starts.
+        bulk_qdrant: Whether to index bed files in qdrant in batches, flushed when the worker stops.
+        tasks: Queue of (sample_name, run_all kwargs) tuples, terminated by None.
+        results: Queue of (event, worker_id, sample_name, bed_id, error) tuples. Event is "ready"
+            when the worker is initialized, "started" when it takes a sample, and "finished"
+            when the result of a sample is known.
+    """
+
+    def report_uploads(upload_results: list[UploadResult]) -> None:
+        for result in upload_results:
+            results.put(
+                (
+                    "finished",
+                    worker_id,
+                    result.key,
+                    None if result.error else result.bed_digest,
+                    result.error,
+                )
+            )
+
+    pm = pypiper.PipelineManager(
+        name=f"bedboss-pipeline-worker-{worker_id}",
+        outfolder=os.path.join(
+            os.path.abspath(output_folder), "pipeline_manager", f"worker_{worker_id}"
+        ),
+        version=__version__,
+        recover=True,
+    )
+    r_service = None
+    try:
+        bbagent = BedBaseAgent(bedbase_config)
+        if not lite:
+            r_service = RServicePool(workers=1)
+        reference_genome_validator = ReferenceValidator()
+        uploader = (
+            BackgroundUploader(upload_queue_depth) if upload_queue_depth else None
+        )
+        qdrant_indexer = BulkQdrantIndexer(bbagent) if bulk_qdrant else None
+        results.put(("ready", worker_id, None, None, None))
+
+        try:
+            for sample_name, run_kwargs in iter(tasks.get, None):
+                results.put(("started", worker_id, sample_name, None, None))
+                try:
+                    bed_id = run_all(
+                        bedbase_config=bbagent,
+                        pm=pm,
+                        r_service=r_service,
+                        reference_genome_validator=reference_genome_validator,
+                        uploader=uploader,
+                        upload_key=sample_name,
+                        qdrant_indexer=qdrant_indexer,
+                        **run_kwargs,
+                    )
+                    if not uploader:
+                        results.put(("finished", worker_id, sample_name, bed_id, None))
+                except Exception as e:
+                    # Anything escaping here would leave the sample unreported
+                    _LOGGER.error(f"Failed to process {sample_name}. See {e}")
+                    results.put(("finished", worker_id, sample_name, None, f"{e}"))
+
+                if uploader:
+                    report_uploads(uploader.poll())
+        finally:
+            if uploader:
+                report_uploads(uploader.close())
+            if qdrant_indexer:
+                qdrant_indexer.flush()
+    finally:
+        if r_service:
+            r_service.terminate_service()
+        pm.stop_pipeline()
+
+
+def _run_samples_parallel(
+    samples: list[tuple[str, dict]],
+    bedbase_config: str,
+    output_folder: str,
+    lite: bool,
+    workers: int,
+    skipper: Skipper,
+    upload_queue_depth: int = UPLOAD_QUEUE_DEPTH,
+    bulk_qdrant: bool = False,
+) -> tuple[list[str], list[str]]:
+    """
+    Process samples in a pool of worker processes.
+
+    Results are collected in the parent process, so the skipper log is written by a single writer.
+    If a worker process dies (e.g. it is killed when out of memory), the samples it held are
+    marked as failed, and a new worker takes over the remaining samples.
+
+    Args:
+        samples: List of (sample_name, run_all kwargs) tuples.
+        bedbase_config: Bedbase configuration file path.
+        output_folder: Output folder.
+        lite: Whether to run lite version of the pipeline.
+        workers: Number of worker processes.
+        skipper: Skipper object used to record processed and failed samples.
+        upload_queue_depth: Number of finished samples each worker uploads in the background.
+        bulk_qdrant: Whether workers index bed files in qdrant in batches.
+
+    Returns:
+        Tuple of processed bed ids and failed sample names.
+    """
+    processed_ids = []
+    failed_samples = []
+    if not samples:
+        return processed_ids, failed_samples
+
+    workers = min(workers, len(samples))
+    ctx = multiprocessing.get_context("spawn")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for sample in samples:
+        tasks.put(sample)
+    for _ in range(workers):
+        tasks.put(None)
+
+    # worker id -> process, of workers that were not seen exiting yet
+    processes = {}
+    # worker id -> names of samples taken by the worker, without a result yet
+    held = {}
+    ready_workers = set()
+    started_processes = []
+
+    def start_worker(worker_id: int) -> None:
+        process = ctx.Process(
+            target=_pep_worker,
+            args=(
+                worker_id,
+                bedbase_config,
+                output_folder,
+                lite,
+                upload_queue_depth,
+                bulk_qdrant,
+                tasks,
+                results,
+            ),
+        )
+        process.start()
+        processes[worker_id] = process
+        started_processes.append(process)
+
+    unfinished = {sample_name for sample_name, _ in samples}
+
+    def finish(sample_name: str, bed_id: str | None, error: str | None) -> None:
+        if sample_name not in unfinished:
+            return
+        unfinished.discard(sample_name)
+        if error is None:
+            processed_ids.append(bed_id)
+            skipper.add_processed(sample_name, bed_id, success=True)
+            m.print_success(
+                f"Processed sample {sample_name} ({len(samples) - len(unfinished)}/{len(samples)})"
+            )
+        else:
+            failed_samples.append(sample_name)
+            skipper.add_failed(sample_name, error)
+
+    _LOGGER.info(f"Processing {len(samples)} samples with {workers} workers")
+    for worker_id in range(workers):
+        start_worker(worker_id)
+
+    while unfinished:
+        # taken before waiting, so messages sent by these workers before they exited are read first
+        exited = [
+            worker_id
+            for worker_id, process in processes.items()
+            if not process.is_alive()
+        ]
+        try:
+            event, worker_id, sample_name, bed_id, error = results.get(timeout=10)
+        except queue.Empty:
+            for worker_id in exited:
+                process = processes.pop(worker_id)
+                lost_samples = held.pop(worker_id, set())
+                for lost_sample in sorted(lost_samples):
+                    _LOGGER.error(
+                        f"Worker {worker_id} died while processing {lost_sample}"
+                    )
+                    finish(
+                        lost_sample,
+                        None,
+                        f"Worker process died with exit code {process.exitcode}",
+                    )
+                # a worker that failed to initialize isn't replaced, a new one would fail too
+                if process.exitcode and worker_id in ready_workers:
+                    # the stop signal of the dead worker is still in the task queue
+                    start_worker(len(started_processes))
+            if not processes:
+                for sample_name in sorted(unfinished):
+                    finish(
+                        sample_name,
+                        None,
+                        "Worker process exited before the sample was processed",
+                    )
+            continue
+
+        if event == "ready":
+            ready_workers.add(worker_id)
+        elif event == "started":
+            held.setdefault(worker_id, set()).add(sample_name)
+        else:
+            held.get(worker_id, set()).discard(sample_name)
+            finish(sample_name, bed_id, error)
+
+    for process in started_processes:
+        process.join()
+
+    return processed_ids, failed_samples
+
+
 @calculate_time
 def insert_pep(
     bedbase_config: str,
@@ -339,6 +787,9 @@ def insert_pep(
     lite: bool = False,
     rerun: bool = False,
     pm: pypiper.PipelineManager = None,
+    workers: int = 1,
+    upload_queue_depth: int = UPLOAD_QUEUE_DEPTH,
+    bulk_qdrant: bool = False,
 ) -> None:
     """
     Run all bedboss pipelines for all samples in the pep file.
@@ -367,6 +818,14 @@ def insert_pep(
         lite: Whether to run lite version of the pipeline.
         rerun: Whether to rerun processed samples.
         pm: Pypiper object.
+        workers: Number of samples processed in parallel. Each worker is a separate process
+            with its own R service, pypiper sub-manager and reference validator. Default: 1.
+        upload_queue_depth: Number of finished samples that can wait for upload in the background,
+            while the next sample is processed. 0 uploads every sample before the next one starts.
+            With several workers, each worker has its own upload queue. Default: 2.
+        bulk_qdrant: Whether to index bed files in qdrant in batches of QDRANT_BULK_BATCH_SIZE
+            instead of one upsert per file. With several workers, each worker keeps its own batch.
+            Default: False.
     """
 
     failed_samples = []
@@ -400,74 +859,127 @@ def insert_pep(
     if rerun:
         skipper.reinitialize()
 
-    if not lite:
-        r_service = RServiceManager()
+    sample_kwargs = dict(
+        output_folder=output_folder,
+        license_id=license_id,
+        rfg_config=rfg_config,
+        check_qc=check_qc,
+        ensdb=ensdb,
+        just_db_commit=just_db_commit,
+        force_overwrite=force_overwrite,
+        update=update,
+        upload_qdrant=upload_qdrant,
+        upload_s3=upload_s3,
+        lite=lite,
+    )
+
+    if workers > 1:
+        samples_to_process = []
+        for pep_sample in pep.samples:
+            is_processed = skipper.is_processed(pep_sample.sample_name)
+            if is_processed:
+                m.print_success(
+                    f"Skipping {pep_sample.sample_name} : {is_processed}. Already processed."
+                )
+                processed_ids.append(is_processed)
+                continue
+            try:
+                samples_to_process.append(
+                    (
+                        pep_sample.sample_name,
+                        _pep_sample_kwargs(pep_sample, **sample_kwargs),
+                    )
+                )
+            except BedBossException as e:
+                _LOGGER.error(f"Failed to process {pep_sample.sample_name}. See {e}")
+                failed_samples.append(pep_sample.sample_name)
+                skipper.add_failed(pep_sample.sample_name, f"{e}")
+
+        parallel_ids, parallel_failed = _run_samples_parallel(
+            samples_to_process,
+            bedbase_config=bedbase_config,
+            output_folder=output_folder,
+            lite=lite,
+            workers=workers,
+            skipper=skipper,
+            upload_queue_depth=upload_queue_depth,
+            bulk_qdrant=bulk_qdrant and upload_qdrant and not lite,
+        )
+        processed_ids.extend(parallel_ids)
+        failed_samples.extend(parallel_failed)
     else:
-        r_service = None
+        if not lite:
+            # A pool lets bedstat compute GC content while R is busy
+            r_service = RServicePool(workers=1)
+        else:
+            r_service = None
 
-    reference_genome_validator = ReferenceValidator()
+        reference_genome_validator = ReferenceValidator()
+        uploader = (
+            BackgroundUploader(upload_queue_depth) if upload_queue_depth else None
+        )
+        if bulk_qdrant and upload_qdrant and not lite:
+            qdrant_indexer = BulkQdrantIndexer(bbagent)
+        else:
+            qdrant_indexer = None
 
-    for i, pep_sample in enumerate(pep.samples):
-        is_processed = skipper.is_processed(pep_sample.sample_name)
-        if is_processed:
-            m.print_success(
-                f"Skipping {pep_sample.sample_name} : {is_processed}. Already processed."
-            )
-            processed_ids.append(is_processed)
-            continue
+        def report_uploads(results: list[UploadResult]) -> None:
+            for result in results:
+                if result.error:
+                    failed_samples.append(result.key)
+                    skipper.add_failed(result.key, result.error)
+                else:
+                    processed_ids.append(result.bed_digest)
+                    skipper.add_processed(result.key, result.bed_digest, success=True)
 
-        m.print_success(f"Processing sample {i + 1}/{len(pep.samples)}")
-        _LOGGER.info(f"Running bedboss pipeline for {pep_sample.sample_name}")
-        if pep_sample.get("file_type"):
-            if pep_sample.get("file_type").lower() == "narrowpeak":
-                is_narrow_peak = True
-            else:
-                is_narrow_peak = False
-        else:
-            is_narrow_peak = False
         try:
-            if pep_sample.get("file_size", None):
-                if int(pep_sample.file_size) > MAX_FILE_SIZE_QC:
-                    raise QualityException(
-                        f"File size {pep_sample.file_size} exceeds the maximum allowed size of {MAX_FILE_SIZE_QC}. Please provide a smaller file or set check_qc to False to skip this check."
+            for i, pep_sample in enumerate(pep.samples):
+                is_processed = skipper.is_processed(pep_sample.sample_name)
+                if is_processed:
+                    m.print_success(
+                        f"Skipping {pep_sample.sample_name} : {is_processed}. Already processed."
+                    )
+                    processed_ids.append(is_processed)
+                    continue
+
+                m.print_success(f"Processing sample {i + 1}/{len(pep.samples)}")
+                _LOGGER.info(f"Running bedboss pipeline for {pep_sample.sample_name}")
+                try:
+                    bed_id = run_all(
+                        bedbase_config=bbagent,
+                        pm=pm,
+                        r_service=r_service,
+                        reference_genome_validator=reference_genome_validator,
+                        uploader=uploader,
+                        upload_key=pep_sample.sample_name,
+                        qdrant_indexer=qdrant_indexer,
+                        **_pep_sample_kwargs(pep_sample, **sample_kwargs),
                     )
 
-            bed_id = run_all(
-                input_file=pep_sample.input_file,
-                input_type=pep_sample.input_type,
-                genome=pep_sample.genome,
-                name=pep_sample.sample_name,
-                bedbase_config=bbagent,
-                license_id=pep_sample.get("license_id") or license_id,
-                narrowpeak=is_narrow_peak,
-                chrom_sizes=pep_sample.get("chrom_sizes"),
-                open_signal_matrix=pep_sample.get("open_signal_matrix"),
-                other_metadata=pep_sample.to_dict(),
-                outfolder=output_folder,
-                rfg_config=rfg_config,
-                check_qc=check_qc,
-                ensdb=ensdb,
-                just_db_commit=just_db_commit,
-                force_overwrite=force_overwrite,
-                update=update,
-                upload_qdrant=upload_qdrant,
-                upload_s3=upload_s3,
-                universe=pep_sample.get("universe"),
-                universe_method=pep_sample.get("universe_method"),
-                universe_bedset=pep_sample.get("universe_bedset"),
-                lite=lite,
-                pm=pm,
-                r_service=r_service,
-                reference_genome_validator=reference_genome_validator,
-            )
-
-            processed_ids.append(bed_id)
-            skipper.add_processed(pep_sample.sample_name, bed_id, success=True)
+                    if not uploader:
+                        processed_ids.append(bed_id)
+                        skipper.add_processed(
+                            pep_sample.sample_name, bed_id, success=True
+                        )
 
-        except BedBossException as e:
-            _LOGGER.error(f"Failed to process {pep_sample.sample_name}. See {e}")
-            failed_samples.append(pep_sample.sample_name)
-            skipper.add_failed(pep_sample.sample_name, f"{e}")
+                except BedBossException as e:
+                    _LOGGER.error(
+                        f"Failed to process {pep_sample.sample_name}. See {e}"
+                    )
+                    failed_samples.append(pep_sample.sample_name)
+                    skipper.add_failed(pep_sample.sample_name, f"{e}")
+
+                if uploader:
+                    report_uploads(uploader.poll())
+        finally:
+            # also on unexpected errors, so no uploads are left running or unreported
+            if uploader:
+                # bedset can be created only from uploaded files
+                report_uploads(uploader.close())
+            if qdrant_indexer:
+                qdrant_indexer.flush()
+            if r_service:
+                r_service.terminate_service()
 
     if create_bedset:
         _LOGGER.info(f"Creating bedset from {pep.name}")
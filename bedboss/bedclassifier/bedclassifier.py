@@ -1,170 +1,353 @@
+import codecs
+import gzip
 import logging
+from typing import Callable
 
 import pandas as pd
 
 from bedboss.exceptions import BedTypeException
-from bedboss.models import DATA_FORMAT, BedClassificationOutput
+from bedboss.models import (
+    DATA_FORMAT,
+    BedClassificationOutput,
+    BedFileHeader,
+    ParsedBed,
+)
 
 _LOGGER = logging.getLogger("bedboss")
 
+# header rows are found in the first bytes of the file
+BED_SNIFF_BYTES = 64 * 1024
+MAX_HEADER_ROWS = 5
 
-def get_bed_classification(
-    bed: str | pd.DataFrame,
-    no_fail: bool | None = True,
-) -> BedClassificationOutput:
+# regex patterns for comma separated lists of numbers (blockSizes, blockStarts)
+REGEX_BLOCKS = r"^(0(,\d+)*|\d+(,\d+)*)?,?$"
+# regex patterns for 255,255,255 or 0 for colors: ([0, 255], [0, 255], [0, 255]) | 0
+REGEX_COLORS = r"^(?:\d|[1-9]\d|1\d{2}|2[0-4]\d|25[0-5])(?:,(?:\d|[1-9]\d|1\d{2}|2[0-4]\d|25[0-5])){0,2}$"
+
+# column index -> checks of the column. 12 and 13 are also applied to the extra
+# columns of ENCODE formats
+COLUMN_CHECKS: dict[int, list[Callable[[pd.Series], bool]]] = {
+    0: [lambda col: col.astype(str).str.match(r"[A-Za-z0-9_]{1,255}").all()],
+    1: [lambda col: col.dtype == "int" and (col >= 0).all()],
+    2: [lambda col: col.dtype == "int" and (col >= 0).all()],
+    3: [lambda col: col.astype(str).str.match(r"[\x20-\x7e]{1,255}").all()],
+    4: [
+        lambda col: col.dtype == "int" and col.between(0, 1000).all(),
+    ],
+    5: [lambda col: col.isin(["+", "-", "."]).all()],
+    6: [lambda col: col.dtype == "int" and (col >= 0).all()],
+    7: [lambda col: col.dtype == "int" and (col >= 0).all()],
+    8: [lambda col: col.astype(str).str.match(REGEX_COLORS).all()],
+    9: [lambda col: col.dtype == "int"],
+    10: [lambda col: col.astype(str).str.match(REGEX_BLOCKS).all()],
+    11: [lambda col: col.astype(str).str.match(REGEX_BLOCKS).all()],
+    12: [lambda col: pd.api.types.is_float_dtype(col.dtype) or (col == -1).all()],
+    13: [lambda col: col.dtype == "int" and col.iloc[0] != -1],
+}
+
+
+def sniff_bed_file(filepath: str) -> BedFileHeader | None:
     """
-    Get the BED file classification as a Pydantic object.
+    Find the encoding and the first data row of a BED file from its first bytes.
+
+    Up to 5 header rows are skipped: the data starts at the first row that has at least
+    as many fields as every row after it, since pandas can't parse rows with more
+    fields than the first one.
 
     Args:
-        bed: Path to the bed file, or a dataframe.
-        no_fail: Should the function (and pipeline) continue if this function fails to parse BED file.
+        filepath: Path to the bed file (can be gzipped).
 
     Returns:
-        BedClassificationOutput object.
+        BedFileHeader object, or None if no rows can be parsed.
     """
-    #    column format for bed12
-    #    string chrom;       "Reference sequence chromosome or scaffold"
-    #    uint   chromStart;  "Start position in chromosome"
-    #    uint   chromEnd;    "End position in chromosome"
-    #    string name;        "Name of item."
-    #    uint score;          "Score (0-1000)"
-    #    char[1] strand;     "+ or - for strand"
-    #    uint thickStart;   "Start of where display should be thick (start codon)"
-    #    uint thickEnd;     "End of where display should be thick (stop codon)"
-    #    uint reserved;     "Used as itemRgb as of 2004-11-22"
-    #    int blockCount;    "Number of blocks"
-    #    int[blockCount] blockSizes; "Comma separated list of block sizes"
-    #    int[blockCount] chromStarts; "Start positions relative to chromStart"
-
-    def _read_bed_file(filepath: str, skiprows: int = 0) -> pd.DataFrame | None:
-        """
-        Helper function to read BED file with error handling.
+    with open(filepath, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if compressed else open
+    with opener(filepath, "rb") as f:
+        prefix = f.read(BED_SNIFF_BYTES)
 
-        Args:
-            filepath: Path to the bed file.
-            skiprows: How many rows to skip during reading.
-
-        Returns:
-            DataFrame, or None on parse error.
-        """
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encodings = ["utf-16"]
+    else:
+        encodings = ["utf-8", "utf-16"]
+    for encoding in encodings:
         try:
-            df = pd.read_csv(
-                filepath, sep="\t", header=None, low_memory=False, skiprows=skiprows
-            )
-            if skiprows > 0:
-                _LOGGER.info(f"Skipped {skiprows} rows to parse bed file {filepath}")
-            return df
+            text = codecs.getincrementaldecoder(encoding)().decode(prefix)
+            break
         except UnicodeDecodeError:
-            try:
-                df = pd.read_csv(
-                    filepath,
-                    sep="\t",
-                    header=None,
-                    nrows=4,
-                    skiprows=skiprows,
-                    encoding="utf-16",
-                )
-                if skiprows > 0:
-                    _LOGGER.info(
-                        f"Skipped {skiprows} rows to parse bed file {filepath}"
-                    )
-                return df
-            except (pd.errors.ParserError, pd.errors.EmptyDataError):
-                return None
-        except (pd.errors.ParserError, pd.errors.EmptyDataError):
-            return None
-
-    if isinstance(bed, str):
-        max_rows = 5
-        for row_count in range(max_rows + 1):
-            df = _read_bed_file(bed, row_count)
-            if df is not None:
-                break
-        else:
-            if no_fail:
-                _LOGGER.warning(
-                    f"Unable to parse bed file {bed}, setting data_format = unknown_data_format"
-                )
-                return BedClassificationOutput(
-                    bed_compliance="unknown_bed_compliance",
-                    data_format="unknown_data_format",
-                    compliant_columns=0,
-                    non_compliant_columns=0,
-                )
-            else:
-                raise BedTypeException(
-                    reason=f"Data format could not be determined for {bed}"
-                )
-    elif isinstance(bed, pd.DataFrame):
-        df = bed
+            continue
     else:
-        if no_fail:
-            return BedClassificationOutput(
-                bed_compliance="unknown_bed_compliance",
-                data_format="unknown_data_format",
-                compliant_columns=0,
-                non_compliant_columns=0,
+        return None
+
+    lines = text.split("\n")
+    if len(prefix) == BED_SNIFF_BYTES:
+        # the last line is incomplete
+        lines = lines[:-1]
+    # pandas skips empty lines, but they count in skiprows
+    widths = [
+        len(line.rstrip("\r").split("\t")) if line.rstrip("\r") else None
+        for line in lines
+    ]
+
+    for skiprows in range(MAX_HEADER_ROWS + 1):
+        data_widths = [width for width in widths[skiprows:] if width]
+        if data_widths and data_widths[0] >= max(data_widths):
+            return BedFileHeader(
+                encoding=encoding, skiprows=skiprows, num_cols=data_widths[0]
             )
+    return None
+
+
+def read_bed_dataframe(filepath: str) -> pd.DataFrame | None:
+    """
+    Read all columns of a BED file, skipping up to 5 header rows.
+
+    Header rows and encoding are found from the first bytes of the file, so the file is
+    parsed only once.
+
+    Args:
+        filepath: Path to the bed file.
+
+    Returns:
+        DataFrame, or None if the file can't be parsed.
+    """
+    header = sniff_bed_file(filepath)
+    if header is None:
+        return None
+    try:
+        df = pd.read_csv(
+            filepath,
+            sep="\t",
+            header=None,
+            low_memory=False,
+            skiprows=header.skiprows,
+            encoding=header.encoding,
+        )
+    except (
+        pd.errors.ParserError,
+        pd.errors.EmptyDataError,
+        UnicodeDecodeError,
+    ) as e:
+        _LOGGER.warning(f"Unable to parse bed file {filepath}: {e}")
+        return None
+    if header.skiprows > 0:
+        _LOGGER.info(f"Skipped {header.skiprows} rows to parse bed file {filepath}")
+    return df
+
+
+class _StreamedColumn:
+    """
+    Column check results of one column, combined over the chunks of a file.
+    """
+
+    def __init__(self):
+        self.has_values = False
+        self.dtypes = set()
+        self.first_value = None
+        self.all_minus_one = True
+        self.pending = set()
+        self.failed = set()
+
+    def observe(self, col: pd.Series) -> None:
+        """
+        Update dtype and missing value information with a chunk of the column.
+
+        Args:
+            col: Chunk of the column.
+        """
+        if not self.dtypes:
+            self.first_value = col.iloc[0]
+        self.has_values = self.has_values or bool(col.notna().any())
+        if col.dtype == "int":
+            self.dtypes.add("int")
+        elif pd.api.types.is_float_dtype(col.dtype):
+            self.dtypes.add("float")
         else:
-            raise BedTypeException(reason="Input is not a string or dataframe.")
+            self.dtypes.add("other")
+        if self.all_minus_one:
+            self.all_minus_one = bool((col == -1).all())
 
-    df = df.dropna(axis=1, how="all")
-    df.columns = range(len(df.columns))
-    num_cols = len(df.columns)
-    compliant_columns = 0
-    bed_format_named = DATA_FORMAT.UCSC_BED
-    relaxed = False
+    def run_checks(self, col: pd.Series) -> None:
+        """
+        Run pending checks on a chunk of the column. A check that fails in one chunk
+        fails for the whole column, so it is not run again.
 
-    def _check_column(col_index: int, checks: list) -> bool:
+        Args:
+            col: Chunk of the column.
         """
-        Helper function to perform column checks.
+        for check_index in list(self.pending):
+            if not all(check(col) for check in COLUMN_CHECKS[check_index]):
+                self.pending.discard(check_index)
+                self.failed.add(check_index)
+
+    def passes(self, check_index: int) -> bool:
+        """
+        Result of a check for the whole column.
+
+        Checks 12 and 13 depend on the dtype of the whole column: it is int only if
+        every chunk is int, and float if no chunk is text and at least one is float.
 
         Args:
-            col_index: Index of the column.
-            checks: List of check functions.
+            check_index: Index of the checks in COLUMN_CHECKS.
 
         Returns:
-            True if all checks pass, False otherwise.
+            True if the column passes the checks.
         """
-        for check in checks:
-            if not check(df[col_index]):
-                return False
-        return True
+        if check_index == 12:
+            return (
+                "float" in self.dtypes and "other" not in self.dtypes
+            ) or self.all_minus_one
+        if check_index == 13:
+            return self.dtypes == {"int"} and self.first_value != -1
+        return check_index not in self.failed
+
+
+def _candidate_checks(col_index: int) -> set[int]:
+    """
+    Checks from COLUMN_CHECKS that can be run on a column at col_index (12 and 13 are
+    computed from column dtypes).
+
+    Args:
+        col_index: Index of the column.
+
+    Returns:
+        Set of check indexes.
+    """
+    checks = {col_index} if col_index < 12 else set()
+    if col_index == 4:
+        checks.add(9)
+    return checks
+
+
+def _skip_unneeded_checks(columns: list[_StreamedColumn]) -> None:
+    """
+    Stop checking columns after the first non-compliant column of bed6, since
+    classification ends there. Only done once no column can be dropped as empty,
+    so column indexes are final.
 
-    # regex patterns for 255,255,255 or 0 for colors: ([0, 255], [0, 255], [0, 255]) | 0
-    REGEX_COLORS = r"^(?:\d|[1-9]\d|1\d{2}|2[0-4]\d|25[0-5])(?:,(?:\d|[1-9]\d|1\d{2}|2[0-4]\d|25[0-5])){0,2}$"
-
-    column_checks = {
-        0: [lambda col: col.astype(str).str.match(r"[A-Za-z0-9_]{1,255}").all()],
-        1: [lambda col: col.dtype == "int" and (col >= 0).all()],
-        2: [lambda col: col.dtype == "int" and (col >= 0).all()],
-        3: [lambda col: col.astype(str).str.match(r"[\x20-\x7e]{1,255}").all()],
-        4: [
-            lambda col: col.dtype == "int" and col.between(0, 1000).all(),
-        ],
-        5: [lambda col: col.isin(["+", "-", "."]).all()],
-        6: [lambda col: col.dtype == "int" and (col >= 0).all()],
-        7: [lambda col: col.dtype == "int" and (col >= 0).all()],
-        8: [lambda col: col.astype(str).str.match(REGEX_COLORS).all()],
-        9: [lambda col: col.dtype == "int"],
-        10: [
-            lambda col: col.astype(str).str.match(r"^(0(,\d+)*|\d+(,\d+)*)?,?$").all()
-        ],
-        11: [
-            lambda col: col.astype(str).str.match(r"^(0(,\d+)*|\d+(,\d+)*)?,?$").all()
-        ],
-        12: [lambda col: pd.api.types.is_float_dtype(col.dtype) or (col == -1).all()],
-        13: [lambda col: col.dtype == "int" and col.iloc[0] != -1],
-    }
+    Args:
+        columns: Columns of the file.
+    """
+    if not all(column.has_values for column in columns):
+        return
+    for col_index, column in enumerate(columns[:6]):
+        if not column.passes(col_index) and not (col_index == 4 and column.passes(9)):
+            for later_column in columns[col_index + 1 :]:
+                later_column.pending.clear()
+            return
+
+
+def _classify_chunks(chunks, num_cols: int) -> BedClassificationOutput | None:
+    """
+    Classify a BED file read in chunks, keeping only the check results of each column.
+
+    Args:
+        chunks: Iterator of DataFrame chunks, with one extra column after num_cols.
+        num_cols: Number of columns in the first row.
+
+    Returns:
+        BedClassificationOutput object, or None if there are no rows.
+
+    Raises:
+        pd.errors.ParserError: If a row has more fields than the first row.
+    """
+    columns = None
+    for chunk in chunks:
+        if chunk[num_cols].notna().any():
+            raise pd.errors.ParserError(
+                f"Expected {num_cols} fields, found a row with more fields"
+            )
+        if columns is None:
+            columns = [_StreamedColumn() for _ in range(num_cols)]
+            for col_index, column in enumerate(columns):
+                column.observe(chunk[col_index])
+            # empty columns are dropped, so a column can move to a lower index
+            empty_before = 0
+            for col_index, column in enumerate(columns):
+                for final_index in range(col_index - empty_before, col_index + 1):
+                    column.pending |= _candidate_checks(final_index)
+                empty_before += not column.has_values
+        else:
+            for col_index, column in enumerate(columns):
+                column.observe(chunk[col_index])
+
+        for col_index, column in enumerate(columns):
+            column.run_checks(chunk[col_index])
+        _skip_unneeded_checks(columns)
+
+    if columns is None:
+        return None
+    columns = [column for column in columns if column.has_values]
+    return _classify_columns(
+        len(columns),
+        lambda col_index, check_index: columns[col_index].passes(check_index),
+    )
+
+
+def _classify_streaming(
+    filepath: str, chunksize: int
+) -> BedClassificationOutput | None:
+    """
+    Classify a BED file reading chunksize rows at a time, skipping up to 5 header rows.
+
+    Args:
+        filepath: Path to the bed file.
+        chunksize: Number of rows in a chunk.
+
+    Returns:
+        BedClassificationOutput object, or None if the file can't be parsed.
+    """
+    header = sniff_bed_file(filepath)
+    if header is None:
+        return None
+    try:
+        # pandas doesn't report rows with more fields than the first row if they
+        # start a chunk, so one more column is read and checked to be empty
+        with pd.read_csv(
+            filepath,
+            sep="\t",
+            header=None,
+            names=range(header.num_cols + 1),
+            skiprows=header.skiprows,
+            encoding=header.encoding,
+            chunksize=chunksize,
+        ) as chunks:
+            classification = _classify_chunks(chunks, header.num_cols)
+    except (
+        pd.errors.ParserError,
+        pd.errors.EmptyDataError,
+        UnicodeDecodeError,
+    ) as e:
+        _LOGGER.warning(f"Unable to parse bed file {filepath}: {e}")
+        return None
+    if header.skiprows > 0:
+        _LOGGER.info(f"Skipped {header.skiprows} rows to parse bed file {filepath}")
+    return classification
+
+
+def _classify_columns(
+    num_cols: int, check: Callable[[int, int], bool]
+) -> BedClassificationOutput:
+    """
+    Classify a BED file from the results of the column checks.
+
+    Args:
+        num_cols: Number of columns (without empty columns).
+        check: Function (col_index, check_index) -> True if column col_index
+            passes all checks of COLUMN_CHECKS[check_index].
+
+    Returns:
+        BedClassificationOutput object.
+    """
+    compliant_columns = 0
+    bed_format_named = DATA_FORMAT.UCSC_BED
+    relaxed = False
 
     for col_index in range(num_cols):
-        checks = column_checks.get(col_index, [])
-        if _check_column(col_index, checks) and col_index < 12:
+        if col_index < 12 and check(col_index, col_index):
             compliant_columns += 1
 
-        elif (
-            col_index == 4 and df[col_index].dtype == "int" and df[col_index].all() >= 0
-        ):
+        elif col_index == 4 and check(4, 9):
             compliant_columns += 1
             relaxed = True
 
@@ -174,10 +357,10 @@ def get_bed_classification(
                 if (
                     num_cols == 10
                     and col_index == 6
-                    and _check_column(6, column_checks[12])
-                    and _check_column(7, column_checks[12])
-                    and _check_column(8, column_checks[12])
-                    and _check_column(9, column_checks[9])
+                    and check(6, 12)
+                    and check(7, 12)
+                    and check(8, 12)
+                    and check(9, 9)
                 ):
                     bed_format_named = (
                         DATA_FORMAT.ENCODE_NARROWPEAK_RS
@@ -191,11 +374,7 @@ def get_bed_classification(
                         non_compliant_columns=nccols,
                     )
                 elif num_cols == 9 and col_index == 6:
-                    if (
-                        _check_column(6, column_checks[12])
-                        and _check_column(7, column_checks[12])
-                        and _check_column(8, column_checks[12])
-                    ):
+                    if check(6, 12) and check(7, 12) and check(8, 12):
                         bed_format_named = (
                             DATA_FORMAT.ENCODE_BROADPEAK_RS
                             if relaxed
@@ -207,11 +386,7 @@ def get_bed_classification(
                             compliant_columns=compliant_columns,
                             non_compliant_columns=nccols,
                         )
-                    elif (
-                        _check_column(6, column_checks[12])
-                        and _check_column(7, column_checks[12])
-                        and _check_column(8, column_checks[13])
-                    ):
+                    elif check(6, 12) and check(7, 12) and check(8, 13):
                         bed_format_named = (
                             DATA_FORMAT.ENCODE_RNA_ELEMENTS_RS
                             if relaxed
@@ -226,9 +401,9 @@ def get_bed_classification(
                 elif (
                     num_cols == 15
                     and col_index == 12
-                    and _check_column(12, column_checks[12])
-                    and _check_column(13, column_checks[12])
-                    and _check_column(14, column_checks[12])
+                    and check(12, 12)
+                    and check(13, 12)
+                    and check(14, 12)
                 ):
                     bed_format_named = (
                         DATA_FORMAT.ENCODE_GAPPEDPEAK_RS
@@ -260,3 +435,107 @@ def get_bed_classification(
         compliant_columns=compliant_columns,
         non_compliant_columns=0,
     )
+
+
+def _classify_dataframe(df: pd.DataFrame) -> BedClassificationOutput:
+    """
+    Classify a BED file loaded into a DataFrame.
+
+    Args:
+        df: DataFrame with all columns of the file.
+
+    Returns:
+        BedClassificationOutput object.
+    """
+    df = df.dropna(axis=1, how="all")
+    df.columns = range(len(df.columns))
+
+    def _check_column(col_index: int, check_index: int) -> bool:
+        """
+        Helper function to perform column checks.
+
+        Args:
+            col_index: Index of the column.
+            check_index: Index of the checks in COLUMN_CHECKS.
+
+        Returns:
+            True if all checks pass, False otherwise.
+        """
+        for check in COLUMN_CHECKS[check_index]:
+            if not check(df[col_index]):
+                return False
+        return True
+
+    return _classify_columns(len(df.columns), _check_column)
+
+
+def get_bed_classification(
+    bed: str | pd.DataFrame | ParsedBed,
+    no_fail: bool | None = True,
+    chunksize: int | None = None,
+) -> BedClassificationOutput:
+    """
+    Get the BED file classification as a Pydantic object.
+
+    Args:
+        bed: Path to the bed file, dataframe, or ParsedBed object (the file is not read again).
+        no_fail: Should the function (and pipeline) continue if this function fails to parse BED file.
+        chunksize: If set, a bed file path is read chunksize rows at a time and only the
+            column check results are kept, so memory use doesn't grow with the file size.
+
+    Returns:
+        BedClassificationOutput object.
+    """
+    #    column format for bed12
+    #    string chrom;       "Reference sequence chromosome or scaffold"
+    #    uint   chromStart;  "Start position in chromosome"
+    #    uint   chromEnd;    "End position in chromosome"
+    #    string name;        "Name of item."
+    #    uint score;          "Score (0-1000)"
+    #    char[1] strand;     "+ or - for strand"
+    #    uint thickStart;   "Start of where display should be thick (start codon)"
+    #    uint thickEnd;     "End of where display should be thick (stop codon)"
+    #    uint reserved;     "Used as itemRgb as of 2004-11-22"
+    #    int blockCount;    "Number of blocks"
+    #    int[blockCount] blockSizes; "Comma separated list of block sizes"
+    #    int[blockCount] chromStarts; "Start positions relative to chromStart"
+
+    if isinstance(bed, (str, ParsedBed)):
+        if isinstance(bed, ParsedBed):
+            df, bed = bed.data, bed.bed_file
+        elif chunksize:
+            classification = _classify_streaming(bed, chunksize)
+            if classification is not None:
+                return classification
+            df = None
+        else:
+            df = read_bed_dataframe(bed)
+        if df is None:
+            if no_fail:
+                _LOGGER.warning(
+                    f"Unable to parse bed file {bed}, setting data_format = unknown_data_format"
+                )
+                return BedClassificationOutput(
+                    bed_compliance="unknown_bed_compliance",
+                    data_format="unknown_data_format",
+                    compliant_columns=0,
+                    non_compliant_columns=0,
+                )
+            else:
+                raise BedTypeException(
+                    reason=f"Data format could not be determined for {bed}"
+                )
+    elif isinstance(bed, pd.DataFrame):
+        df = bed
+    else:
+        if no_fail:
+            return BedClassificationOutput(
+                bed_compliance="unknown_bed_compliance",
+                data_format="unknown_data_format",
+                compliant_columns=0,
+                non_compliant_columns=0,
+            )
+        else:
+            raise BedTypeException(reason="Input is not a string or dataframe.")
+
+    return _classify_dataframe(df)
@@ -3,14 +3,20 @@ import logging
 import os
 import shutil
 from pathlib import Path
+from typing import Callable
 
+import numpy as np
+import pandas as pd
 import pypiper
 from geniml.bbclient import BBClient
 from gtars.models import RegionSet
 from refgenconf.exceptions import MissingGenomeError
 from ubiquerg import is_command_callable
 
-from bedboss.bedclassifier.bedclassifier import get_bed_classification
+from bedboss.bedclassifier.bedclassifier import (
+    get_bed_classification,
+    read_bed_dataframe,
+)
 from bedboss.bedmaker.const import (
     BEDGRAPH_TEMPLATE,
     BIGBED_FOLDER_NAME,
@@ -21,8 +27,16 @@ from bedboss.bedmaker.const import (
 )
 from bedboss.bedmaker.models import BedMakerOutput, InputTypes
 from bedboss.bedmaker.utils import get_chrom_sizes
-from bedboss.const import MAX_FILE_SIZE, MAX_REGION_NUMBER, MIN_REGION_WIDTH
+from bedboss.checkpoints import StageCheckpoint
+from bedboss.const import (
+    CLASSIFIER_CHUNK_SIZE,
+    CLASSIFIER_STREAMING_SIZE,
+    MAX_FILE_SIZE,
+    MAX_REGION_NUMBER,
+    MIN_REGION_WIDTH,
+)
 from bedboss.exceptions import BedBossException, QualityException, RequirementsException
+from bedboss.models import DATA_FORMAT, BedClassificationOutput, ParsedBed
 
 _LOGGER = logging.getLogger("bedboss")
 
@@ -243,6 +257,56 @@ def make_bed(
     return output_path, bed_id, bed_obj
 
 
+def parse_bed(
+    bed_file: str, bed_object: RegionSet
+) -> tuple[ParsedBed, BedClassificationOutput]:
+    """
+    Parse all columns of the BED file once and classify it, so that later steps don't read it again.
+
+    Only the region columns (chromosome, start, end) and column dtypes are kept afterwards,
+    the full DataFrame is released. Files larger than CLASSIFIER_STREAMING_SIZE are
+    classified chunk by chunk instead, and their region columns are read by bedstat.
+
+    Args:
+        bed_file: Path to the BED file.
+        bed_object: RegionSet of the file, created by bedmaker.
+
+    Returns:
+        ParsedBed object and bed classification.
+    """
+    if os.path.getsize(bed_file) > CLASSIFIER_STREAMING_SIZE:
+        _LOGGER.info(f"Classifying large bed file {bed_file} in chunks")
+        return (
+            ParsedBed(bed_file=bed_file, bed_object=bed_object),
+            get_bed_classification(bed_file, chunksize=CLASSIFIER_CHUNK_SIZE),
+        )
+
+    data = read_bed_dataframe(bed_file)
+    if data is None:
+        _LOGGER.warning(f"Unable to parse all columns of bed file {bed_file}")
+    parsed_bed = ParsedBed(
+        bed_file=bed_file,
+        bed_object=bed_object,
+        data=data,
+        column_dtypes=[str(dtype) for dtype in data.dtypes] if data is not None else [],
+    )
+    bed_classification = get_bed_classification(parsed_bed)
+
+    if (
+        data is not None
+        and len(data.columns) >= 3
+        and pd.api.types.is_integer_dtype(data[1])
+        and pd.api.types.is_integer_dtype(data[2])
+    ):
+        chrom_codes, chrom_names = pd.factorize(data[0].astype(str), sort=True)
+        parsed_bed.chrom_codes = chrom_codes.astype(np.int32)
+        parsed_bed.chrom_names = [str(name) for name in chrom_names]
+        parsed_bed.starts = data[1].to_numpy(dtype=np.int64)
+        parsed_bed.ends = data[2].to_numpy(dtype=np.int64)
+    parsed_bed.data = None
+    return parsed_bed, bed_classification
+
+
 def make_all(
     input_file: str,
     input_type: str,
@@ -254,6 +318,8 @@ def make_all(
     check_qc: bool = True,
     lite: bool = False,
     pm: pypiper.PipelineManager = None,
+    checkpoint_inputs: dict = None,
+    skip: Callable[[str], bool] = None,
 ) -> BedMakerOutput:
     """
     Maker of bed and bigbed files.
@@ -272,6 +338,11 @@ def make_all(
         check_qc: Run quality control during bedmaking.
         lite: Run the pipeline in lite mode (without producing bigBed files).
         pm: Pypiper object.
+        checkpoint_inputs: If provided, classification and bigBed stages are checkpointed in
+            output_path/checkpoints, and reused by a later run with the same inputs.
+        skip: Function called with the bed digest as soon as the file is converted. If it returns
+            True (e.g. the file is already processed), classification, QC and the bigBed are
+            skipped, and the output is marked as skipped.
 
     Returns:
         BedMakerOutput object with bed_compliance, data_format, bed_file, bigbed_file, and bed_digest.
@@ -296,7 +367,40 @@ def make_all(
         chrom_sizes=chrom_sizes,
         pm=pm,
     )
-    bed_classification = get_bed_classification(output_bed)
+    if checkpoint_inputs is not None:
+        checkpoint = StageCheckpoint(output_path, bed_id, inputs=checkpoint_inputs)
+    else:
+        checkpoint = None
+
+    if skip and skip(bed_id):
+        if checkpoint:
+            checkpoint.clear()
+        if pm_clean:
+            pm.stop_pipeline()
+        return BedMakerOutput(
+            bed_object=bed_obj,
+            bed_file=output_bed,
+            bed_digest=bed_id,
+            compliant_columns=0,
+            non_compliant_columns=0,
+            data_format=DATA_FORMAT.UNKNOWN,
+            skipped=True,
+        )
+
+    if checkpoint:
+        checkpoint.save("bedmaker", {"bed_file": os.path.abspath(output_bed)})
+
+    if checkpoint and checkpoint.is_done("classification"):
+        _LOGGER.info("Using checkpointed bed classification")
+        parsed_bed = None
+        bed_classification = BedClassificationOutput(**checkpoint.get("classification"))
+    else:
+        parsed_bed, bed_classification = parse_bed(output_bed, bed_obj)
+        if checkpoint:
+            checkpoint.save(
+                "classification", bed_classification.model_dump(mode="json")
+            )
+
     if check_qc:
         try:
             file_size = os.path.getsize(output_bed)
@@ -325,6 +429,13 @@ def make_all(
     if lite:
         _LOGGER.info("Skipping bigBed generation due to lite mode.")
         output_bigbed = None
+    elif (
+        checkpoint
+        and checkpoint.get("bigbed")
+        and os.path.exists(checkpoint.get("bigbed"))
+    ):
+        _LOGGER.info("Using checkpointed bigBed file")
+        output_bigbed = checkpoint.get("bigbed")
     else:
         try:
             bigbed_folder_path = os.path.join(
@@ -341,6 +452,9 @@ def make_all(
             )
         except BedBossException:
             output_bigbed = None
+        # a failed build isn't checkpointed, so it's retried on rerun
+        if checkpoint and output_bigbed:
+            checkpoint.save("bigbed", os.path.abspath(output_bigbed))
     if pm_clean:
         pm.stop_pipeline()
 
@@ -349,6 +463,7 @@ def make_all(
 
     return BedMakerOutput(
         bed_object=bed_obj,
+        parsed_bed=parsed_bed,
         bed_file=output_bed,
         bigbed_file=os.path.abspath(output_bigbed) if output_bigbed else None,
         bed_digest=bed_id,
@@ -356,4 +471,5 @@ def make_all(
         compliant_columns=bed_classification.compliant_columns,
         non_compliant_columns=bed_classification.non_compliant_columns,
         data_format=bed_classification.data_format,
+        checkpoint=checkpoint,
     )
@@ -4,7 +4,8 @@ from pathlib import Path
 from gtars.models import RegionSet
 from pydantic import BaseModel, ConfigDict, Field
 
-from bedboss.models import DATA_FORMAT
+from bedboss.checkpoints import StageCheckpoint
+from bedboss.models import DATA_FORMAT, ParsedBed
 
 
 class InputTypes(Enum):
@@ -17,6 +18,7 @@ class InputTypes(Enum):
 
 class BedMakerOutput(BaseModel):
     bed_object: str | RegionSet
+    parsed_bed: ParsedBed | None = None
     bed_file: str | Path
     bigbed_file: str | Path | None = None
     bed_digest: str = None
@@ -26,5 +28,8 @@ class BedMakerOutput(BaseModel):
     compliant_columns: int
     non_compliant_columns: int
     data_format: DATA_FORMAT
+    checkpoint: StageCheckpoint | None = None
+    # True if the file was skipped after conversion, without classification, QC and bigBed
+    skipped: bool = False
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -1,14 +1,25 @@
 import json
 import logging
 import os
-import statistics
 from pathlib import Path
 
 import pypiper
 from gtars.models import RegionSet
 
 from bedboss.bedstat.gc_content import calculate_gc_content, create_gc_plot
-from bedboss.bedstat.r_service import RServiceManager
+from bedboss.bedstat.genome_annotation import gtf_available, load_genome_annotation
+from bedboss.bedstat.models import GCContentSummary, RegionArrays
+from bedboss.bedstat.native_stats import (
+    calc_region_stats,
+    read_region_arrays,
+    write_region_stats,
+)
+from bedboss.bedstat.r_service import RServiceManager, RServicePool
+from bedboss.bedstat.result_cache import (
+    bedstat_version_stamp,
+    load_cached_stats,
+    save_cached_stats,
+)
 from bedboss.const import (
     BEDSTAT_OUTPUT,
     HOME_PATH,
@@ -18,8 +29,10 @@ from bedboss.const import (
     OS_HG38,
     OS_MM10,
     OUTPUT_FOLDER_NAME,
+    R_ANNOTATED_GENOMES,
 )
 from bedboss.exceptions import BedBossException, OpenSignalMatrixException
+from bedboss.models import ParsedBed
 from bedboss.utils import download_file
 
 _LOGGER = logging.getLogger("bedboss")
@@ -79,7 +92,11 @@ def bedstat(
     just_db_commit: bool = False,
     rfg_config: str | Path = None,
     pm: pypiper.PipelineManager = None,
-    r_service: RServiceManager = None,
+    r_service: RServiceManager | RServicePool = None,
+    native_stats: bool = False,
+    spill_gc_values: bool = False,
+    parsed_bed: ParsedBed = None,
+    use_cache: bool = False,
 ) -> dict:
     """
     Run bedstat pipeline — pipeline for obtaining statistics about bed files and inserting them into the database.
@@ -94,7 +111,18 @@ def bedstat(
         just_db_commit: If True, the pipeline will only commit to the database.
         rfg_config: Path to the refgenie config file.
         pm: Pypiper object.
-        r_service: RServiceManager object.
+        r_service: RServiceManager or RServicePool object. The R job is submitted without blocking,
+            so GC content is computed while R is working.
+        native_stats: Compute statistics with NumPy instead of regionstat.R. R plots are not created.
+            TSS distance and partitions require the ensdb GTF file: without it, genomes annotated
+            in R GenomicDistributionsData (hg19, hg38, mm10, mm9) are processed with R, so
+            these statistics are not missing.
+        spill_gc_values: Save GC content of every region to <digest>_gc_content.npy in the output folder.
+        parsed_bed: BED file already parsed by bedmaker. If provided, the file is not parsed again.
+        use_cache: Reuse statistics and plots computed earlier for the same digest, and cache new results
+            (in BEDBOSS_CACHE/bedstat_cache). Results are reused only if bedboss, R packages and
+            annotation inputs didn't change. All files of the output folder are copied into the cache,
+            which is limited only by `bedboss evict-stats-cache`. Default: False.
 
     Returns:
         Dict with statistics and plots metadata.
@@ -116,13 +144,20 @@ def bedstat(
             )
     # open_signal_matrix = None
 
+    if native_stats and not gtf_available(ensdb) and genome in R_ANNOTATED_GENOMES:
+        _LOGGER.warning(
+            f"Ensembl annotation gtf file not provided for {genome}. "
+            "Using R statistics with GenomicDistributions annotation instead of native statistics"
+        )
+        native_stats = False
+
     # Used to stop pipeline bedstat is used independently
     if not pm:
         stop_pipeline = True
     else:
         stop_pipeline = False
 
-    bed_object = RegionSet(bedfile)
+    bed_object = parsed_bed.bed_object if parsed_bed else RegionSet(bedfile)
 
     if not bed_digest:
         bed_digest = bed_object.identifier
@@ -138,7 +173,58 @@ def bedstat(
     json_plots_file_path = os.path.abspath(
         os.path.join(outfolder_stats_results, bed_digest + "_plots.json")
     )
-    if not just_db_commit:
+
+    cache_stamp = None
+    if use_cache and not just_db_commit:
+        cache_stamp = bedstat_version_stamp(
+            genome=genome,
+            native_stats=native_stats,
+            ensdb=ensdb,
+            open_signal_matrix=open_signal_matrix,
+            rfg_config=rfg_config,
+            spill_gc_values=spill_gc_values,
+        )
+        cached_data = load_cached_stats(
+            bed_digest, cache_stamp, outfolder_stats_results
+        )
+        if cached_data is not None:
+            _LOGGER.info(f"#=>>> Using cached statistics for: '{bed_digest}'")
+            if "gc_content" not in cached_data:
+                # GC content can fail for transient reasons, so only it is computed again
+                _LOGGER.info(f"#=>>> Computing missing GC content for: '{bed_digest}'")
+                gc_summary = _calculate_gc_summary(
+                    read_region_arrays(parsed_bed or bedfile),
+                    genome=genome,
+                    rfg_config=rfg_config,
+                    outfolder=outfolder_stats_results,
+                    bed_digest=bed_digest,
+                    spill_gc_values=spill_gc_values,
+                )
+                if _add_gc_content(
+                    cached_data, gc_summary, bed_digest, outfolder_stats_results
+                ):
+                    save_cached_stats(
+                        bed_digest,
+                        cache_stamp,
+                        outfolder_stats_results,
+                        cached_data,
+                        replace=True,
+                    )
+            return cached_data
+
+    # regions are read once and shared by native statistics and GC content
+    regions = read_region_arrays(parsed_bed or bedfile)
+
+    r_future = None
+    if not just_db_commit and native_stats:
+        _LOGGER.info("#=>>> Running native statistics")
+        region_stats = calc_region_stats(
+            regions,
+            digest=bed_digest,
+            annotation=load_genome_annotation(genome=genome, gtf_path=ensdb),
+        )
+        write_region_stats(region_stats, json_file_path)
+    elif not just_db_commit:
         if not pm:
             pm_out_path = os.path.abspath(
                 os.path.join(outfolder_stats, "pypiper", bed_digest)
@@ -178,7 +264,7 @@ def bedstat(
                 raise BedBossException(f"Pipeline failed: {e}")
         else:
             _LOGGER.info("#=>>> Running R service ")
-            r_service.run_file(
+            r_future = r_service.submit(
                 file_path=bedfile,
                 digest=bed_digest,
                 outpath=outfolder_stats_results,
@@ -187,6 +273,19 @@ def bedstat(
                 gtffile=ensdb,
             )
 
+    # GC content doesn't depend on the R results, so it is computed while R is working
+    gc_summary = _calculate_gc_summary(
+        regions,
+        genome=genome,
+        rfg_config=rfg_config,
+        outfolder=outfolder_stats_results,
+        bed_digest=bed_digest,
+        spill_gc_values=spill_gc_values,
+    )
+
+    if r_future:
+        r_future.result()
+
     data = {}
     if os.path.exists(json_file_path):
         with open(json_file_path, "r", encoding="utf-8") as f:
@@ -201,37 +300,92 @@ def bedstat(
     # length 1 and force keys to lower to correspond with the
     # postgres column identifiers
     data = {k.lower(): v[0] if isinstance(v, list) else v for k, v in data.items()}
-    try:
-        gc_contents = calculate_gc_content(
-            bedfile=bed_object, genome=genome, rfg_config=rfg_config
-        )
-    except BaseException:
-        gc_contents = None
-
-    if gc_contents:
-        gc_mean = statistics.mean(gc_contents)
-
-        data["gc_content"] = round(gc_mean, 2)
-
-        gc_plot = create_gc_plot(
-            bed_id=bed_digest,
-            gc_contents=gc_contents,
-            outfolder=os.path.join(outfolder_stats_results),
-            gc_mean=gc_mean,
-        )
-        plots.append(gc_plot)
 
     for plot in plots:
         plot_id = plot["name"]
         data.update({plot_id: plot})
 
+    _add_gc_content(data, gc_summary, bed_digest, outfolder_stats_results)
+
     if "md5sum" in data:
         del data["md5sum"]
 
     if "name" in data:
         del data["name"]
 
-    if stop_pipeline:
+    # results without GC content are cached too, GC content is computed again when they are used
+    if cache_stamp:
+        save_cached_stats(bed_digest, cache_stamp, outfolder_stats_results, data)
+
+    if stop_pipeline and pm:
         pm.stop_pipeline()
 
     return data
+
+
+def _calculate_gc_summary(
+    regions: RegionArrays,
+    genome: str,
+    rfg_config: str,
+    outfolder: str,
+    bed_digest: str,
+    spill_gc_values: bool = False,
+) -> GCContentSummary | None:
+    """
+    Calculate GC content of the regions.
+
+    Args:
+        regions: Regions of the bed file.
+        genome: Genome assembly of the sample.
+        rfg_config: Path to the refgenie config file.
+        outfolder: Bedstat output folder of the bed file.
+        bed_digest: The digest of the bed file.
+        spill_gc_values: Save GC content of every region to <digest>_gc_content.npy in the output folder.
+
+    Returns:
+        GC content summary, or None if GC content couldn't be calculated.
+    """
+    try:
+        return calculate_gc_content(
+            bedfile=regions,
+            genome=genome,
+            rfg_config=rfg_config,
+            values_path=(
+                os.path.join(outfolder, f"{bed_digest}_gc_content.npy")
+                if spill_gc_values
+                else None
+            ),
+        )
+    except BaseException:
+        return None
+
+
+def _add_gc_content(
+    data: dict, gc_summary: GCContentSummary | None, bed_digest: str, outfolder: str
+) -> bool:
+    """
+    Add GC content and its plot to bedstat results.
+
+    Args:
+        data: Statistics and plots metadata.
+        gc_summary: GC content summary.
+        bed_digest: The digest of the bed file.
+        outfolder: Bedstat output folder of the bed file.
+
+    Returns:
+        True if GC content was added.
+    """
+    if not gc_summary or not gc_summary.count:
+        return False
+    gc_mean = gc_summary.mean
+
+    data["gc_content"] = round(gc_mean, 2)
+
+    gc_plot = create_gc_plot(
+        bed_id=bed_digest,
+        gc_summary=gc_summary,
+        outfolder=outfolder,
+        gc_mean=gc_mean,
+    )
+    data[gc_plot["name"]] = gc_plot
+    return True
@@ -1,19 +1,44 @@
+import gzip
+import json
 import logging
 import os
+from functools import lru_cache
+from typing import Iterator
 
 import matplotlib.pyplot as plt
-import seaborn as sns
-from gtars.genomic_distributions import calc_gc_content
-from gtars.models import GenomeAssembly, RegionSet
+import numpy as np
+from gtars.models import RegionSet
 from matplotlib.ticker import MaxNLocator
 from refgenconf import RefgenconfError
 from yacman.exceptions import UndefinedAliasError
 
 from bedboss.bedmaker.utils import get_rgc
+from bedboss.bedstat.models import GCContentSummary, GCIndex, RegionArrays
+from bedboss.bedstat.native_stats import read_region_arrays
+from bedboss.const import (
+    BEDBOSS_CACHE_ENV_VAR,
+    DEFAULT_BEDBOSS_CACHE_PATH,
+    GC_CHUNK_SIZE,
+    GC_HISTOGRAM_BINS,
+    GC_INDEX_FOLDER_NAME,
+    GC_WINDOW_BYTES,
+)
+from bedboss.utils import build_cache_folder, file_fingerprint
 
 _LOGGER = logging.getLogger("bedboss")
 
-assembly_objects = {}
+GC_MASK_FILE: str = "gc_mask.bin"
+GC_CHROMS_FILE: str = "chroms.json"
+FASTA_READ_BLOCK_SIZE: int = 1024 * 1024 * 16
+
+# byte value -> is G or C
+GC_BASES = np.zeros(256, dtype=bool)
+GC_BASES[np.frombuffer(b"GCgc", np.uint8)] = True
+
+# number of set bits in a byte, and masks of bits from/to a position (first base is the highest bit)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+HEAD_MASK = np.array([0xFF >> k for k in range(8)], dtype=np.uint8)
+TAIL_MASK = np.array([(0xFF << (7 - k)) & 0xFF for k in range(8)], dtype=np.uint8)
 
 
 def get_genome_fasta_file(genome: str, rfg_config: str = None) -> str:
@@ -51,97 +76,297 @@ def get_genome_fasta_file(genome: str, rfg_config: str = None) -> str:
     return fasta_file
 
 
-def get_genome_assembly_obj(
-    genome: str, rfg_config: str = None
-) -> GenomeAssembly | None:
+def _fasta_records(fasta_file: str) -> Iterator[tuple[str, np.ndarray | None]]:
+    """
+    Stream a FASTA file in large blocks.
+
+    Args:
+        fasta_file: Path to the FASTA file (can be gzipped).
+
+    Returns:
+        Iterator of (chromosome, None) when a new record starts, followed by
+        (chromosome, bytes) sequence chunks without newlines.
+    """
+    opener = gzip.open if fasta_file.endswith(".gz") else open
+    chrom = None
+    pending = b""
+    with opener(fasta_file, "rb") as f:
+        while True:
+            block = f.read(FASTA_READ_BLOCK_SIZE)
+            data = pending + block
+            # only complete lines are processed, so headers are never split
+            cut = len(data) if not block else data.rfind(b"\n") + 1
+            text, pending = data[:cut], data[cut:]
+
+            position = 0
+            while position < len(text):
+                header = text.find(b">", position)
+                sequence_end = len(text) if header == -1 else header
+                if chrom is not None and sequence_end > position:
+                    sequence = np.frombuffer(text[position:sequence_end], np.uint8)
+                    yield chrom, sequence[(sequence != 10) & (sequence != 13)]
+                if header == -1:
+                    break
+                header_end = text.find(b"\n", header)
+                header_end = len(text) if header_end == -1 else header_end
+                chrom = text[header + 1 : header_end].split()[0].decode()
+                yield chrom, None
+                position = header_end + 1
+            if not block:
+                break
+
+
+def build_gc_index(fasta_file: str, index_folder: str) -> None:
+    """
+    Build a packed GC mask of a genome: 1 bit per base, set for G and C.
+
+    Each chromosome starts at a byte boundary. The FASTA file is streamed, so
+    only a small buffer is kept in memory.
+
+    Args:
+        fasta_file: Path to the FASTA file.
+        index_folder: Folder where gc_mask.bin and chroms.json are written.
+    """
+    _LOGGER.info(f"Building GC index from: {fasta_file}")
+    chroms = {}
+    byte_offset = 0
+    chrom = None
+    chrom_length = 0
+    carry = np.empty(0, dtype=bool)
+
+    with open(os.path.join(index_folder, GC_MASK_FILE), "wb") as out:
+
+        def _finish_chrom():
+            nonlocal byte_offset
+            if chrom is None:
+                return
+            packed = np.packbits(carry)
+            out.write(packed.tobytes())
+            chroms[chrom] = [byte_offset, chrom_length]
+            byte_offset += (chrom_length + 7) // 8
+
+        for record, sequence in _fasta_records(fasta_file):
+            if sequence is None:
+                _finish_chrom()
+                chrom, chrom_length = record, 0
+                carry = np.empty(0, dtype=bool)
+                continue
+            bits = np.concatenate([carry, GC_BASES[sequence]])
+            chrom_length += len(sequence)
+            full_bytes = len(bits) // 8 * 8
+            out.write(np.packbits(bits[:full_bytes]).tobytes())
+            carry = bits[full_bytes:]
+        _finish_chrom()
+
+    with open(os.path.join(index_folder, GC_CHROMS_FILE), "w") as f:
+        json.dump(chroms, f)
+
+
+@lru_cache(maxsize=4)
+def get_gc_index(genome: str, rfg_config: str = None) -> GCIndex:
     """
-    Get assembly object for a genome.
+    Get the packed GC mask of a genome, building it on first use.
+
+    The mask is stored in the bedboss cache folder and memory-mapped, so all processes
+    on a node share one copy of it.
 
     Args:
         genome: Genome name.
         rfg_config: Path to refgenie config file.
 
     Returns:
-        Assembly object, or None if not found.
+        GCIndex object.
     """
-    if genome in assembly_objects:
-        return assembly_objects[genome]
-    else:
-        try:
-            assembly_objects[genome] = GenomeAssembly(
-                get_genome_fasta_file(genome, rfg_config=rfg_config)
-            )
-            return assembly_objects[genome]
-        except Exception as e:
-            _LOGGER.error(f"Could not get assembly object for {genome}: {e}")
-            return None
+    fasta_file = get_genome_fasta_file(genome, rfg_config=rfg_config)
+    cache_folder = os.getenv(BEDBOSS_CACHE_ENV_VAR, DEFAULT_BEDBOSS_CACHE_PATH)
+    index_folder = os.path.join(
+        cache_folder, GC_INDEX_FOLDER_NAME, f"{genome}_{file_fingerprint(fasta_file)}"
+    )
+    build_cache_folder(index_folder, lambda folder: build_gc_index(fasta_file, folder))
+    with open(os.path.join(index_folder, GC_CHROMS_FILE)) as f:
+        chroms = {chrom: tuple(value) for chrom, value in json.load(f).items()}
+    return GCIndex(
+        mask=np.memmap(os.path.join(index_folder, GC_MASK_FILE), np.uint8, mode="r"),
+        chroms=chroms,
+    )
+
+
+def _count_gc(mask: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Count GC bases of regions in a packed mask window.
+
+    Args:
+        mask: Packed mask bytes, with starts and ends relative to its first bit.
+        starts: Region starts.
+        ends: Region ends (exclusive, greater than starts).
+
+    Returns:
+        Number of G and C bases in each region.
+    """
+    first_bytes = starts // 8
+    last_bytes = (ends - 1) // 8
+    cumulative = np.zeros(len(mask) + 1, dtype=np.int64)
+    np.cumsum(POPCOUNT[mask], out=cumulative[1:])
+
+    head = mask[first_bytes] & HEAD_MASK[starts % 8]
+    tail = mask[last_bytes] & TAIL_MASK[(ends - 1) % 8]
+    full_bytes = (
+        cumulative[last_bytes] - cumulative[np.minimum(first_bytes + 1, last_bytes)]
+    )
+    return np.where(
+        first_bytes == last_bytes,
+        POPCOUNT[head & tail],
+        POPCOUNT[head].astype(np.int64) + POPCOUNT[tail] + full_bytes,
+    )
 
 
 def calculate_gc_content(
-    bedfile: RegionSet, genome: str, rfg_config: str = None
-) -> list[float] | None:
+    bedfile: RegionArrays | RegionSet | str,
+    genome: str,
+    rfg_config: str = None,
+    values_path: str = None,
+) -> GCContentSummary | None:
     """
     Calculate GC content for a bed file.
 
+    Regions are processed in sorted chunks over a bounded window of the packed genome,
+    and only the summary and a fixed-bin histogram are kept. Regions on chromosomes
+    that are not in the genome are ignored.
+
     Args:
-        bedfile: RegionSet object.
+        bedfile: Regions, RegionSet object or path to the bed file.
         genome: Genome name.
         rfg_config: Path to refgenie config file.
+        values_path: If provided, per-region GC contents are saved to this .npy file,
+            in the order of the sorted regions (NaN for ignored regions).
 
     Returns:
-        List of GC contents, or None if assembly cannot be loaded.
+        GC content summary, or None if the genome cannot be loaded.
     """
-
-    assembly_obj = get_genome_assembly_obj(genome, rfg_config=rfg_config)
-    if assembly_obj is None:
+    try:
+        gc_index = get_gc_index(genome, rfg_config=rfg_config)
+    except Exception as e:
+        _LOGGER.error(f"Could not get GC index for {genome}: {e}")
         return None
 
-    gc_contents = calc_gc_content(
-        bedfile,
-        assembly_obj,
-        ignore_unk_chroms=True,
+    regions = (
+        bedfile if isinstance(bedfile, RegionArrays) else read_region_arrays(bedfile)
+    )
+
+    values = None
+    if values_path:
+        values = np.lib.format.open_memmap(
+            values_path, mode="w+", dtype=np.float32, shape=(regions.size,)
+        )
+        values[:] = np.nan
+
+    total = 0.0
+    count = 0
+    histogram = np.zeros(GC_HISTOGRAM_BINS, dtype=np.int64)
+
+    for chrom_index, (chrom, starts, ends) in enumerate(regions.iter_chroms()):
+        if chrom not in gc_index.chroms:
+            continue
+        byte_offset, chrom_length = gc_index.chroms[chrom]
+        ends = np.minimum(ends, chrom_length)
+        valid = np.flatnonzero(ends > starts)
+        region_offset = regions.chrom_offsets[chrom_index]
+
+        first_bytes = starts[valid] // 8
+        i = 0
+        while i < len(valid):
+            # bound both the number of regions and the size of the genome window
+            j = min(len(valid), i + GC_CHUNK_SIZE)
+            j = max(
+                i + 1,
+                min(
+                    j,
+                    np.searchsorted(
+                        first_bytes, first_bytes[i] + GC_WINDOW_BYTES, side="right"
+                    ),
+                ),
+            )
+            chunk = valid[i:j]
+            window_start = first_bytes[i]
+            window_end = (ends[chunk].max() - 1) // 8 + 1
+            window = np.asarray(
+                gc_index.mask[byte_offset + window_start : byte_offset + window_end]
+            )
+            chunk_starts = starts[chunk] - window_start * 8
+            chunk_ends = ends[chunk] - window_start * 8
+
+            gc = _count_gc(window, chunk_starts, chunk_ends) / (
+                chunk_ends - chunk_starts
+            )
+            total += float(gc.sum())
+            count += len(gc)
+            histogram += np.bincount(
+                np.minimum(
+                    (gc * GC_HISTOGRAM_BINS).astype(np.int64), GC_HISTOGRAM_BINS - 1
+                ),
+                minlength=GC_HISTOGRAM_BINS,
+            )
+            if values is not None:
+                values[region_offset + chunk] = gc
+            i = j
+
+    if values is not None:
+        values.flush()
+
+    return GCContentSummary(
+        mean=total / count if count else None,
+        count=count,
+        bin_edges=np.linspace(0, 1, GC_HISTOGRAM_BINS + 1).tolist(),
+        counts=histogram.tolist(),
+        values_path=values_path,
     )
-    return gc_contents
 
 
 def create_gc_plot(
-    bed_id: str, gc_contents: list[float], outfolder: str, gc_mean: float
+    bed_id: str, gc_summary: GCContentSummary, outfolder: str, gc_mean: float
 ) -> dict:
     """
     Create a GC content plot.
 
     Args:
         bed_id: Bed ID.
-        gc_contents: List of GC contents.
+        gc_summary: GC content summary with the histogram.
         outfolder: Path to output folder.
         gc_mean: Mean GC content.
 
     Returns:
         Dict with plot metadata (name, title, thumbnail_path, path).
     """
-    plt.rcParams["font.size"] = 10
-    plt.figure(figsize=(8, 8))
-    sns.kdeplot(gc_contents, linewidth=0.8, color="black")
-    plt.gca().xaxis.set_major_locator(MaxNLocator(nbins=5))
-
-    plt.axvline(
-        gc_mean,
-        color="r",
-        linestyle="--",
-        linewidth=0.8,
-        label=f"Mean: {gc_mean:.2f}",
-    )
-    sns.despine()
-    plt.xlabel("GC Content")
-    plt.legend()
+    bin_edges = np.asarray(gc_summary.bin_edges)
+    counts = np.asarray(gc_summary.counts, dtype=float)
+    density = counts / (counts.sum() * np.diff(bin_edges)) if counts.sum() else counts
 
-    plt.title("GC Content Distribution")
+    fig, ax = plt.subplots(figsize=(8, 8))
+    try:
+        ax.stairs(density, bin_edges, fill=True, color="lightgrey")
+        ax.stairs(density, bin_edges, linewidth=0.8, color="black")
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=5))
+        ax.axvline(
+            gc_mean,
+            color="r",
+            linestyle="--",
+            linewidth=0.8,
+            label=f"Mean: {gc_mean:.2f}",
+        )
+        ax.spines[["top", "right"]].set_visible(False)
+        ax.set_xlabel("GC Content", fontsize=10)
+        ax.set_ylabel("Density", fontsize=10)
+        ax.legend(fontsize=10)
+        ax.set_title("GC Content Distribution", fontsize=10)
 
-    pdf_path = os.path.join(outfolder, f"{bed_id}_gccontent.pdf")
-    png_path = os.path.join(outfolder, f"{bed_id}_gccontent.png")
+        pdf_path = os.path.join(outfolder, f"{bed_id}_gccontent.pdf")
+        png_path = os.path.join(outfolder, f"{bed_id}_gccontent.png")
 
-    plt.savefig(pdf_path)
-    plt.savefig(png_path)
+        fig.savefig(pdf_path)
+        fig.savefig(png_path)
+    finally:
+        # figures are kept by pyplot until closed, so long runs would leak them
+        plt.close(fig)
 
     return {
         "name": "gccontent",
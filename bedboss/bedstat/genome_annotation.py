@@ -0,0 +1,481 @@
+import json
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from bedboss.const import (
+    ANNOTATION_INDEX_FOLDER_NAME,
+    BEDBOSS_CACHE_ENV_VAR,
+    DEFAULT_BEDBOSS_CACHE_PATH,
+    PKG_NAME,
+)
+from bedboss.utils import build_cache_folder, file_fingerprint
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# Order matters: each region is assigned to the first partition it overlaps,
+# the same way GenomicDistributions::calcPartitions does it.
+PARTITION_NAMES: list[str] = [
+    "promoterCore",
+    "promoterProx",
+    "threeUTR",
+    "fiveUTR",
+    "exon",
+    "intron",
+]
+REMAINDER_PARTITION: str = "intergenic"
+
+PROMOTER_CORE_SIZE: int = 100
+PROMOTER_PROX_SIZE: int = 2000
+
+GTF_FEATURES: list[str] = ["gene", "exon", "three_prime_utr", "five_prime_utr"]
+INDEX_OFFSETS_FILE: str = "offsets.json"
+
+
+def merge_intervals(
+    starts: np.ndarray, ends: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merge overlapping and book-ended half-open intervals of one chromosome.
+
+    Args:
+        starts: Interval starts.
+        ends: Interval ends.
+
+    Returns:
+        Sorted, disjoint interval starts and ends.
+    """
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    order = np.argsort(starts, kind="stable")
+    starts = np.asarray(starts, dtype=np.int64)[order]
+    ends = np.maximum.accumulate(np.asarray(ends, dtype=np.int64)[order])
+
+    # a new block starts where the interval begins after everything before it ended
+    new_block = np.empty(len(starts), dtype=bool)
+    new_block[0] = True
+    new_block[1:] = starts[1:] > ends[:-1]
+    block_starts = starts[new_block]
+    block_ends = ends[np.r_[np.flatnonzero(new_block)[1:] - 1, len(ends) - 1]]
+    return block_starts, block_ends
+
+
+def _covered(positions: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Check which positions are covered by a set of merged intervals.
+
+    Args:
+        positions: Positions to check.
+        starts: Merged interval starts.
+        ends: Merged interval ends.
+
+    Returns:
+        Boolean mask of covered positions.
+    """
+    idx = np.searchsorted(ends, positions, side="right")
+    inside = idx < len(ends)
+    inside[inside] = starts[idx[inside]] <= positions[inside]
+    return inside
+
+
+def subtract_intervals(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    other_starts: np.ndarray,
+    other_ends: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Remove the parts of the intervals that are covered by other intervals (GenomicRanges::setdiff).
+
+    Args:
+        starts: Interval starts.
+        ends: Interval ends.
+        other_starts: Starts of the intervals to subtract.
+        other_ends: Ends of the intervals to subtract.
+
+    Returns:
+        Sorted, disjoint interval starts and ends.
+    """
+    starts, ends = merge_intervals(starts, ends)
+    other_starts, other_ends = merge_intervals(other_starts, other_ends)
+    if len(starts) == 0 or len(other_starts) == 0:
+        return starts, ends
+
+    # split the genome into elementary segments at every boundary
+    boundaries = np.unique(np.concatenate([starts, ends, other_starts, other_ends]))
+    segment_starts = boundaries[:-1]
+    keep = _covered(segment_starts, starts, ends) & ~_covered(
+        segment_starts, other_starts, other_ends
+    )
+    return merge_intervals(segment_starts[keep], boundaries[1:][keep])
+
+
+def _ucsc_chrom(chrom: str) -> str:
+    """
+    Convert an Ensembl chromosome name to the UCSC style used in bed files.
+
+    Args:
+        chrom: Ensembl chromosome name, e.g. "1" or "MT".
+
+    Returns:
+        UCSC chromosome name, e.g. "chr1" or "chrM".
+    """
+    if chrom.startswith("chr"):
+        return chrom
+    if chrom == "MT":
+        return "chrM"
+    return f"chr{chrom}"
+
+
+def read_gtf_features(gtf_path: str) -> pd.DataFrame:
+    """
+    Read protein coding gene models from an Ensembl GTF file.
+
+    Coordinates are converted to 0-based, half-open and chromosome names to the UCSC style.
+
+    Args:
+        gtf_path: Path to the GTF file (can be gzipped).
+
+    Returns:
+        Data frame with columns: chrom, feature, start, end, strand.
+    """
+    gtf = pd.read_csv(
+        gtf_path,
+        sep="\t",
+        header=None,
+        comment="#",
+        usecols=[0, 2, 3, 4, 6, 8],
+        names=["chrom", "feature", "start", "end", "strand", "attributes"],
+        dtype={"chrom": str, "feature": str, "strand": str, "attributes": str},
+    )
+    gtf = gtf[gtf["feature"].isin(GTF_FEATURES)]
+    gtf = gtf[
+        gtf["attributes"].str.contains(r'gene_(?:bio)?type "protein_coding"', na=False)
+    ]
+    gtf = gtf.drop(columns="attributes")
+    gtf["chrom"] = gtf["chrom"].map(_ucsc_chrom)
+    gtf["start"] = gtf["start"].astype(np.int64) - 1
+    gtf["end"] = gtf["end"].astype(np.int64)
+    return gtf
+
+
+class GenomeAnnotation:
+    """
+    TSS positions and genomic partitions of one genome, stored as flat sorted arrays.
+
+    TSS positions are 0-based. Partition intervals are merged, 0-based, half-open, and
+    strand is not kept, since bed regions are matched on both strands.
+    Per chromosome slices are looked up through offset dictionaries.
+    """
+
+    def __init__(
+        self,
+        tss: np.ndarray,
+        tss_offsets: dict[str, tuple[int, int]],
+        partition_starts: np.ndarray,
+        partition_ends: np.ndarray,
+        partition_offsets: dict[str, dict[str, tuple[int, int]]],
+    ):
+        """
+        Args:
+            tss: Sorted TSS positions, grouped by chromosome.
+            tss_offsets: Chromosome -> (start, end) slice of the tss array.
+            partition_starts: Merged partition interval starts, grouped by partition and chromosome.
+            partition_ends: Merged partition interval ends.
+            partition_offsets: Partition -> chromosome -> (start, end) slice of the partition arrays.
+        """
+        self.tss = tss
+        self.tss_offsets = tss_offsets
+        self.partition_starts = partition_starts
+        self.partition_ends = partition_ends
+        self.partition_offsets = partition_offsets
+
+    def tss_positions(self, chrom: str) -> np.ndarray:
+        """
+        Get sorted TSS positions of a chromosome.
+
+        Args:
+            chrom: Chromosome name.
+
+        Returns:
+            Sorted TSS positions (empty if chromosome isn't annotated).
+        """
+        lo, hi = self.tss_offsets.get(chrom, (0, 0))
+        return self.tss[lo:hi]
+
+    def partition_intervals(
+        self, partition: str, chrom: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get merged intervals of a partition on a chromosome.
+
+        Args:
+            partition: Partition name, one of PARTITION_NAMES.
+            chrom: Chromosome name.
+
+        Returns:
+            Sorted, disjoint interval starts and ends.
+        """
+        lo, hi = self.partition_offsets[partition].get(chrom, (0, 0))
+        return self.partition_starts[lo:hi], self.partition_ends[lo:hi]
+
+    def save(self, index_folder: str) -> None:
+        """
+        Save the annotation as flat .npy arrays and a json file with offsets.
+
+        Args:
+            index_folder: Folder where the index is saved.
+        """
+        os.makedirs(index_folder, exist_ok=True)
+        np.save(os.path.join(index_folder, "tss.npy"), self.tss)
+        np.save(
+            os.path.join(index_folder, "partition_starts.npy"), self.partition_starts
+        )
+        np.save(os.path.join(index_folder, "partition_ends.npy"), self.partition_ends)
+        with open(os.path.join(index_folder, INDEX_OFFSETS_FILE), "w") as f:
+            json.dump(
+                {
+                    "tss_offsets": self.tss_offsets,
+                    "partition_offsets": self.partition_offsets,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, index_folder: str) -> "GenomeAnnotation":
+        """
+        Load a saved annotation. Arrays are memory-mapped, so the operating system
+        shares their pages between all processes that use the same index.
+
+        Args:
+            index_folder: Folder with a saved index.
+
+        Returns:
+            GenomeAnnotation object.
+        """
+        with open(os.path.join(index_folder, INDEX_OFFSETS_FILE)) as f:
+            offsets = json.load(f)
+
+        def _load(name: str) -> np.ndarray:
+            return np.load(os.path.join(index_folder, name), mmap_mode="r")
+
+        return cls(
+            tss=_load("tss.npy"),
+            tss_offsets={k: tuple(v) for k, v in offsets["tss_offsets"].items()},
+            partition_starts=_load("partition_starts.npy"),
+            partition_ends=_load("partition_ends.npy"),
+            partition_offsets={
+                partition: {k: tuple(v) for k, v in chroms.items()}
+                for partition, chroms in offsets["partition_offsets"].items()
+            },
+        )
+
+    @classmethod
+    def from_gtf(cls, gtf_path: str) -> "GenomeAnnotation":
+        """
+        Build the annotation from an Ensembl GTF file.
+
+        Partitions follow GenomicDistributions::genomePartitionList: promoters are taken
+        upstream of gene starts, exons exclude UTRs, introns are genes minus exons.
+
+        Args:
+            gtf_path: Path to the GTF file.
+
+        Returns:
+            GenomeAnnotation object.
+        """
+        _LOGGER.info(f"Building genome annotation from: {gtf_path}")
+        gtf = read_gtf_features(gtf_path)
+
+        tss_parts = []
+        tss_offsets = {}
+        part_starts = []
+        part_ends = []
+        partition_offsets = {name: {} for name in PARTITION_NAMES}
+        tss_cursor = 0
+        part_cursor = 0
+
+        for chrom, chrom_gtf in gtf.groupby("chrom", sort=True):
+            genes = chrom_gtf[chrom_gtf["feature"] == "gene"]
+            plus = genes["strand"].to_numpy() == "+"
+            gene_starts = genes["start"].to_numpy()
+            gene_ends = genes["end"].to_numpy()
+
+            # TSS is the first base of the gene, in the direction of transcription
+            chrom_tss = np.sort(np.where(plus, gene_starts, gene_ends - 1))
+            tss_parts.append(chrom_tss)
+            tss_offsets[chrom] = (tss_cursor, tss_cursor + len(chrom_tss))
+            tss_cursor += len(chrom_tss)
+
+            for name, (starts, ends) in cls._chrom_partitions(chrom_gtf).items():
+                part_starts.append(starts)
+                part_ends.append(ends)
+                partition_offsets[name][chrom] = (
+                    part_cursor,
+                    part_cursor + len(starts),
+                )
+                part_cursor += len(starts)
+
+        def _concat(parts: list[np.ndarray]) -> np.ndarray:
+            if not parts:
+                return np.empty(0, dtype=np.int64)
+            return np.concatenate(parts).astype(np.int64)
+
+        return cls(
+            tss=_concat(tss_parts),
+            tss_offsets=tss_offsets,
+            partition_starts=_concat(part_starts),
+            partition_ends=_concat(part_ends),
+            partition_offsets=partition_offsets,
+        )
+
+    @staticmethod
+    def _chrom_partitions(
+        chrom_gtf: pd.DataFrame,
+    ) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Compute merged partition intervals of one chromosome.
+
+        Set differences are computed per strand, as GenomicRanges does, then both strands are merged.
+
+        Args:
+            chrom_gtf: GTF features of one chromosome.
+
+        Returns:
+            Partition name -> (starts, ends).
+        """
+        per_strand = {name: ([], []) for name in PARTITION_NAMES}
+
+        for strand, strand_gtf in chrom_gtf.groupby("strand"):
+
+            def _feature(feature: str) -> tuple[np.ndarray, np.ndarray]:
+                rows = strand_gtf[strand_gtf["feature"] == feature]
+                return rows["start"].to_numpy(), rows["end"].to_numpy()
+
+            gene_starts, gene_ends = _feature("gene")
+            exons = _feature("exon")
+            three_utr = _feature("three_prime_utr")
+            five_utr = _feature("five_prime_utr")
+
+            intervals = {"threeUTR": three_utr, "fiveUTR": five_utr}
+            for name, size in (
+                ("promoterCore", PROMOTER_CORE_SIZE),
+                ("promoterProx", PROMOTER_PROX_SIZE),
+            ):
+                if strand == "-":
+                    intervals[name] = (gene_ends, gene_ends + size)
+                else:
+                    intervals[name] = (np.maximum(gene_starts - size, 0), gene_starts)
+            intervals["exon"] = subtract_intervals(
+                *subtract_intervals(*exons, *three_utr), *five_utr
+            )
+            intervals["intron"] = subtract_intervals(gene_starts, gene_ends, *exons)
+
+            for name, (starts, ends) in intervals.items():
+                per_strand[name][0].append(starts)
+                per_strand[name][1].append(ends)
+
+        return {
+            name: merge_intervals(np.concatenate(starts), np.concatenate(ends))
+            for name, (starts, ends) in per_strand.items()
+        }
+
+
+def get_annotation_index_folder(genome: str, gtf_path: str) -> str:
+    """
+    Get the index folder of a genome annotation.
+
+    The folder name includes a fingerprint of the GTF file, so a changed GTF file gets a new index.
+
+    Args:
+        genome: Genome assembly.
+        gtf_path: Path to the GTF file.
+
+    Returns:
+        Path to the index folder.
+    """
+    cache_folder = os.getenv(BEDBOSS_CACHE_ENV_VAR, DEFAULT_BEDBOSS_CACHE_PATH)
+    return os.path.join(
+        cache_folder,
+        ANNOTATION_INDEX_FOLDER_NAME,
+        f"{genome}_{file_fingerprint(gtf_path)}",
+    )
+
+
+def build_annotation_index(genome: str, gtf_path: str) -> str:
+    """
+    Build the annotation index of a genome, unless it already exists.
+
+    When several workers need the same index, one of them builds it and the others wait and reuse it.
+
+    Args:
+        genome: Genome assembly.
+        gtf_path: Path to the GTF file.
+
+    Returns:
+        Path to the index folder.
+    """
+    index_folder = get_annotation_index_folder(genome, gtf_path)
+    if not os.path.exists(index_folder):
+        build_cache_folder(
+            index_folder,
+            lambda folder: GenomeAnnotation.from_gtf(gtf_path).save(folder),
+        )
+        _LOGGER.info(f"Annotation index for {genome}: {index_folder}")
+    return index_folder
+
+
+@lru_cache(maxsize=8)
+def _load_cached_annotation(genome: str, gtf_path: str) -> GenomeAnnotation:
+    """
+    Build (if needed) and load the annotation index once per process.
+
+    Args:
+        genome: Genome assembly.
+        gtf_path: Path to the GTF file.
+
+    Returns:
+        Memory-mapped GenomeAnnotation object.
+    """
+    return GenomeAnnotation.load(build_annotation_index(genome, gtf_path))
+
+
+def gtf_available(gtf_path: str | None) -> bool:
+    """
+    Check if an annotation GTF file is given (the R pipeline passes a missing file as 'None').
+
+    Args:
+        gtf_path: Path to the Ensembl GTF file.
+
+    Returns:
+        True if the GTF file is given.
+    """
+    return bool(gtf_path) and gtf_path != "None"
+
+
+def load_genome_annotation(
+    genome: str, gtf_path: str = None
+) -> GenomeAnnotation | None:
+    """
+    Load the annotation used for TSS distance and partitions.
+
+    The annotation is built from the GTF file once, stored in the bedboss cache folder
+    (BEDBOSS_CACHE environment variable, default ~/.bedboss) and memory-mapped afterwards.
+
+    Args:
+        genome: Genome assembly.
+        gtf_path: Path to the Ensembl GTF file.
+
+    Returns:
+        GenomeAnnotation object, or None if no GTF file is available.
+    """
+    if not gtf_available(gtf_path):
+        _LOGGER.warning(
+            f"Ensembl annotation gtf file not provided for {genome}. "
+            "Skipping TSS distance and partitions ..."
+        )
+        return None
+    return _load_cached_annotation(genome, os.path.abspath(gtf_path))
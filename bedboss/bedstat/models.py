@@ -0,0 +1,60 @@
+from typing import Iterator
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+
+class RegionArrays(BaseModel):
+    """
+    Regions of a bed file as flat arrays, sorted by chromosome and start.
+
+    Regions of chromosome chrom_names[i] are at chrom_offsets[i]:chrom_offsets[i + 1].
+    """
+
+    chrom_names: list[str]
+    chrom_offsets: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def size(self) -> int:
+        """Number of regions."""
+        return len(self.starts)
+
+    def iter_chroms(self) -> Iterator[tuple[str, np.ndarray, np.ndarray]]:
+        """
+        Iterate over chromosomes.
+
+        Returns:
+            Iterator of (chromosome, starts, ends) tuples.
+        """
+        for i, chrom in enumerate(self.chrom_names):
+            lo, hi = self.chrom_offsets[i], self.chrom_offsets[i + 1]
+            yield chrom, self.starts[lo:hi], self.ends[lo:hi]
+
+
+class GCIndex(BaseModel):
+    """
+    Packed GC mask of a genome (1 bit per base, first base is the highest bit).
+
+    Chromosome -> (byte offset of the chromosome in the mask, chromosome length).
+    """
+
+    mask: np.ndarray
+    chroms: dict[str, tuple[int, int]]
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+class GCContentSummary(BaseModel):
+    """
+    GC content of the regions of a bed file.
+    """
+
+    mean: float | None = None
+    count: int = 0
+    bin_edges: list[float]
+    counts: list[int]
+    values_path: str | None = None
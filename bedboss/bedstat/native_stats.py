@@ -0,0 +1,285 @@
+import json
+import logging
+import math
+import re
+
+import numpy as np
+import pandas as pd
+from gtars.models import RegionSet
+
+from bedboss.bedstat.genome_annotation import (
+    PARTITION_NAMES,
+    REMAINDER_PARTITION,
+    GenomeAnnotation,
+)
+from bedboss.bedstat.models import RegionArrays
+from bedboss.const import PKG_NAME
+from bedboss.models import ParsedBed
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# keepStandardChromosomes equivalent: chr1..chr22, chrX, chrY, chrM
+STANDARD_CHROM_REGEX = re.compile(r"^chr([0-9]+|X|Y|M)$")
+
+
+def _signif(value: float, digits: int = 4) -> float | None:
+    """
+    Round to significant digits, like R's signif().
+
+    Args:
+        value: Value to round.
+        digits: Number of significant digits.
+
+    Returns:
+        Rounded value, or None for NaN.
+    """
+    if value is None or math.isnan(value):
+        return None
+    return float(f"{value:.{digits}g}")
+
+
+def region_arrays_from_frame(
+    chroms: pd.Series | np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> RegionArrays:
+    """
+    Build RegionArrays from columns, sorting regions by chromosome and start.
+
+    Args:
+        chroms: Chromosome of each region.
+        starts: Start of each region.
+        ends: End of each region.
+
+    Returns:
+        RegionArrays object.
+    """
+    codes, chrom_names = pd.factorize(pd.Series(chroms), sort=True)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    order = np.lexsort((starts, codes))
+    codes = codes[order]
+    offsets = np.searchsorted(codes, np.arange(len(chrom_names) + 1))
+    return RegionArrays(
+        chrom_names=[str(name) for name in chrom_names],
+        chrom_offsets=offsets,
+        starts=starts[order],
+        ends=ends[order],
+    )
+
+
+def read_region_arrays(bed: str | RegionSet | ParsedBed) -> RegionArrays:
+    """
+    Read chromosome, start and end of every region.
+
+    Bed files produced by bedmaker are read with the pandas C parser. If that fails
+    (e.g. header lines), or a RegionSet is given, regions are taken from gtars.
+    A ParsedBed is not read again: its region columns are used if they are integer, otherwise
+    its RegionSet. Region columns of a file classified in chunks are read from the file.
+
+    Args:
+        bed: Path to the bed file, gtars RegionSet or ParsedBed.
+
+    Returns:
+        RegionArrays object.
+    """
+    fallback = None
+    if isinstance(bed, ParsedBed):
+        if bed.starts is not None:
+            return region_arrays_from_frame(
+                pd.Categorical.from_codes(bed.chrom_codes, bed.chrom_names),
+                bed.starts,
+                bed.ends,
+            )
+        if bed.column_dtypes:
+            bed = bed.bed_object
+        else:
+            bed, fallback = bed.bed_file, bed.bed_object
+
+    if isinstance(bed, str):
+        try:
+            df = pd.read_csv(
+                bed,
+                sep="\t",
+                header=None,
+                usecols=[0, 1, 2],
+                dtype={0: str, 1: np.int64, 2: np.int64},
+                comment="#",
+            )
+            return region_arrays_from_frame(df[0], df[1].to_numpy(), df[2].to_numpy())
+        except (ValueError, pd.errors.ParserError) as e:
+            _LOGGER.debug(f"Falling back to gtars to read {bed}: {e}")
+            bed = fallback if fallback is not None else RegionSet(bed)
+
+    chroms, starts, ends = [], [], []
+    for region in bed:
+        chroms.append(region.chr)
+        starts.append(region.start)
+        ends.append(region.end)
+    return region_arrays_from_frame(chroms, np.array(starts), np.array(ends))
+
+
+def calc_tss_distances(
+    regions: RegionArrays, annotation: GenomeAnnotation
+) -> np.ndarray:
+    """
+    Signed distance from each region midpoint to the nearest TSS (GenomicDistributions::calcFeatureDist).
+
+    Only standard chromosomes are used. Regions on chromosomes without TSS are skipped.
+
+    Args:
+        regions: Regions.
+        annotation: Genome annotation.
+
+    Returns:
+        Array of distances (TSS - midpoint).
+    """
+    distances = []
+    for chrom, starts, ends in regions.iter_chroms():
+        if not STANDARD_CHROM_REGEX.match(chrom):
+            continue
+        tss = annotation.tss_positions(chrom)
+        if len(tss) == 0:
+            continue
+        # midpoint of the 1-based region, shifted back to 0-based
+        mids = starts + np.round((ends - starts - 1) / 2).astype(np.int64)
+        idx = np.searchsorted(tss, mids)
+        left = tss[np.clip(idx - 1, 0, len(tss) - 1)] - mids
+        right = tss[np.clip(idx, 0, len(tss) - 1)] - mids
+        distances.append(np.where(np.abs(left) < np.abs(right), left, right))
+    if not distances:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(distances)
+
+
+def _overlaps_any(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    interval_starts: np.ndarray,
+    interval_ends: np.ndarray,
+) -> np.ndarray:
+    """
+    Check which regions overlap at least one of the merged intervals.
+
+    Args:
+        starts: Region starts.
+        ends: Region ends.
+        interval_starts: Sorted, disjoint interval starts.
+        interval_ends: Sorted, disjoint interval ends.
+
+    Returns:
+        Boolean mask of overlapping regions.
+    """
+    # first interval that ends after the region starts
+    idx = np.searchsorted(interval_ends, starts, side="right")
+    overlaps = idx < len(interval_ends)
+    overlaps[overlaps] = interval_starts[idx[overlaps]] < ends[overlaps]
+    return overlaps
+
+
+def calc_partitions(
+    regions: RegionArrays, annotation: GenomeAnnotation
+) -> dict[str, int]:
+    """
+    Count regions in genomic partitions (GenomicDistributions::calcPartitions).
+
+    Each region is assigned to the first partition in PARTITION_NAMES it overlaps,
+    regions that don't overlap any partition are intergenic.
+
+    Args:
+        regions: Regions.
+        annotation: Genome annotation.
+
+    Returns:
+        Partition name -> number of regions.
+    """
+    counts = dict.fromkeys(PARTITION_NAMES + [REMAINDER_PARTITION], 0)
+    for chrom, starts, ends in regions.iter_chroms():
+        remaining = np.ones(len(starts), dtype=bool)
+        for name in PARTITION_NAMES:
+            interval_starts, interval_ends = annotation.partition_intervals(name, chrom)
+            if len(interval_starts) == 0:
+                continue
+            hit = remaining & _overlaps_any(
+                starts, ends, interval_starts, interval_ends
+            )
+            counts[name] += int(hit.sum())
+            remaining &= ~hit
+        counts[REMAINDER_PARTITION] += int(remaining.sum())
+    return counts
+
+
+def calc_neighbor_distances(regions: RegionArrays) -> np.ndarray:
+    """
+    Distances between consecutive, non-overlapping regions on the same chromosome.
+
+    Args:
+        regions: Regions.
+
+    Returns:
+        Array of distances.
+    """
+    distances = []
+    for _, starts, ends in regions.iter_chroms():
+        if len(starts) < 2:
+            continue
+        gaps = starts[1:] - ends[:-1]
+        distances.append(gaps[gaps >= 0])
+    if not distances:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(distances)
+
+
+def calc_region_stats(
+    regions: RegionArrays,
+    digest: str,
+    annotation: GenomeAnnotation = None,
+) -> dict:
+    """
+    Compute regionstat.R statistics with NumPy.
+
+    Keys are the same as in the <digest>.json written by regionstat.R. TSS distance and
+    partitions are only computed if an annotation is provided.
+
+    Args:
+        regions: Regions.
+        digest: Bed file digest.
+        annotation: Genome annotation, used for TSS distance and partitions.
+
+    Returns:
+        Dict of statistics.
+    """
+    widths = regions.ends - regions.starts
+    neighbor_distances = calc_neighbor_distances(regions)
+
+    stats = {
+        "name": digest,
+        "number_of_regions": regions.size,
+        "mean_region_width": _signif(float(widths.mean())) if len(widths) else None,
+        "md5sum": digest,
+        "mean_neighbor_distance": (
+            _signif(float(neighbor_distances.mean()))
+            if len(neighbor_distances)
+            else None
+        ),
+    }
+
+    if annotation is not None:
+        tss_distances = calc_tss_distances(regions, annotation)
+        if len(tss_distances):
+            stats["median_TSS_dist"] = _signif(float(np.median(np.abs(tss_distances))))
+
+        for name, count in calc_partitions(regions, annotation).items():
+            stats[f"{name}_frequency"] = count
+            stats[f"{name}_percentage"] = count / regions.size if regions.size else 0
+    return stats
+
+
+def write_region_stats(stats: dict, json_file_path: str) -> None:
+    """
+    Write statistics in the regionstat.R json format (every value is a list of length 1).
+
+    Args:
+        stats: Statistics from calc_region_stats.
+        json_file_path: Path to the output json file.
+    """
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        json.dump({key: [value] for key, value in stats.items()}, f, indent=2)
@@ -1,12 +1,18 @@
+import json
 import os
+import queue
 import re
 import signal
 import socket
 import subprocess
+import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from logging import getLogger
 
-from bedboss.const import PKG_NAME
+from bedboss.const import PKG_NAME, R_SERVICE_JOB_TIMEOUT, R_SERVICE_START_TIMEOUT
+from bedboss.exceptions import RServiceException
 
 _LOGGER = getLogger(PKG_NAME)
 
@@ -15,6 +21,23 @@ script_path = os.path.join(
 )
 
 
+def find_free_port(host: str = "127.0.0.1") -> int:
+    """
+    Ask the operating system for a free TCP port.
+
+    Used to give each R service its own port, so several services can run on the same machine.
+
+    Args:
+        host: Host address to bind to. Default is "127.0.0.1".
+
+    Returns:
+        Free port number.
+    """
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
 class RServiceManager:
     """
     A class to manage the lifecycle of an R service, allowing files to be processed through the service.
@@ -45,18 +68,65 @@ class RServiceManager:
     def start_service(self):
         """
         Starts the R service by running the R script in a subprocess.
+
+        The service announces itself with a "READY <port>" line on stdout. Everything else
+        printed by R is forwarded to our stdout by a background thread.
+
+        Raises:
+            RServiceException: If the service exits or doesn't get ready in time.
         """
         _LOGGER.info("RService: Starting R service...")
-        cmd = ["Rscript", self.r_script_path]
-        self.process = subprocess.Popen(cmd, shell=False, preexec_fn=os.setsid)
+        cmd = ["Rscript", self.r_script_path, str(self.port)]
+        self.process = subprocess.Popen(
+            cmd,
+            shell=False,
+            preexec_fn=os.setsid,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        ready = threading.Event()
+        threading.Thread(
+            target=self._forward_output,
+            args=(self.process, ready),
+            daemon=True,
+        ).start()
 
-        while True:
-            if self.check_status() == "idle":
-                _LOGGER.info(
-                    f"RService: Running R process with PID: {self.process.pid}"
+        start_time = time.monotonic()
+        while not ready.wait(timeout=0.1):
+            if not self.is_alive():
+                raise RServiceException(
+                    f"R service exited during startup with code {self.process.returncode}"
                 )
-                break
-            time.sleep(2)
+            if time.monotonic() - start_time > R_SERVICE_START_TIMEOUT:
+                self._kill()
+                raise RServiceException(
+                    f"R service didn't start in {R_SERVICE_START_TIMEOUT} seconds"
+                )
+        _LOGGER.info(f"RService: Running R process with PID: {self.process.pid}")
+
+    @staticmethod
+    def _forward_output(process: subprocess.Popen, ready: threading.Event):
+        """
+        Read stdout of the R process, set the ready event on the READY line and print the rest.
+
+        Args:
+            process: R process.
+            ready: Event set when the service is accepting connections.
+        """
+        for line in process.stdout:
+            if line.startswith("READY"):
+                ready.set()
+            else:
+                sys.stdout.write(line)
+
+    def is_alive(self) -> bool:
+        """
+        Check if the R process is still running.
+
+        Returns:
+            True if the R process is running.
+        """
+        return self.process is not None and self.process.poll() is None
 
     def run_file(
         self,
@@ -66,6 +136,7 @@ class RServiceManager:
         genome: str,
         openSignalMatrix: str | None,
         gtffile: str | None,
+        timeout: float | None = None,
     ):
         """
         Send a file path to the R service for processing.
@@ -77,38 +148,112 @@ class RServiceManager:
             genome: Genome assembly.
             openSignalMatrix: Path to the Open Signal Matrix file.
             gtffile: Path to the GTF file.
+            timeout: Seconds to wait for the R service to finish. None waits forever.
+
+        Returns:
+            Completion message of the R service, with paths to the output json files.
+
+        Raises:
+            RServiceException: If R failed to process the file, crashed or didn't finish in time.
         """
-        return self.run_command(
-            f"{file_path}, {digest}, {outpath}, {genome}, {openSignalMatrix}, {gtffile}\n"
+        response = self.run_command(
+            f"{file_path}, {digest}, {outpath}, {genome}, {openSignalMatrix}, {gtffile}\n",
+            timeout=timeout,
         )
+        if response.get("status") != "ok":
+            raise RServiceException(
+                f"R service failed to process {file_path}: {response.get('error')}"
+            )
+        return response
 
-    def run_command(self, command):
+    def submit(self, *args, **kwargs) -> Future:
         """
-        Sends a command to the R service for processing.
+        Run a file through the R service and return the result wrapped in a future.
+
+        The single service has no spare workers, so the file is processed before returning.
+        It keeps the same interface as RServicePool.submit.
+
+        Args:
+            *args: Positional arguments of run_file.
+            **kwargs: Keyword arguments of run_file.
+
+        Returns:
+            Completed future.
         """
+        future = Future()
         try:
-            s = socket.socket()
-            s.connect((self.host, self.port))
+            future.set_result(self.run_file(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
-            _LOGGER.info(f"RService: Sending command: {command}")
-            s.send(command.encode())
-
-            while True:
-                msg = self.check_status()
-                if msg == "idle":
-                    _LOGGER.debug(f"RService: Message recieved: {msg}")
-                    break
-                else:
-                    _LOGGER.info(f"RService: Message recieved: {msg}")
-                time.sleep(1)
-            s.close()
-            return s
+    def run_command(self, command, timeout: float | None = None) -> dict:
+        """
+        Sends a command to the R service and waits for its completion message on the same socket.
+
+        Args:
+            command: Command to send.
+            timeout: Seconds to wait for the completion message. None waits forever.
+                If it's exceeded, the R process is killed.
+
+        Returns:
+            Completion message, e.g. {"status": "ok", "exit_code": 0, "json": ..., "plots": ..., "error": None}
+
+        Raises:
+            RServiceException: If the service can't be reached, crashed or didn't finish in time.
+        """
+        _LOGGER.info(f"RService: Sending command: {command}")
+        try:
+            with socket.create_connection((self.host, self.port)) as s:
+                s.settimeout(timeout)
+                s.sendall(command.encode())
+                response = self._read_message(s)
         except ConnectionRefusedError:
-            # BedBossException("Connection refused. Make sure the R service is running.")
             _LOGGER.error(
                 "RService: Connection refused. Make sure the R service is running. Unable to send command."
             )
-            exit(1)
+            raise RServiceException(
+                f"Connection to R service on port {self.port} refused."
+            )
+        except socket.timeout:
+            self._kill()
+            raise RServiceException(
+                f"R service (port {self.port}) did not finish in {timeout} seconds: {command}"
+            )
+        _LOGGER.debug(f"RService: Message recieved: {response}")
+        return response
+
+    def _read_message(self, s: socket.socket) -> dict:
+        """
+        Read lines from the socket until a JSON completion message arrives.
+
+        Args:
+            s: Connected socket.
+
+        Returns:
+            Parsed completion message.
+
+        Raises:
+            RServiceException: If the connection was closed before the message arrived.
+        """
+        buffer = b""
+        while True:
+            chunk = s.recv(4096)
+            if not chunk:
+                raise RServiceException(
+                    f"R service (port {self.port}) closed the connection without a response."
+                    f" R process alive: {self.is_alive()}"
+                )
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.strip()
+                if not line.startswith(b"{"):
+                    continue
+                try:
+                    return json.loads(line)
+                except json.JSONDecodeError:
+                    _LOGGER.debug(f"RService: Skipping malformed message: {line}")
 
     def check_status(self):
         """
@@ -128,11 +273,36 @@ class RServiceManager:
         except ConnectionRefusedError:
             _LOGGER.warning("Connection refused. Make sure the R service is running.")
 
+    def restart_service(self):
+        """
+        Kill the R process, without waiting for the current job, and start a new one on a fresh port.
+        """
+        _LOGGER.warning(f"RService: Restarting R service on port {self.port}")
+        self._kill()
+        self.port = find_free_port(self.host)
+        self.start_service()
+
+    def _kill(self):
+        """
+        Kill the whole R process group.
+        """
+        if self.process and self.process.poll() is None:
+            try:
+                os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+                self.process.wait(timeout=5)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                self.process.kill()
+
     def terminate_service(self):
         """
         Terminates the R service by sending a termination signal and ensuring the process is stopped.
         """
-        self.run_command("done")  # send secrete "terminate" code
+        if not self.is_alive():
+            return
+        try:
+            self.run_command("done\n", timeout=5)  # send secrete "terminate" code
+        except (RServiceException, OSError):
+            pass
         if self.process:
             self.process.terminate()
             try:
@@ -143,3 +313,116 @@ class RServiceManager:
 
     def __del__(self):
         self.terminate_service()
+
+
+class RServicePool:
+    """
+    A pool of R services, each running in its own process on its own port.
+
+    Files are sent to whichever service is idle. Services that crash or don't finish
+    in time are restarted, and the failed job raises RServiceException.
+
+    Attributes:
+        services (list[RServiceManager]): R services of the pool.
+        job_timeout (float): Seconds after which a job is considered hung.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        host: str = "127.0.0.1",
+        job_timeout: float = R_SERVICE_JOB_TIMEOUT,
+    ):
+        """
+        Start the R services of the pool.
+
+        Args:
+            workers: Number of R services. Default: number of CPUs.
+            host: Host address for the socket connections. Default is "127.0.0.1".
+            job_timeout: Seconds after which a job is considered hung and its service restarted.
+        """
+        workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.job_timeout = job_timeout
+        self.services = []
+        self._idle = queue.Queue()
+        self._executor = None
+
+        try:
+            for _ in range(workers):
+                service = RServiceManager(host=host, port=find_free_port(host))
+                self.services.append(service)
+                self._idle.put(service)
+        except BaseException:
+            # services run in their own process group, so they would outlive this process
+            self.terminate_service()
+            raise
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="r-service"
+        )
+        _LOGGER.info(f"RService: Started pool of {workers} R services")
+
+    def submit(
+        self,
+        file_path: str,
+        digest: str,
+        outpath: str,
+        genome: str,
+        openSignalMatrix: str | None,
+        gtffile: str | None,
+    ) -> Future:
+        """
+        Queue a file for processing and return immediately.
+
+        Args:
+            file_path: Path to the file to be processed.
+            digest: Digest of the file.
+            outpath: Path to the output directory.
+            genome: Genome assembly.
+            openSignalMatrix: Path to the Open Signal Matrix file.
+            gtffile: Path to the GTF file.
+
+        Returns:
+            Future, that is resolved when the R service has finished the file.
+        """
+        return self._executor.submit(
+            self._run, file_path, digest, outpath, genome, openSignalMatrix, gtffile
+        )
+
+    def run_file(self, *args, **kwargs):
+        """
+        Process a file and wait for the result. Same interface as RServiceManager.run_file.
+        """
+        return self.submit(*args, **kwargs).result()
+
+    def _run(self, *args):
+        """
+        Run a job on the first idle service, restarting the service if it fails.
+        """
+        service = self._idle.get()
+        try:
+            if not service.is_alive():
+                service.restart_service()
+            return service.run_file(*args, timeout=self.job_timeout)
+        except RServiceException:
+            # R errors for a single file are reported back and leave the service usable
+            if not service.is_alive():
+                service.restart_service()
+            raise
+        finally:
+            self._idle.put(service)
+
+    def terminate_service(self):
+        """
+        Wait for queued jobs and terminate all R services of the pool.
+        """
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        for service in self.services:
+            service.terminate_service()
+
+    def __del__(self):
+        # attributes are missing if __init__ failed before they were set
+        if hasattr(self, "_executor"):
+            self.terminate_service()
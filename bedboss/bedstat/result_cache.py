@@ -0,0 +1,309 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from functools import lru_cache
+from importlib.metadata import version as _pkg_version
+from pathlib import Path
+
+from bedboss.const import (
+    BEDBOSS_CACHE_ENV_VAR,
+    BEDSTAT_CACHE_FOLDER_NAME,
+    BEDSTAT_CACHE_RESULT_FILE,
+    DEFAULT_BEDBOSS_CACHE_PATH,
+    R_STAT_PACKAGES,
+)
+from bedboss.utils import build_cache_folder, file_fingerprint
+
+_LOGGER = logging.getLogger("bedboss")
+
+# stands for the output folder in cached paths
+OUTFOLDER_PLACEHOLDER = "{bedstat_outfolder}"
+
+
+def get_bedstat_cache_folder() -> str:
+    """
+    Folder of the bedstat result cache (BEDBOSS_CACHE environment variable, default ~/.bedboss).
+
+    Returns:
+        Path to the cache folder.
+    """
+    cache_folder = os.getenv(BEDBOSS_CACHE_ENV_VAR, DEFAULT_BEDBOSS_CACHE_PATH)
+    return os.path.join(cache_folder, BEDSTAT_CACHE_FOLDER_NAME)
+
+
+@lru_cache
+def r_package_versions() -> dict[str, str]:
+    """
+    Versions of the R packages used by regionstat.R.
+
+    Returns:
+        Dict of package name and version. Missing packages have version None.
+    """
+    packages = ", ".join(f'"{package}"' for package in R_STAT_PACKAGES)
+    expression = (
+        f"for (p in c({packages})) cat(p, "
+        "tryCatch(as.character(packageVersion(p)), error = function(e) 'NA'), '\\n')"
+    )
+    try:
+        output = subprocess.run(
+            ["Rscript", "-e", expression],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as err:
+        _LOGGER.warning(f"Unable to get R package versions: {err}")
+        return {package: None for package in R_STAT_PACKAGES}
+
+    versions = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            versions[fields[0]] = None if fields[1] == "NA" else fields[1]
+    return versions
+
+
+def bedstat_version_stamp(
+    genome: str,
+    native_stats: bool = False,
+    ensdb: str = None,
+    open_signal_matrix: str = None,
+    rfg_config: str | Path = None,
+    spill_gc_values: bool = False,
+) -> str:
+    """
+    Version stamp of bedstat results: bedboss version, R package versions and annotation inputs.
+
+    Cached results with a different stamp are not used.
+
+    Args:
+        genome: Genome assembly.
+        native_stats: Statistics are computed with NumPy instead of R.
+        ensdb: Path to the ensdb gtf file.
+        open_signal_matrix: Path to the open signal matrix.
+        rfg_config: Path to the refgenie config file.
+        spill_gc_values: GC content of every region is saved.
+
+    Returns:
+        Short hex stamp.
+    """
+
+    def fingerprint(path: str | None) -> str | None:
+        if path and os.path.exists(path):
+            return file_fingerprint(path)
+        return None
+
+    inputs = {
+        "bedboss": _pkg_version("bedboss"),
+        "native_stats": native_stats,
+        "r_packages": {} if native_stats else r_package_versions(),
+        "genome": genome,
+        "ensdb": fingerprint(ensdb),
+        "open_signal_matrix": None if native_stats else fingerprint(open_signal_matrix),
+        "rfg_config": fingerprint(str(rfg_config)) if rfg_config else None,
+        "spill_gc_values": spill_gc_values,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _entry_folder(digest: str, stamp: str) -> str:
+    """
+    Cache folder of one result.
+
+    Args:
+        digest: Bed file digest.
+        stamp: Version stamp.
+
+    Returns:
+        Path to the folder.
+    """
+    return os.path.join(get_bedstat_cache_folder(), digest[:2], digest, stamp)
+
+
+def _relocate(value, old_prefix: str, new_prefix: str):
+    """
+    Replace path prefix in all strings of a (nested) result.
+
+    Args:
+        value: Result value (dict, list or scalar).
+        old_prefix: Prefix to replace.
+        new_prefix: New prefix.
+
+    Returns:
+        Value with replaced prefixes.
+    """
+    if isinstance(value, dict):
+        return {k: _relocate(v, old_prefix, new_prefix) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_relocate(v, old_prefix, new_prefix) for v in value]
+    if isinstance(value, str) and value.startswith(old_prefix):
+        return new_prefix + value[len(old_prefix) :]
+    return value
+
+
+def load_cached_stats(digest: str, stamp: str, outfolder: str) -> dict | None:
+    """
+    Load cached statistics, and copy cached artifacts (json files, plots) into the output folder.
+
+    Args:
+        digest: Bed file digest.
+        stamp: Version stamp.
+        outfolder: Bedstat output folder of the bed file.
+
+    Returns:
+        Statistics and plots metadata (as returned by bedstat), or None if result isn't cached.
+    """
+    entry_folder = _entry_folder(digest, stamp)
+    result_path = os.path.join(entry_folder, BEDSTAT_CACHE_RESULT_FILE)
+    if not os.path.exists(result_path):
+        return None
+
+    try:
+        os.makedirs(outfolder, exist_ok=True)
+        for file_name in os.listdir(entry_folder):
+            if file_name != BEDSTAT_CACHE_RESULT_FILE:
+                shutil.copy2(
+                    os.path.join(entry_folder, file_name),
+                    os.path.join(outfolder, file_name),
+                )
+        with open(result_path, encoding="utf-8") as f:
+            data = json.load(f)
+        # modification time of the folder is the last use, for eviction
+        os.utime(entry_folder)
+    except OSError as err:
+        # entry could be evicted at the same time by another process
+        _LOGGER.warning(f"Unable to use cached statistics of '{digest}': {err}")
+        return None
+
+    return _relocate(data, OUTFOLDER_PLACEHOLDER, os.path.abspath(outfolder))
+
+
+def save_cached_stats(
+    digest: str, stamp: str, outfolder: str, data: dict, replace: bool = False
+) -> None:
+    """
+    Save statistics and all artifacts of the output folder into the cache.
+
+    Errors are logged, since caching must not fail the pipeline.
+
+    Args:
+        digest: Bed file digest.
+        stamp: Version stamp.
+        outfolder: Bedstat output folder of the bed file.
+        data: Statistics and plots metadata returned by bedstat.
+        replace: Replace the cached result if it exists (e.g. it was completed with GC content).
+    """
+    outfolder = os.path.abspath(outfolder)
+    if replace:
+        _remove_entry(_entry_folder(digest, stamp))
+
+    def build(folder: str) -> None:
+        for file_name in os.listdir(outfolder):
+            file_path = os.path.join(outfolder, file_name)
+            if os.path.isfile(file_path):
+                shutil.copy2(file_path, os.path.join(folder, file_name))
+        with open(
+            os.path.join(folder, BEDSTAT_CACHE_RESULT_FILE), "w", encoding="utf-8"
+        ) as f:
+            json.dump(_relocate(data, outfolder, OUTFOLDER_PLACEHOLDER), f)
+
+    try:
+        build_cache_folder(_entry_folder(digest, stamp), build)
+    except OSError as err:
+        _LOGGER.warning(f"Unable to cache statistics of '{digest}': {err}")
+
+
+def _cache_entries() -> list[tuple[str, float, int]]:
+    """
+    All cached results.
+
+    Returns:
+        List of (folder, last use time, size in bytes).
+    """
+    entries = []
+    for result_path in Path(get_bedstat_cache_folder()).glob(
+        f"*/*/*/{BEDSTAT_CACHE_RESULT_FILE}"
+    ):
+        folder = result_path.parent
+        try:
+            size = sum(f.stat().st_size for f in folder.iterdir() if f.is_file())
+            entries.append((str(folder), folder.stat().st_mtime, size))
+        except OSError:
+            continue
+    return entries
+
+
+def _remove_entry(folder: str) -> None:
+    """
+    Remove cached result, and its digest folder if it's empty.
+
+    Args:
+        folder: Cache folder of the result.
+    """
+    shutil.rmtree(folder, ignore_errors=True)
+    try:
+        os.remove(f"{folder}.lock")
+    except OSError:
+        pass
+    for parent in (os.path.dirname(folder), os.path.dirname(os.path.dirname(folder))):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+
+
+def clear_bedstat_cache(digest: str = None) -> int:
+    """
+    Invalidate cached bedstat results.
+
+    Args:
+        digest: Bed file digest. If None, all results are removed.
+
+    Returns:
+        Number of removed results.
+    """
+    removed = 0
+    for folder, _, _ in _cache_entries():
+        if digest is None or os.path.basename(os.path.dirname(folder)) == digest:
+            _remove_entry(folder)
+            removed += 1
+    _LOGGER.info(f"Removed {removed} cached bedstat results")
+    return removed
+
+
+def evict_bedstat_cache(max_size: int = None, max_age: float = None) -> int:
+    """
+    Evict cached bedstat results by age and size.
+
+    Results not used for longer than max_age are removed first, then least recently
+    used results are removed until the cache is smaller than max_size.
+
+    Args:
+        max_size: Maximum cache size in bytes. If None, size is not limited.
+        max_age: Maximum time in seconds since last use. If None, age is not limited.
+
+    Returns:
+        Number of removed results.
+    """
+    entries = sorted(_cache_entries(), key=lambda entry: entry[1])
+    now = time.time()
+    total_size = sum(size for _, _, size in entries)
+    removed = 0
+
+    for folder, last_used, size in entries:
+        too_old = max_age is not None and now - last_used > max_age
+        too_big = max_size is not None and total_size > max_size
+        if not too_old and not too_big:
+            continue
+        _remove_entry(folder)
+        total_size -= size
+        removed += 1
+
+    _LOGGER.info(
+        f"Evicted {removed} cached bedstat results, cache size: {total_size / 1024**2:.1f} MB"
+    )
+    return removed
@@ -0,0 +1,113 @@
+# Per-stage checkpoints of run_all, so a failed run can resume at the first incomplete stage.
+import json
+import logging
+import os
+import tempfile
+
+from bedboss.const import CHECKPOINT_FOLDER_NAME
+
+_LOGGER = logging.getLogger("bedboss")
+
+STAGES = ["bedmaker", "classification", "bigbed", "bedstat", "validation", "upload"]
+
+
+class StageCheckpoint:
+    """
+    Completed stages of one bed file and their serialized outputs, stored in
+    <outfolder>/checkpoints/<digest>.json.
+
+    Checkpoints are only valid for the same inputs (e.g. genome, lite mode). If inputs
+    are different, all stages are run again.
+    """
+
+    def __init__(self, outfolder: str, digest: str, inputs: dict = None):
+        """
+        Args:
+            outfolder: Output folder of the pipeline.
+            digest: Bed file digest.
+            inputs: Pipeline inputs that affect stage outputs.
+        """
+        self.digest = digest
+        self.inputs = inputs or {}
+        self.file_path = os.path.join(
+            os.path.abspath(outfolder), CHECKPOINT_FOLDER_NAME, f"{digest}.json"
+        )
+        self.stages = self._read()
+
+    def _read(self) -> dict:
+        """
+        Read completed stages.
+
+        Returns:
+            Dict of stage name and its output.
+        """
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as err:
+            _LOGGER.warning(f"Unable to read checkpoint '{self.file_path}': {err}")
+            return {}
+        if state.get("inputs") != self.inputs:
+            _LOGGER.info(f"Inputs of '{self.digest}' changed, checkpoints are not used")
+            return {}
+        return state.get("stages", {})
+
+    def _write(self) -> None:
+        """
+        Write the state atomically, so an interrupted write doesn't corrupt it.
+        """
+        folder = os.path.dirname(self.file_path)
+        os.makedirs(folder, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=folder, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            json.dump({"inputs": self.inputs, "stages": self.stages}, f)
+        os.replace(f.name, self.file_path)
+
+    def is_done(self, stage: str) -> bool:
+        """
+        Check if the stage is completed.
+
+        Args:
+            stage: Stage name.
+
+        Returns:
+            True if the stage is completed.
+        """
+        return stage in self.stages
+
+    def get(self, stage: str):
+        """
+        Get serialized output of a completed stage.
+
+        Args:
+            stage: Stage name.
+
+        Returns:
+            Stage output, or None if the stage is not completed.
+        """
+        return self.stages.get(stage)
+
+    def save(self, stage: str, output=None) -> None:
+        """
+        Mark the stage as completed.
+
+        Args:
+            stage: Stage name.
+            output: JSON serializable output of the stage.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: '{stage}'. Stages: {STAGES}")
+        self.stages[stage] = output
+        self._write()
+        _LOGGER.debug(f"Checkpoint saved: '{self.digest}' stage '{stage}'")
+
+    def clear(self) -> None:
+        """
+        Remove all checkpoints of the bed file, e.g. after the run is completed.
+        """
+        self.stages = {}
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
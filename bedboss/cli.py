@@ -8,6 +8,7 @@ __version__ = _pkg_version("bedboss")
 from pephubclient.helpers import MessageHandler as printm
 
 from bedboss.bbuploader.cli import app_bbuploader
+from bedboss.const import UPLOAD_QUEUE_DEPTH
 from bedboss.qdrant_index.qdrant_cli import qdrant_app
 from bedboss.scripts.analysis_files import files_app
 from bedboss.scripts.snapshot import snapshot_app
@@ -103,6 +104,17 @@ def run_all(
     ),
     upload_qdrant: bool = typer.Option(False, help="Upload to Qdrant"),
     upload_s3: bool = typer.Option(False, help="Upload to S3"),
+    native_stats: bool = typer.Option(
+        False, help="Compute statistics with NumPy instead of R. [Default: False]"
+    ),
+    stats_cache: bool = typer.Option(
+        False,
+        help="Cache statistics and plots in BEDBOSS_CACHE, and reuse them for the same digest. [Default: False]",
+    ),
+    checkpoints: bool = typer.Option(
+        True,
+        help="Checkpoint completed stages, so a rerun resumes after a failure. [Default: True]",
+    ),
     # Universes
     universe: bool = typer.Option(False, help="Create a universe"),
     universe_method: str = typer.Option(
@@ -146,6 +158,9 @@ def run_all(
         update=update,
         upload_qdrant=upload_qdrant,
         upload_s3=upload_s3,
+        native_stats=native_stats,
+        stats_cache=stats_cache,
+        checkpoints=checkpoints,
         universe=universe,
         universe_method=universe_method,
         universe_bedset=universe_bedset,
@@ -189,6 +204,18 @@ def run_pep(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
     rerun: bool = typer.Option(False, help="Rerun already processed samples"),
+    workers: int = typer.Option(
+        1, help="Number of samples processed in parallel. [Default: 1]"
+    ),
+    upload_queue_depth: int = typer.Option(
+        UPLOAD_QUEUE_DEPTH,
+        help="Number of finished samples uploaded in the background while the next sample is processed. "
+        "0 disables background upload.",
+    ),
+    bulk_qdrant: bool = typer.Option(
+        False,
+        help="Index bed files in qdrant in large batches instead of one upsert per file",
+    ),
     # PipelineManager
     multi: bool = typer.Option(False, help="Run multiple samples"),
     recover: bool = typer.Option(True, help="Recover from previous run"),
@@ -228,6 +255,9 @@ def run_pep(
         lite=lite,
         rerun=rerun,
         pm=pm,
+        workers=workers,
+        upload_queue_depth=upload_queue_depth,
+        bulk_qdrant=bulk_qdrant,
     )
 
     pm.stop_pipeline()
@@ -504,6 +534,13 @@ def run_stats(
         None, help="Path to the open signal matrix file"
     ),
     just_db_commit: bool = typer.Option(False, help="Just commit to the database?"),
+    native_stats: bool = typer.Option(
+        False, help="Compute statistics with NumPy instead of R. [Default: False]"
+    ),
+    stats_cache: bool = typer.Option(
+        False,
+        help="Cache statistics and plots in BEDBOSS_CACHE, and reuse them for the same digest. [Default: False]",
+    ),
     # PipelineManager
     multi: bool = typer.Option(False, help="Run multiple samples"),
     recover: bool = typer.Option(True, help="Recover from previous run"),
@@ -518,6 +555,8 @@ def run_stats(
         ensdb=ensdb,
         open_signal_matrix=open_signal_matrix,
         just_db_commit=just_db_commit,
+        native_stats=native_stats,
+        use_cache=stats_cache,
         pm=create_pm(outfolder=outfolder, multi=multi, recover=recover, dirty=dirty),
     )
 
@@ -746,13 +785,17 @@ def update_genomes(
         file_okay=True,
         readable=True,
     ),
+    refresh: bool = typer.Option(
+        False,
+        help="Fetch genomes added to Refgenie since the local genome cache was created",
+    ),
 ):
     from bbconf.bbagent import BedBaseAgent
 
     from bedboss.refgenome_validator.refgenie_chrom_sizes import update_db_genomes
 
     bbagent = BedBaseAgent(config)
-    update_db_genomes(bbagent)
+    update_db_genomes(bbagent, refresh=refresh)
 
     print("Genomes updated successfully.")
 
@@ -837,6 +880,36 @@ def update_umap_metadata(
     _update(bbconf=config, output_path=output_path, geometry=geometry)
 
 
+@app.command(help="Remove cached bedstat results")
+def clear_stats_cache(
+    digest: str = typer.Option(
+        None, help="Digest of the bed file. If not provided, all results are removed"
+    ),
+):
+    from bedboss.bedstat.result_cache import clear_bedstat_cache
+
+    removed = clear_bedstat_cache(digest=digest)
+    printm.print_success(f"Removed {removed} cached results")
+
+
+@app.command(help="Evict cached bedstat results by size or age")
+def evict_stats_cache(
+    max_size: float = typer.Option(
+        None, help="Maximum cache size in GB. Least recently used results are removed"
+    ),
+    max_age: float = typer.Option(
+        None, help="Remove results not used for more than this number of days"
+    ),
+):
+    from bedboss.bedstat.result_cache import evict_bedstat_cache
+
+    removed = evict_bedstat_cache(
+        max_size=int(max_size * 1024**3) if max_size is not None else None,
+        max_age=max_age * 24 * 60 * 60 if max_age is not None else None,
+    )
+    printm.print_success(f"Evicted {removed} cached results")
+
+
 @app.command(help="Check installed R packages")
 def check_requirements():
     from bedboss.bedboss import requirements_check
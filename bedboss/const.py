@@ -24,8 +24,32 @@ MAX_FILE_SIZE: int = 1024 * 1024 * 1024 * 2
 MAX_FILE_SIZE_QC: int = 1024 * 1024 * 25  # 25 MB
 MAX_REGION_NUMBER: int = 5000000
 MIN_REGION_WIDTH: int = 10
+QC_PREFIX_SIZE: int = 10240  # decompressed bytes used for initial QC of remote files
+
+# remote files
+SPOOL_FOLDER_NAME: str = "remote_files"
+DOWNLOAD_BLOCK_SIZE: int = 1024 * 256
+DOWNLOAD_TIMEOUT: int = 60
+
+# bedclassifier
+# files larger than this (bytes on disk) are classified chunk by chunk, without a full DataFrame
+CLASSIFIER_STREAMING_SIZE: int = 1024 * 1024 * 256
+CLASSIFIER_CHUNK_SIZE: int = 500_000  # rows
 
 # bedstat
+R_SERVICE_JOB_TIMEOUT: int = 60 * 60  # 1 hour
+R_SERVICE_START_TIMEOUT: int = 120
+GC_HISTOGRAM_BINS: int = 100
+GC_CHUNK_SIZE: int = 100_000  # regions processed at once
+GC_WINDOW_BYTES: int = 1024 * 1024 * 4  # max packed genome window per chunk (32M bases)
+# genomes with TSS / partition annotation bundled in R GenomicDistributionsData
+R_ANNOTATED_GENOMES: list[str] = ["hg19", "hg38", "mm10", "mm9"]
+
+# upload
+# finished samples waiting for upload, before processing of the next sample blocks
+UPLOAD_QUEUE_DEPTH: int = 2
+# points upserted to qdrant at once in bulk indexing mode
+QDRANT_BULK_BATCH_SIZE: int = 1000
 
 # bedbuncher
 DEFAULT_BEDBASE_CACHE_PATH: str = "./bedbase_cache"
@@ -35,6 +59,23 @@ REFGENIE_ENV_VAR: str = "REFGENIE"
 
 DEFAULT_REFGENIE_PATH: str = os.path.join(HOME_PATH, ".refgenie")
 
+# Local cache shared by all bedboss processes on a node
+BEDBOSS_CACHE_ENV_VAR: str = "BEDBOSS_CACHE"
+DEFAULT_BEDBOSS_CACHE_PATH: str = os.path.join(HOME_PATH, ".bedboss")
+ANNOTATION_INDEX_FOLDER_NAME: str = "annotation_index"
+GC_INDEX_FOLDER_NAME: str = "gc_index"
+BEDSTAT_CACHE_FOLDER_NAME: str = "bedstat_cache"
+CHECKPOINT_FOLDER_NAME: str = "checkpoints"
+BEDSTAT_CACHE_RESULT_FILE: str = "result.json"
+# R packages whose versions are part of the bedstat cache version stamp
+R_STAT_PACKAGES: list[str] = [
+    "GenomicDistributions",
+    "GenomicDistributionsData",
+    "GenomicRanges",
+    "ensembldb",
+    "LOLA",
+]
+
 BED_PEP_REGISTRY: str = "databio/allbeds:bedbase"
 
 # UMAP constants
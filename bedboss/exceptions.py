@@ -77,3 +77,29 @@ class ValidatorException(BedBossException):
             reason: Some context why error occurred.
         """
         super().__init__(reason)
+
+
+class RServiceException(BedBossException):
+    """Exception when the R service crashed, hung or could not be reached."""
+
+    def __init__(self, reason: str = "") -> None:
+        """
+        Optionally provide explanation for exceptional condition.
+
+        Args:
+            reason: Some context why the R service failed.
+        """
+        super().__init__(reason)
+
+
+class FetchException(BedBossException):
+    """Exception when a remote file can't be downloaded."""
+
+    def __init__(self, reason: str = "") -> None:
+        """
+        Optionally provide explanation for exceptional condition.
+
+        Args:
+            reason: Some context why the download failed.
+        """
+        super().__init__(reason)
@@ -0,0 +1,223 @@
+import hashlib
+import http.client
+import logging
+import os
+import tempfile
+import urllib.request
+import zlib
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+
+from bedboss.const import (
+    DOWNLOAD_BLOCK_SIZE,
+    DOWNLOAD_TIMEOUT,
+    MAX_FILE_SIZE_QC,
+    MIN_REGION_WIDTH,
+    QC_PREFIX_SIZE,
+)
+from bedboss.exceptions import FetchException, QualityException
+from bedboss.utils import prefix_mean_region_width
+
+_LOGGER = logging.getLogger("bedboss")
+
+URL_INDEX_FOLDER_NAME = "urls"
+
+
+class FetchedFile(BaseModel):
+    url: str
+    path: str
+    digest: str
+    file_size: int
+
+
+def is_remote(path: str) -> bool:
+    """
+    Check if the path is a remote (http, https, ftp) url.
+
+    Args:
+        path: Path or url.
+
+    Returns:
+        True if the path is a url.
+    """
+    return urlparse(path).scheme in ("http", "https", "ftp")
+
+
+def _spool_path(spool_folder: str, digest: str, file_name: str) -> str:
+    """
+    Path of a file in the spool, addressed by the sha256 digest of its content.
+
+    The original file name is kept, since later steps detect compression from it.
+
+    Args:
+        spool_folder: Spool folder.
+        digest: Content digest.
+        file_name: Original file name.
+
+    Returns:
+        Path to the file.
+    """
+    return os.path.join(spool_folder, digest[:2], digest, file_name)
+
+
+def _url_index_path(spool_folder: str, url: str) -> str:
+    """
+    Path of the file that points from a url to its content in the spool.
+
+    Args:
+        spool_folder: Spool folder.
+        url: Remote url.
+
+    Returns:
+        Path to the index file.
+    """
+    url_key = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(spool_folder, URL_INDEX_FOLDER_NAME, url_key)
+
+
+def _check_prefix(url: str, prefix: bytes, file_size: int, min_region_width: int):
+    """
+    Initial QC on the decompressed beginning of the file.
+
+    Args:
+        url: Remote url.
+        prefix: Decompressed beginning of the file.
+        file_size: File size in bytes (or downloaded bytes so far).
+        min_region_width: Minimum region width threshold to pass the quality check.
+
+    Raises:
+        QualityException: If mean region width is below the threshold.
+    """
+    try:
+        mean_width = prefix_mean_region_width(prefix.decode(errors="replace"))
+    except Exception as err:
+        _LOGGER.warning(
+            "Unable to read the file, initial QC failed, but continuing anyway..."
+            f"Error: {str(err)}"
+        )
+        return
+
+    if mean_width < min_region_width:
+        raise QualityException(
+            f"Initial QC failed for '{url}'. Mean region width is '{mean_width}', where min region width is set to: '{min_region_width}'",
+            file_size=file_size,
+        )
+    _LOGGER.info(f"Initial QC passed for {url}")
+
+
+def fetch_file(
+    url: str,
+    spool_folder: str,
+    max_file_size: int = MAX_FILE_SIZE_QC,
+    min_region_width: int = MIN_REGION_WIDTH,
+) -> FetchedFile:
+    """
+    Download a remote file once into a content-addressed spool, running initial QC while downloading.
+
+    The file is hashed while it is streamed to disk, and the initial QC (file size and
+    mean region width of the first decompressed rows) runs on the fly, so a failing file
+    stops downloading early. A url that was already fetched into the spool is not
+    downloaded again. Later steps (genome prediction, bedmaker) use the local copy.
+
+    Args:
+        url: Remote url (http, https or ftp).
+        spool_folder: Folder where downloaded files are stored.
+        max_file_size: Maximum file size in bytes.
+        min_region_width: Minimum region width threshold to pass the quality check.
+
+    Returns:
+        FetchedFile object with the local path.
+
+    Raises:
+        QualityException: If the file fails initial QC (includes file_size attribute).
+        FetchException: If the file can't be downloaded.
+    """
+    index_path = _url_index_path(spool_folder, url)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            local_path = os.path.join(spool_folder, f.read().strip())
+        if os.path.isfile(local_path):
+            _LOGGER.info(f"Using spooled copy of {url}: {local_path}")
+            return FetchedFile(
+                url=url,
+                path=local_path,
+                digest=os.path.basename(os.path.dirname(local_path)),
+                file_size=os.path.getsize(local_path),
+            )
+
+    _LOGGER.info(f"Downloading remote file: {url}")
+    os.makedirs(spool_folder, exist_ok=True)
+    sha256 = hashlib.sha256()
+    file_size = 0
+    decompressor = None
+    prefix = b""
+    prefix_checked = False
+
+    tmp_file = tempfile.NamedTemporaryFile(dir=spool_folder, delete=False)
+    try:
+        try:
+            with (
+                tmp_file,
+                urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response,
+            ):
+                content_length = int(response.headers.get("Content-Length") or 0)
+                if content_length > max_file_size:
+                    raise QualityException(
+                        f"Initial QC failed for '{url}'. File size is '{content_length / (1024 * 1024):.2f} MB', where max file size is set to: '{max_file_size / (1024 * 1024):.0f} MB'",
+                        file_size=content_length,
+                    )
+
+                for block in iter(lambda: response.read(DOWNLOAD_BLOCK_SIZE), b""):
+                    file_size += len(block)
+                    if file_size > max_file_size:
+                        raise QualityException(
+                            f"Initial QC failed for '{url}'. File is larger than max file size: '{max_file_size / (1024 * 1024):.0f} MB'",
+                            file_size=file_size,
+                        )
+                    sha256.update(block)
+                    tmp_file.write(block)
+
+                    if not prefix_checked:
+                        if decompressor is None and block[:2] == b"\x1f\x8b":
+                            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+                        if decompressor:
+                            prefix += decompressor.decompress(
+                                decompressor.unconsumed_tail + block,
+                                QC_PREFIX_SIZE - len(prefix),
+                            )
+                        else:
+                            prefix += block[: QC_PREFIX_SIZE - len(prefix)]
+                        if len(prefix) >= QC_PREFIX_SIZE:
+                            _check_prefix(url, prefix, file_size, min_region_width)
+                            prefix_checked = True
+
+            if content_length and file_size != content_length:
+                # read(amt) returns what was received if the connection drops
+                raise http.client.IncompleteRead(b"", content_length - file_size)
+            if not prefix_checked:
+                _check_prefix(url, prefix, file_size, min_region_width)
+        except (OSError, zlib.error, ValueError, http.client.HTTPException) as err:
+            # e.g. IncompleteRead of a dropped connection is not an OSError
+            raise FetchException(f"Unable to download '{url}'. Error: {err}")
+    except BaseException:
+        # partial file of a failed or interrupted download is not kept
+        os.remove(tmp_file.name)
+        raise
+
+    digest = sha256.hexdigest()
+    file_name = os.path.basename(urlparse(url).path) or digest
+    local_path = _spool_path(spool_folder, digest, file_name)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    os.replace(tmp_file.name, local_path)
+
+    # index is replaced atomically, since the spool can be shared by upload workers
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=os.path.dirname(index_path), delete=False
+    ) as f:
+        f.write(os.path.relpath(local_path, spool_folder))
+    os.replace(f.name, index_path)
+
+    _LOGGER.info(f"File downloaded to: {local_path}")
+    return FetchedFile(url=url, path=local_path, digest=digest, file_size=file_size)
@@ -1,6 +1,8 @@
 import pathlib
 from enum import Enum
 
+import numpy as np
+import pandas as pd
 import pypiper
 from bbconf.models.bed_models import (
     BedClassification,
@@ -8,6 +10,7 @@ from bbconf.models.bed_models import (
     BedPlots,
     BedStatsModel,
 )
+from gtars.models import RegionSet
 from pydantic import BaseModel, ConfigDict, Field
 
 from bedboss.const import MAX_FILE_SIZE, MAX_REGION_NUMBER, MIN_REGION_WIDTH
@@ -162,3 +165,43 @@ class BedClassificationOutput(BaseModel):
     data_format: DATA_FORMAT
     compliant_columns: int
     non_compliant_columns: int
+
+
+class UploadResult(BaseModel):
+    """
+    Result of a background upload of one sample.
+    """
+
+    key: str
+    bed_digest: str
+    error: str | None = None
+
+
+class BedFileHeader(BaseModel):
+    encoding: str
+    skiprows: int
+    num_cols: int
+
+
+class ParsedBed(BaseModel):
+    """
+    BED file parsed in bedmaker and shared by the classifier, QC, bedstat and the reference validator.
+
+    bed_object is the RegionSet built by gtars when bedmaker caches the file. The columns are
+    read once more with pandas, since the RegionSet keeps the extra columns as raw text.
+
+    All columns (data) are only kept until the file is classified. Later stages use the
+    region columns: chromosome codes into chrom_names, starts and ends (None if they
+    are not integer).
+    """
+
+    bed_file: str
+    bed_object: RegionSet
+    data: pd.DataFrame | None = None
+    column_dtypes: list[str] = []
+    chrom_names: list[str] = []
+    chrom_codes: np.ndarray | None = None
+    starts: np.ndarray | None = None
+    ends: np.ndarray | None = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
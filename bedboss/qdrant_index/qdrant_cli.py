@@ -200,6 +200,10 @@ def vectorize_region_cmd(
     chunk_pep: str = typer.Option(..., help="Path to chunk CSV"),
     output_parquet: str = typer.Option(..., help="Path to write output parquet"),
     model_path: str = typer.Option(..., help="Region2Vec model path or HuggingFace ID"),
+    batch_size: int = typer.Option(64, help="Number of bed files embedded at once"),
+    threads: int = typer.Option(
+        None, help="Threads loading bed files [Default: number of CPUs]"
+    ),
 ):
     from bedboss.qdrant_index.vectorize import vectorize_region
 
@@ -207,6 +211,8 @@ def vectorize_region_cmd(
         chunk_pep=chunk_pep,
         output_parquet=output_parquet,
         model_path=model_path,
+        batch_size=batch_size,
+        threads=threads,
     )
 
 
@@ -221,6 +227,10 @@ def vectorize_hybrid_cmd(
     sparse_model_path: str = typer.Option(
         None, help="Sparse encoder model path (optional)"
     ),
+    batch_size: int = typer.Option(256, help="Number of texts embedded at once"),
+    read_chunk_size: int = typer.Option(
+        10000, help="Number of CSV rows read and written to parquet at once"
+    ),
 ):
     from bedboss.qdrant_index.vectorize import vectorize_hybrid
 
@@ -229,4 +239,6 @@ def vectorize_hybrid_cmd(
         output_parquet=output_parquet,
         model_path=model_path,
         sparse_model_path=sparse_model_path,
+        batch_size=batch_size,
+        read_chunk_size=read_chunk_size,
     )
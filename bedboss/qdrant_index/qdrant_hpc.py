@@ -48,7 +48,8 @@ echo "Hello $USER, node $(hostname). Running {chunk_id} (region vectorization)."
 bedboss qdrant vectorize-region \\
     --chunk-pep {chunk_pep_path} \\
     --output-parquet {output_parquet_path} \\
-    --model-path {model_path}
+    --model-path {model_path} \\
+    --threads {cpus_per_task}
 status=$?
 
 if [ $status -eq 0 ]; then
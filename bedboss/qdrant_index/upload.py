@@ -1,5 +1,6 @@
 """
-Upload pre-computed vectors from parquet files to Qdrant and update DB flags.
+Upload pre-computed vectors from parquet files to Qdrant and update DB flags,
+and bulk indexing of bed files processed by the pipeline.
 
 This phase requires a bbagent connection (database + qdrant).
 """
@@ -7,16 +8,21 @@ This phase requires a bbagent connection (database + qdrant).
 from __future__ import annotations
 
 import logging
+import threading
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from bbconf.bbagent import BedBaseAgent
+from bbconf.const import DEFAULT_QDRANT_GENOME_DIGESTS
 from bbconf.db_utils import Bed
 from bbconf.models.bed_models import VectorMetadata
 from qdrant_client.http.models import PointStruct
 from qdrant_client.models import SparseVector
 from sqlalchemy.orm import Session
 
+from bedboss.const import QDRANT_BULK_BATCH_SIZE
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -27,6 +33,24 @@ def _str(val) -> str:
     return str(val)
 
 
+def _vector_metadata(bed_id: str, row) -> VectorMetadata:
+    """Build the qdrant payload of a bed file from a metadata row (dict or pandas row)."""
+    return VectorMetadata(
+        id=bed_id,
+        name=_str(row.get("name")),
+        description=_str(row.get("description")),
+        genome_alias=_str(row.get("genome_alias")),
+        genome_digest=row.get("genome_digest"),
+        cell_line=_str(row.get("cell_line")),
+        cell_type=_str(row.get("cell_type")),
+        tissue=_str(row.get("tissue")),
+        target=_str(row.get("target")),
+        treatment=_str(row.get("treatment")),
+        assay=_str(row.get("assay")),
+        species_name=_str(row.get("species_name")),
+    )
+
+
 def _load_parquet_files(workdir: Path) -> pd.DataFrame:
     """Glob and concatenate all vectors.parquet files from chunk output dirs."""
     parquet_files = sorted(workdir.glob("chunks/*/output/vectors.parquet"))
@@ -80,20 +104,7 @@ def upload_region_vectors(
 
                 vector = ast.literal_eval(vector)
 
-            metadata = VectorMetadata(
-                id=bed_id,
-                name=_str(row.get("name")),
-                description=_str(row.get("description")),
-                genome_alias=_str(row.get("genome_alias")),
-                genome_digest=row.get("genome_digest"),
-                cell_line=_str(row.get("cell_line")),
-                cell_type=_str(row.get("cell_type")),
-                tissue=_str(row.get("tissue")),
-                target=_str(row.get("target")),
-                treatment=_str(row.get("treatment")),
-                assay=_str(row.get("assay")),
-                species_name=_str(row.get("species_name")),
-            )
+            metadata = _vector_metadata(bed_id, row)
 
             points_batch.append(
                 PointStruct(
@@ -178,20 +189,7 @@ def upload_hybrid_vectors(
                     values=list(sparse_values),
                 )
 
-            metadata = VectorMetadata(
-                id=bed_id,
-                name=_str(row.get("name")),
-                description=_str(row.get("description")),
-                genome_alias=_str(row.get("genome_alias")),
-                genome_digest=row.get("genome_digest"),
-                cell_line=_str(row.get("cell_line")),
-                cell_type=_str(row.get("cell_type")),
-                tissue=_str(row.get("tissue")),
-                target=_str(row.get("target")),
-                treatment=_str(row.get("treatment")),
-                assay=_str(row.get("assay")),
-                species_name=_str(row.get("species_name")),
-            )
+            metadata = _vector_metadata(bed_id, row)
 
             points_batch.append(
                 PointStruct(
@@ -258,3 +256,109 @@ def _upsert_and_mark(
         synchronize_session=False,
     )
     session.commit()
+
+
+class BulkQdrantIndexer:
+    """Collect Region2Vec embeddings of processed bed files and upsert them to qdrant in batches.
+
+    Used by the pipeline instead of indexing every bed file on upload: points are upserted
+    when `batch` embeddings are collected (and on `flush`), and file_indexed flags of the
+    whole batch are set in one statement. Bed files that were not flushed (e.g. the process
+    was killed) keep file_indexed=False and are picked up by `bedboss qdrant reindex`.
+    """
+
+    def __init__(
+        self,
+        agent: BedBaseAgent,
+        batch: int = QDRANT_BULK_BATCH_SIZE,
+        model_path: str | None = None,
+    ):
+        """
+        Args:
+            agent: BedBaseAgent object.
+            batch: Number of points to upload in one qdrant upsert call.
+            model_path: Path or HuggingFace ID of the Region2Vec model. Default: model from the bedbase config.
+        """
+        self.agent = agent
+        self.batch = batch
+        self.model_path = model_path or agent.config.config.path.region2vec
+        self.qd_client = agent.config.qdrant_file_backend.qd_client
+        self.collection = agent.config.config.qdrant.file_collection
+        self.indexed = 0
+
+        self._encoder = None
+        self._points: list[PointStruct] = []
+        self._ids: list[str] = []
+        # bed files can be added from the background upload thread
+        self._lock = threading.Lock()
+
+    def _get_encoder(self):
+        """Load the Region2Vec model on first use."""
+        if self._encoder is None:
+            from geniml.region2vec.main import Region2VecExModel
+
+            _LOGGER.info(f"Loading Region2Vec model from {self.model_path}")
+            self._encoder = Region2VecExModel(self.model_path)
+        return self._encoder
+
+    def add(self, bed_id: str, bed_file, metadata: dict) -> bool:
+        """Embed a bed file and queue its point. A full batch is upserted right away.
+
+        Only bed files of genomes indexed in qdrant (DEFAULT_QDRANT_GENOME_DIGESTS) are added.
+
+        Args:
+            bed_id: Bed file digest.
+            bed_file: Path to the bed file, or gtars RegionSet object.
+            metadata: Metadata of the bed file (name, description, genome_digest, annotations).
+
+        Returns:
+            True if the bed file was queued for indexing.
+        """
+        if metadata.get("genome_digest") not in DEFAULT_QDRANT_GENOME_DIGESTS:
+            _LOGGER.info(f"Genome of '{bed_id}' is not indexed in qdrant. Skipping.")
+            return False
+
+        if isinstance(bed_file, str):
+            from gtars.models import RegionSet
+
+            bed_file = RegionSet(bed_file)
+        vector = np.mean(self._get_encoder().encode(bed_file), axis=0)
+
+        with self._lock:
+            self._points.append(
+                PointStruct(
+                    id=bed_id,
+                    vector=vector.tolist(),
+                    payload=_vector_metadata(bed_id, metadata).model_dump(),
+                )
+            )
+            self._ids.append(bed_id)
+            if len(self._points) >= self.batch:
+                self._flush()
+        return True
+
+    def flush(self) -> None:
+        """Upsert all queued points and mark their bed files as indexed."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Upsert queued points. Must be called with the lock held."""
+        if not self._points:
+            return
+        with Session(self.agent.config.db_engine.engine) as session:
+            _upsert_and_mark(
+                session,
+                self.qd_client,
+                self.collection,
+                self._points,
+                self._ids,
+                "file_indexed",
+            )
+        self.indexed += len(self._points)
+        _LOGGER.info(
+            f"Upserted {len(self._points)} points to '{self.collection}' "
+            f"({self.indexed} in total)"
+        )
+        self._points = []
+        self._ids = []
@@ -9,6 +9,8 @@ database connection is needed.
 from __future__ import annotations
 
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -32,25 +34,78 @@ METADATA_COLUMNS = [
     "species_name",
 ]
 
+# bed files embedded at once by vectorize_region
+REGION_BATCH_SIZE = 64
+# texts embedded at once, and CSV rows read and written at once by vectorize_hybrid
+HYBRID_BATCH_SIZE = 256
+HYBRID_READ_CHUNK_SIZE = 10_000
+
+
+def _load_token_ids(bb_client, encoder, bed_id: str) -> np.ndarray:
+    """Load a bed file (local cache first, then BEDbase) and tokenize it with the model's universe.
+
+    Args:
+        bb_client: BBClient object.
+        encoder: Region2VecExModel object.
+        bed_id: Bed file identifier.
+
+    Returns:
+        Token ids of the bed file regions.
+    """
+    from gtars.models import RegionSet as GRegionSet
+
+    try:
+        bed_region_set = GRegionSet(bb_client.seek(bed_id))
+    except FileNotFoundError:
+        bed_region_set = bb_client.load_bed(bed_id)
+    return np.asarray(encoder.tokenizer.encode(bed_region_set), dtype=np.int64)
+
+
+def _mean_embeddings(weights: np.ndarray, token_ids: list[np.ndarray]) -> np.ndarray:
+    """Mean token embedding of every bed file in a batch.
+
+    Token ids of all files are packed into one ragged array, embedded with one lookup,
+    and averaged per file using the file offsets.
+
+    Args:
+        weights: Embedding matrix of the model (vocabulary size x embedding dimension).
+        token_ids: Token ids of each file. Every file must have at least one token.
+
+    Returns:
+        Matrix of mean embeddings (number of files x embedding dimension).
+    """
+    lengths = np.array([len(ids) for ids in token_ids])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    embeddings = weights[np.concatenate(token_ids)]
+    return np.add.reduceat(embeddings, offsets, axis=0) / lengths[:, None]
+
 
 def vectorize_region(
     chunk_pep: str,
     output_parquet: str,
     model_path: str,
+    batch_size: int = REGION_BATCH_SIZE,
+    threads: int | None = None,
 ) -> None:
     """Vectorize bed files using Region2Vec. Writes results to parquet.
 
+    Bed files are loaded and tokenized by a thread pool, and embedded in batches of
+    `batch_size` files. Region2Vec embeds each token independently, so the mean of a file
+    is computed from one embedding lookup of the whole batch.
+
     Args:
         chunk_pep: Path to chunk CSV with sample_name + metadata columns.
         output_parquet: Path to write output parquet file.
         model_path: Path or HuggingFace ID for the Region2VecExModel.
+        batch_size: Number of bed files embedded at once.
+        threads: Number of threads loading and tokenizing bed files. Default: number of CPUs.
     """
     from geniml.bbclient import BBClient
     from geniml.region2vec.main import Region2VecExModel
-    from gtars.models import RegionSet as GRegionSet
 
     _LOGGER.info(f"Loading Region2Vec model from {model_path}")
     encoder = Region2VecExModel(model_path)
+    weights = encoder._model.projection.weight.detach().cpu().numpy()
 
     df = pd.read_csv(chunk_pep)
     _LOGGER.info(f"Processing {len(df)} bed files")
@@ -58,27 +113,42 @@ def vectorize_region(
     bb_client = BBClient()
     rows = []
     failed_ids = []
-
-    for _, row in df.iterrows():
-        bed_id = row["sample_name"]
-        try:
-            try:
-                bed_region_set = GRegionSet(bb_client.seek(bed_id))
-            except FileNotFoundError:
-                bed_region_set = bb_client.load_bed(bed_id)
-
-            embedding = np.mean(encoder.encode(bed_region_set), axis=0)
-            vector = embedding.tolist()
-
-            record = {"vector": vector}
-            for col in METADATA_COLUMNS:
-                record[col] = row.get(col)
-            rows.append(record)
-
-        except Exception as e:
-            _LOGGER.warning(f"Failed to vectorize {bed_id}: {e}")
-            failed_ids.append(bed_id)
-            continue
+    records = df.to_dict("records")
+
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as executor:
+        for start in range(0, len(records), batch_size):
+            batch = records[start : start + batch_size]
+            futures = [
+                executor.submit(_load_token_ids, bb_client, encoder, row["sample_name"])
+                for row in batch
+            ]
+
+            batch_rows = []
+            batch_ids = []
+            for row, future in zip(batch, futures):
+                bed_id = row["sample_name"]
+                try:
+                    token_ids = future.result()
+                except Exception as e:
+                    _LOGGER.warning(f"Failed to vectorize {bed_id}: {e}")
+                    failed_ids.append(bed_id)
+                    continue
+                if len(token_ids) == 0:
+                    _LOGGER.warning(f"Failed to vectorize {bed_id}: no tokens")
+                    failed_ids.append(bed_id)
+                    continue
+                batch_rows.append(row)
+                batch_ids.append(token_ids)
+
+            if not batch_rows:
+                continue
+            vectors = _mean_embeddings(weights, batch_ids)
+            for row, vector in zip(batch_rows, vectors):
+                record = {"vector": vector.tolist()}
+                for col in METADATA_COLUMNS:
+                    record[col] = row.get(col)
+                rows.append(record)
+            _LOGGER.info(f"Vectorized {start + len(batch)} / {len(records)} bed files")
 
     if not rows:
         _LOGGER.warning("No files were successfully vectorized")
@@ -99,20 +169,76 @@ def vectorize_region(
         failed_path.write_text("\n".join(failed_ids) + "\n")
 
 
+def _metadata_text(row: dict) -> str:
+    """Text of bed file metadata that is embedded for hybrid search."""
+    return (
+        f"biosample is {row.get('cell_line')} / {row.get('cell_type')} / "
+        f"{row.get('tissue')} with target {row.get('target')} "
+        f"assay {row.get('assay')}."
+        f"File name {row.get('name')} with summary {row.get('description')}"
+    )
+
+
+def _split_sparse_rows(
+    rows: np.ndarray, cols: np.ndarray, values: np.ndarray, n_rows: int
+) -> list[tuple[list[int], list[float]]]:
+    """Split a coalesced (row-sorted) COO matrix into per-row indices and values.
+
+    Args:
+        rows: Row index of every non-zero value, sorted.
+        cols: Column index of every non-zero value.
+        values: Non-zero values.
+        n_rows: Number of rows of the matrix.
+
+    Returns:
+        List of (indices, values) of every row.
+    """
+    bounds = np.searchsorted(rows, np.arange(n_rows + 1))
+    return [
+        (cols[begin:end].tolist(), values[begin:end].tolist())
+        for begin, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _hybrid_schema():
+    """Parquet schema of vectorize_hybrid output."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("dense_vector", pa.list_(pa.float32())),
+            ("sparse_indices", pa.list_(pa.int64())),
+            ("sparse_values", pa.list_(pa.float32())),
+        ]
+        + [(col, pa.string()) for col in METADATA_COLUMNS]
+    )
+
+
 def vectorize_hybrid(
     chunk_pep: str,
     output_parquet: str,
     model_path: str,
     sparse_model_path: str | None = None,
+    batch_size: int = HYBRID_BATCH_SIZE,
+    read_chunk_size: int = HYBRID_READ_CHUNK_SIZE,
 ) -> None:
     """Vectorize bed metadata text using dense + sparse encoders. Writes to parquet.
 
+    The chunk CSV is read `read_chunk_size` rows at a time, texts are embedded in batches
+    of `batch_size`, and every part is appended to the parquet file as a row group, so
+    memory doesn't grow with the chunk size. If a batch fails, its texts are embedded one
+    by one to find the failing rows.
+
     Args:
         chunk_pep: Path to chunk CSV with sample_name + metadata columns.
         output_parquet: Path to write output parquet file.
         model_path: Path or HuggingFace ID for the dense text encoder.
         sparse_model_path: Path or HuggingFace ID for the sparse encoder. Optional.
+        batch_size: Number of texts embedded at once.
+        read_chunk_size: Number of CSV rows read and written at once.
     """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
     from fastembed import TextEmbedding
 
     _LOGGER.info(f"Loading dense encoder from {model_path}")
@@ -125,56 +251,76 @@ def vectorize_hybrid(
         _LOGGER.info(f"Loading sparse encoder from {sparse_model_path}")
         sparse_encoder = STSparseEncoder(sparse_model_path)
 
-    df = pd.read_csv(chunk_pep)
-    _LOGGER.info(f"Processing {len(df)} bed files for hybrid search")
+    def embed(texts: list[str]) -> tuple[list, list]:
+        dense = [
+            vector.tolist()
+            for vector in dense_encoder.embed(texts, batch_size=batch_size)
+        ]
+        if not sparse_encoder:
+            return dense, [(None, None)] * len(texts)
+        sparse = sparse_encoder.encode(texts, batch_size=batch_size).coalesce()
+        rows, cols = sparse.indices().cpu().numpy()
+        return dense, _split_sparse_rows(
+            rows, cols, sparse.values().cpu().numpy(), len(texts)
+        )
 
-    rows = []
+    schema = _hybrid_schema()
+    written = 0
     failed_ids = []
 
-    for _, row in df.iterrows():
-        bed_id = row["sample_name"]
-        try:
-            text = (
-                f"biosample is {row.get('cell_line')} / {row.get('cell_type')} / "
-                f"{row.get('tissue')} with target {row.get('target')} "
-                f"assay {row.get('assay')}."
-                f"File name {row.get('name')} with summary {row.get('description')}"
-            )
-
-            dense_vec = list(list(dense_encoder.embed(text))[0])
-
-            record = {"dense_vector": dense_vec}
-
-            if sparse_encoder:
-                sparse_result = sparse_encoder.encode(text).coalesce()
-                record["sparse_indices"] = sparse_result.indices().tolist()[0]
-                record["sparse_values"] = sparse_result.values().tolist()
-            else:
-                record["sparse_indices"] = None
-                record["sparse_values"] = None
-
+    with pq.ParquetWriter(output_parquet, schema) as writer:
+        for df in pd.read_csv(chunk_pep, chunksize=read_chunk_size):
+            records = df.to_dict("records")
+            texts = [_metadata_text(row) for row in records]
+            _LOGGER.info(f"Processing {len(records)} bed files for hybrid search")
+
+            dense_vectors = []
+            sparse_vectors = []
+            ok_records = []
+            for start in range(0, len(records), batch_size):
+                batch = records[start : start + batch_size]
+                batch_texts = texts[start : start + batch_size]
+                try:
+                    dense, sparse = embed(batch_texts)
+                    dense_vectors.extend(dense)
+                    sparse_vectors.extend(sparse)
+                    ok_records.extend(batch)
+                    continue
+                except Exception as e:
+                    _LOGGER.warning(f"Batch failed, embedding one by one: {e}")
+                for row, text in zip(batch, batch_texts):
+                    try:
+                        dense, sparse = embed([text])
+                    except Exception as e:
+                        _LOGGER.warning(
+                            f"Failed to vectorize {row['sample_name']}: {e}"
+                        )
+                        failed_ids.append(row["sample_name"])
+                        continue
+                    dense_vectors.extend(dense)
+                    sparse_vectors.extend(sparse)
+                    ok_records.append(row)
+
+            columns = {
+                "dense_vector": dense_vectors,
+                "sparse_indices": [indices for indices, _ in sparse_vectors],
+                "sparse_values": [values for _, values in sparse_vectors],
+            }
             for col in METADATA_COLUMNS:
-                record[col] = row.get(col)
-            rows.append(record)
-
-        except Exception as e:
-            _LOGGER.warning(f"Failed to vectorize {bed_id}: {e}")
-            failed_ids.append(bed_id)
-            continue
-
-    if not rows:
+                columns[col] = [
+                    None if pd.isna(row.get(col)) else str(row.get(col))
+                    for row in ok_records
+                ]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            written += len(ok_records)
+            _LOGGER.info(f"Wrote {written} vectors to {output_parquet}")
+
+    if not written:
+        # empty parquet (with schema) is still written, so the upload step doesn't break
         _LOGGER.warning("No files were successfully vectorized")
-        out = pd.DataFrame(
-            columns=["dense_vector", "sparse_indices", "sparse_values"]
-            + METADATA_COLUMNS
-        )
-        out.to_parquet(output_parquet, index=False)
     else:
-        out = pd.DataFrame(rows)
-        out.to_parquet(output_parquet, index=False)
         _LOGGER.info(
-            f"Wrote {len(rows)} vectors to {output_parquet} "
-            f"({len(failed_ids)} failures)"
+            f"Wrote {written} vectors to {output_parquet} ({len(failed_ids)} failures)"
         )
 
     if failed_ids:
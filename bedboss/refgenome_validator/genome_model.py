@@ -1,3 +1,6 @@
+from typing import Callable
+
+
 class GenomeModel:
     """
         Initialize genome model
@@ -10,7 +13,7 @@ class GenomeModel:
     def __init__(
         self,
         genome_alias: str,
-        chrom_sizes_file: str | dict[str, int],
+        chrom_sizes_file: str | dict[str, int] | Callable[[], dict[str, int]],
         genome_digest: str | None = None,
         # common_aliases: Optional[List] = None,
         # exclude_ranges_names: Optional[List] = None,
@@ -18,7 +21,8 @@ class GenomeModel:
         self._genome_alias = genome_alias
         self.chrom_sizes_file = chrom_sizes_file
         self._genome_digest = genome_digest
-        self._chrom_sizes = self.get_chrom_sizes()
+        # loaded on first use
+        self._chrom_sizes = None
         # self.common_aliases = common_aliases  # What are the other names for the other this reference genomes
         # self.excluded_ranges_names = exclude_ranges_names  # Which bed file digests from the excluded ranges are associated with this reference genome?
 
@@ -32,6 +36,8 @@ class GenomeModel:
 
     @property
     def chrom_sizes(self):
+        if self._chrom_sizes is None:
+            self._chrom_sizes = self.get_chrom_sizes()
         return self._chrom_sizes
 
     def get_chrom_sizes(self) -> dict:
@@ -51,6 +57,8 @@ class GenomeModel:
                 for line in f:
                     chrom, size = line.strip().split("\t")
                     chrom_sizes[chrom] = int(size)
+        elif callable(self.chrom_sizes_file):
+            chrom_sizes = self.chrom_sizes_file()
         else:
             # TODO: needs to be validated
             chrom_sizes = self.chrom_sizes_file
@@ -15,13 +15,14 @@ from bedboss.refgenome_validator.models import (
     RatingModel,
     SequenceFitStats,
 )
-from bedboss.refgenome_validator.refgenie_chrom_sizes import get_chrom_sizes
+from bedboss.refgenome_validator.seqcol_cache import SeqColStore, get_seqcol_store
 from bedboss.refgenome_validator.utils import (
     get_bed_chrom_info,
     parse_IGD_output,
     predict_from_compatibility_resutlts,
     run_igd_command,
 )
+from bedboss.refgenome_validator.validator_index import ValidatorIndex
 
 _LOGGER = logging.getLogger("bedboss")
 
@@ -45,8 +46,11 @@ class ReferenceValidator:
                 If not provided these metrics are not computed. Default: None.
         """
 
+        # default genomes are shared by all validators of the process, with one index
+        self._store: SeqColStore | None = None
         if not genome_models:
-            genome_models = self._build_default_models()
+            self._store = get_seqcol_store()
+            genome_models = self._store.genome_models()
         elif isinstance(genome_models, str):
             genome_models = list(genome_models)
         elif not isinstance(genome_models, list):
@@ -56,6 +60,22 @@ class ReferenceValidator:
 
         self.genome_models: list[GenomeModel] = genome_models
         self.igd_path = igd_path
+        self._index: ValidatorIndex | None = None
+        self._index_models: list[GenomeModel] = []
+        self._store_models = list(genome_models) if self._store else []
+
+    @property
+    def index(self) -> ValidatorIndex:
+        """
+        Compiled chrom sizes of all genome models, rebuilt when the models change.
+        """
+        if self._index is None or self._index_models != self.genome_models:
+            if self._store is not None and self.genome_models == self._store_models:
+                self._index = self._store.validator_index()
+            else:
+                self._index = ValidatorIndex(self.genome_models)
+            self._index_models = list(self.genome_models)
+        return self._index
 
     @staticmethod
     def calculate_chrom_stats(
@@ -272,35 +292,24 @@ class ReferenceValidator:
         if not bed_chrom_info:
             raise ValidatorException("Incorrect bed file provided")
 
-        model_compat_stats = {}
-
-        for genome_model in self.genome_models:
-            # First and Second Layer of Compatibility
-            model_compat_stats[
-                genome_model.genome_digest
-            ]: CompatibilityStats = self.calculate_chrom_stats(
-                bed_chrom_info, genome_model.chrom_sizes
-            )
+        # First and Second Layer of Compatibility, and rating, for all genomes at once
+        if concise and not self.igd_path:
+            return self.index.compatibility(bed_chrom_info, concise=True)
+        model_compat_stats = self.index.compatibility(bed_chrom_info)
 
+        # IGD overlaps don't depend on the genome, so they are queried once.
+        # Without igd_path they are {"igd_stats": None}
+        igd_stats = None
+        for stats in model_compat_stats.values():
             # Third layer - IGD, only if layer 1 and layer 2 have passed
             if (
-                model_compat_stats[
-                    genome_model.genome_digest
-                ].chrom_name_stats.passed_chrom_names
-                and not model_compat_stats[
-                    genome_model.genome_digest
-                ].chrom_length_stats.beyond_range
+                stats.chrom_name_stats.passed_chrom_names
+                and not stats.chrom_length_stats.beyond_range
             ):
-                model_compat_stats[
-                    genome_model.genome_digest
-                ].igd_stats = self.get_igd_overlaps(bedfile)
-
-            # Calculate compatibility rating
-            model_compat_stats[
-                genome_model.genome_digest
-            ].compatibility = self.calculate_rating(
-                model_compat_stats[genome_model.genome_digest]
-            )
+                if igd_stats is None:
+                    igd_stats = self.get_igd_overlaps(bedfile)
+                stats.igd_stats = igd_stats
+
         if concise:
             concise_dict = {}
             for name, stats in model_compat_stats.items():
@@ -402,32 +411,6 @@ class ReferenceValidator:
         """
         ...
 
-    @staticmethod
-    def _build_default_models() -> list[GenomeModel]:
-        """
-        Build a default list of GenomeModels from the chrom.sizes folder.
-        Uses file names as genome alias.
-
-        return list[GenomeModel]
-        """
-
-        # OLD: TO BE DELETED IN FUTURE RELEASES
-        # dir_path = os.path.dirname(os.path.realpath(__file__))
-        #
-        # chrm_sizes_directory = os.path.join(dir_path, "chrom_sizes")
-        #
-        # all_genome_models = []
-        # for root, dirs, files in os.walk(chrm_sizes_directory):
-        #     for file in files:
-        #         if file.endswith(".sizes"):
-        #             curr_genome_model = GenomeModel(
-        #                 genome_alias=file, chrom_sizes_file=os.path.join(root, file)
-        #             )
-        #             all_genome_models.append(curr_genome_model)
-        #
-        # return all_genome_models
-        return get_chrom_sizes()
-
     @staticmethod
     def _create_concise_output(output: CompatibilityStats) -> CompatibilityConcise:
         """
@@ -4,12 +4,14 @@ import json
 import logging
 import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
 import requests
 from bbconf import BedBaseAgent
 from geniml.bbclient.const import DEFAULT_CACHE_FOLDER
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter, Retry
 from tqdm import tqdm
 
 from bedboss.const import PKG_NAME
@@ -17,14 +19,22 @@ from bedboss.exceptions import BedBossException
 from bedboss.refgenome_validator.genome_model import GenomeModel
 
 BASE_URL = "https://api.refgenie.org"
-GENOMES_URL = os.path.join(BASE_URL, "v4/genomes?limit=1000")
-SEQ_COL_URL = os.path.join(
-    BASE_URL, "seqcol/collection/{digest}?collated=true&attribute=name_length_pairs"
-)
+GENOMES_PATH = "v4/genomes?limit=1000"
+SEQ_COL_PATH = "seqcol/collection/{digest}?collated=true&attribute=name_length_pairs"
+GENOMES_URL = os.path.join(BASE_URL, GENOMES_PATH)
+SEQ_COL_URL = os.path.join(BASE_URL, SEQ_COL_PATH)
 SEQ_COL_URL_JSON_URL = (
     "https://huggingface.co/databio/bedbase-umap/resolve/main/genome_seqcol.json"
 )
 
+SEQ_COL_JSON_FILE = "genome_seqcol.json"
+# fetched genomes of an unfinished download, one JSON line per genome
+SEQ_COL_JOURNAL_SUFFIX = ".journal.jsonl"
+SEQ_COL_WORKERS = 8
+SEQ_COL_RETRIES = 5
+SEQ_COL_BACKOFF_FACTOR = 0.5
+SEQ_COL_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
 _LOGGER = logging.getLogger(PKG_NAME)
 
 
@@ -44,12 +54,41 @@ class Genomes(BaseModel):
     genomes: list[SeqColGenome]
 
 
-def run_requests(url, timeout=60) -> Any:
+def seq_col_session(workers: int = SEQ_COL_WORKERS) -> requests.Session:
+    """
+    Create a session for Refgenie requests, with a connection pool for concurrent requests
+    and retries with exponential backoff.
+
+    Args:
+        workers: Number of concurrent requests (size of the connection pool).
+
+    Returns:
+        Requests session.
+    """
+    retry = Retry(
+        total=SEQ_COL_RETRIES,
+        backoff_factor=SEQ_COL_BACKOFF_FACTOR,
+        status_forcelist=SEQ_COL_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+    )
+    adapter = HTTPAdapter(pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def run_requests(url, timeout=60, session: requests.Session | None = None) -> Any:
     """
     Run a GET request to the specified URL and return the response.
+
+    Args:
+        url: URL to request.
+        timeout: Request timeout in seconds.
+        session: Session to use. If None, a new connection is opened.
     """
     try:
-        response = requests.get(url, timeout=timeout)
+        response = (session or requests).get(url, timeout=timeout)
         response.raise_for_status()  # Raise an error for bad responses
         return response.json()
     except requests.RequestException as e:
@@ -59,33 +98,48 @@ def run_requests(url, timeout=60) -> Any:
         return None
 
 
-def get_genome_list() -> list[dict]:
+def get_genome_list(
+    base_url: str = BASE_URL, session: requests.Session | None = None
+) -> list[dict]:
     """
     Fetch the list of genomes from Refgenie.
+
+    Args:
+        base_url: Refgenie API URL.
+        session: Session to use.
     """
 
-    genome_data = run_requests(GENOMES_URL)
+    genome_data = run_requests(os.path.join(base_url, GENOMES_PATH), session=session)
     if genome_data:
         return genome_data.get("items", [])
     warnings.warn("Failed to fetch genomes from Refgenie, returning empty list.")
     return []
 
 
-def seq_col_from_digest(digest: str) -> list[SeqCol]:
+def seq_col_from_digest(
+    digest: str, base_url: str = BASE_URL, session: requests.Session | None = None
+) -> list[SeqCol]:
     """
 
     Fetch sequence collection from Refgenie using the genome digest.
 
     Args:
         digest: The digest of the genome to fetch the sequence collection for.
+        base_url: Refgenie API URL.
+        session: Session to use.
 
     Returns:
         A list of SeqCol objects containing sequence names and lengths.
+
+    Raises:
+        BedBossException: If the sequence collection can't be fetched.
     """
-    url = SEQ_COL_URL.format(digest=digest)
+    url = os.path.join(base_url, SEQ_COL_PATH).format(digest=digest)
 
     # Getting first level of genome info
-    response = run_requests(url)
+    response = run_requests(url, session=session)
+    if response is None:
+        raise BedBossException(f"Failed to fetch sequence collection of '{digest}'")
     return_list = []
 
     for item in response:
@@ -94,38 +148,150 @@ def seq_col_from_digest(digest: str) -> list[SeqCol]:
     return return_list
 
 
-def get_seq_col() -> Genomes:
+def read_seq_col_journal(journal_path: str) -> dict[str, SeqColGenome]:
+    """
+    Read genomes fetched by an unfinished download.
+
+    Args:
+        journal_path: Path to the journal file.
+
+    Returns:
+        Dict of genome digest and its sequence collection.
+    """
+    if not os.path.exists(journal_path):
+        return {}
+
+    genomes = {}
+    with open(journal_path, "r") as f:
+        for line in f:
+            try:
+                genome = SeqColGenome.model_validate_json(line)
+            except ValueError:
+                # last line of an interrupted write
+                continue
+            genomes[genome.digest] = genome
+    return genomes
+
+
+def get_seq_col(
+    base_url: str = BASE_URL,
+    cached: Genomes | None = None,
+    journal_path: str | None = None,
+    workers: int = SEQ_COL_WORKERS,
+) -> Genomes:
     """
     Fetch sequence collections for all genomes from Refgenie and return them as a Genomes object
     containing a list of SeqColGenome objects.
 
-    This function retrieves the list of genomes, fetches their sequence collections,
+    This function retrieves the list of genomes, and fetches sequence collections of genomes
+    that are not cached concurrently, over one pooled session with retries. Each fetched genome
+    is appended to the journal file, so if the download fails or is interrupted, the next run
+    only fetches the remaining genomes.
+
+    Args:
+        base_url: Refgenie API URL.
+        cached: Already downloaded genomes. Only genomes missing from it are fetched.
+        journal_path: Path to the journal file of fetched genomes. If None, no journal is kept.
+        workers: Number of concurrent requests.
 
     Returns:
         Genomes object containing SeqColGenome objects for each genome.
 
+    Raises:
+        BedBossException: If the genome list or any sequence collection can't be fetched.
     """
+    session = seq_col_session(workers)
+    try:
+        genomes = get_genome_list(base_url, session=session)
+        if not genomes:
+            raise BedBossException("Failed to fetch genome list from Refgenie.")
+
+        done = {genome.digest: genome for genome in cached.genomes} if cached else {}
+        if journal_path:
+            done.update(read_seq_col_journal(journal_path))
+        missing = [info for info in genomes if info["digest"] not in done]
+        _LOGGER.info(
+            f"{len(genomes) - len(missing)} genomes are cached, fetching {len(missing)} from Refgenie"
+        )
 
-    genomes = get_genome_list()
-    if not genomes:
-        raise BedBossException("Failed to fetch genome list from Refgenie.")
+        failed = []
+        journal = open(journal_path, "a") if journal_path and missing else None
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        seq_col_from_digest, info["digest"], base_url, session
+                    ): info
+                    for info in missing
+                }
+                for future in tqdm(
+                    as_completed(futures),
+                    total=len(futures),
+                    desc="Downloading genomes from refgenie...",
+                ):
+                    digest = futures[future]["digest"]
+                    try:
+                        collection = future.result()
+                    except Exception as e:
+                        _LOGGER.error(f"Failed to fetch genome '{digest}': {e}")
+                        failed.append(digest)
+                        continue
+                    done[digest] = SeqColGenome(
+                        digest=digest, description="", collection=collection
+                    )
+                    if journal:
+                        journal.write(done[digest].model_dump_json() + "\n")
+                        journal.flush()
+        finally:
+            if journal:
+                journal.close()
+    finally:
+        session.close()
+
+    if failed:
+        raise BedBossException(
+            f"Failed to fetch {len(failed)} of {len(missing)} sequence collections from Refgenie."
+            + (f" Fetched ones are kept in '{journal_path}'." if journal_path else "")
+        )
 
-    return_list = []
-    # genomes = genomes[500:-1]  # TEMP for testing
-    for info in tqdm(genomes, desc="Downloading genomes from refgenie..."):
-        digest = info["digest"]
-        seq_col = seq_col_from_digest(digest)
-
-        return_list.append(
-            SeqColGenome(
-                genome=info["aliases"][0],
-                digest=digest,
-                description=info["description"],
-                collection=seq_col,
+    # aliases and descriptions are taken from the current genome list
+    return Genomes(
+        genomes=[
+            done[info["digest"]].model_copy(
+                update={
+                    "genome": info["aliases"][0],
+                    "description": info["description"],
+                }
             )
-        )
+            for info in genomes
+        ]
+    )
+
+
+def refresh_seq_col_json(
+    json_path: str, base_url: str = BASE_URL, workers: int = SEQ_COL_WORKERS
+) -> Genomes:
+    """
+    Update the genome_seqcol.json file with genomes from Refgenie. Only genomes that
+    are missing from the file are fetched.
 
-    return Genomes(genomes=return_list)
+    Args:
+        json_path: Path to the JSON file. It's created if it doesn't exist.
+        base_url: Refgenie API URL.
+        workers: Number of concurrent requests.
+
+    Returns:
+        Genomes object of all Refgenie genomes.
+    """
+    cached = read_seq_col_from_json(json_path) if os.path.exists(json_path) else None
+    journal_path = json_path + SEQ_COL_JOURNAL_SUFFIX
+    genomes = get_seq_col(
+        base_url=base_url, cached=cached, journal_path=journal_path, workers=workers
+    )
+    save_seq_col_to_json(genomes, output_path=json_path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    return genomes
 
 
 def save_seq_col_to_json(genomes: Genomes, output_path: str = "genome_seqcol.json"):
@@ -204,35 +370,56 @@ def modify_for_analysis(genomes: Genomes) -> list[GenomeModel]:
     return genome_list
 
 
-def get_chrom_sizes() -> list[GenomeModel]:
+def get_seq_col_json() -> str:
     """
-    Get chromosome sizes from Refgenie and return them as a list of GenomeModel objects.
+    Get path to the cached genome_seqcol.json file.
+
+    If the cached file doesn't exist, it downloads the data and saves it.
 
-    If the cached file exists, it reads from there; otherwise, it downloads the data and saves it.
+    Returns:
+        Path to the JSON file.
     """
-    cached_file_path = os.path.join(DEFAULT_CACHE_FOLDER, "genome_seqcol.json")
+    cached_file_path = os.path.join(DEFAULT_CACHE_FOLDER, SEQ_COL_JSON_FILE)
 
-    try:
-        ret = read_seq_col_from_json(input_path=cached_file_path)
-    except FileNotFoundError:
+    if not os.path.exists(cached_file_path):
         try:
             _LOGGER.info("No genome_seqcol.json found, downloading from refgenie...")
-            ret = get_seq_col()
+            refresh_seq_col_json(cached_file_path)
         except Exception as e:
             _LOGGER.info(f"Failed to fetch genome data from Refgenie: {e}")
             ret = read_seq_col_from_url(input_path=SEQ_COL_URL_JSON_URL)
-        save_seq_col_to_json(ret, output_path=cached_file_path)
-    return modify_for_analysis(ret)
+            save_seq_col_to_json(ret, output_path=cached_file_path)
+    return cached_file_path
 
 
-def update_db_genomes(bbagent: BedBaseAgent) -> None:
+def get_chrom_sizes() -> list[GenomeModel]:
+    """
+    Get chromosome sizes from Refgenie and return them as a list of GenomeModel objects.
+
+    Genomes are loaded from the binary cache of genome_seqcol.json (see seqcol_cache),
+    which is downloaded if it doesn't exist.
+    """
+    # seqcol_cache imports this module
+    from bedboss.refgenome_validator.seqcol_cache import get_seqcol_store
+
+    return get_seqcol_store().genome_models()
+
+
+def update_db_genomes(bbagent: BedBaseAgent, refresh: bool = False) -> None:
     """
     Update the database with the latest genome information from Refgenie.
     This function fetches the sequence collections and updates the database accordingly.
+
+    Args:
+        bbagent: BedBaseAgent object.
+        refresh: Fetch genomes that were added to Refgenie since the local cache was created.
     """
 
     _LOGGER.info("Updating database with genome information from Refgenie...")
 
+    if refresh:
+        refresh_seq_col_json(os.path.join(DEFAULT_CACHE_FOLDER, SEQ_COL_JSON_FILE))
+
     from bbconf.db_utils import ReferenceGenome, Session, select
 
     genome_list = get_chrom_sizes()
@@ -0,0 +1,259 @@
+# Compact binary cache of refgenie seqcol genomes (genome_seqcol.json), loaded with mmap.
+import functools
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from bedboss.const import PKG_NAME
+from bedboss.refgenome_validator.genome_model import GenomeModel
+from bedboss.refgenome_validator.refgenie_chrom_sizes import (
+    Genomes,
+    get_seq_col_json,
+    read_seq_col_from_json,
+)
+from bedboss.refgenome_validator.validator_index import ValidatorIndex
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# bump when the layout of cache files changes
+SEQCOL_CACHE_VERSION = 1
+SEQCOL_CACHE_PREFIX = "genome_seqcol_"
+SEQCOL_GENOMES_FILE = "genomes.json"
+SEQCOL_ARRAYS = ["genome_offsets", "chrom_ids", "lengths", "name_offsets", "names"]
+
+_STORES: dict[str, "SeqColStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def write_seqcol_cache(genomes: Genomes, folder: str) -> None:
+    """
+    Write genomes into the binary cache format.
+
+    Chromosome names of all genomes are stored once, as one UTF-8 blob with offsets. Chromosomes
+    of genome i are entries genome_offsets[i]:genome_offsets[i + 1] of chrom_ids (positions
+    in the names) and lengths.
+
+    Args:
+        genomes: Sequence collections of genomes.
+        folder: Folder to write the cache files into.
+    """
+    vocabulary: dict[str, int] = {}
+    genome_offsets = [0]
+    chrom_ids = []
+    lengths = []
+    metadata = []
+    for genome in genomes.genomes:
+        # duplicated names: the last length is used, as in a chrom sizes dict
+        chrom_sizes = {seq.name: seq.length for seq in genome.collection}
+        for chrom, length in chrom_sizes.items():
+            chrom_ids.append(vocabulary.setdefault(chrom, len(vocabulary)))
+            lengths.append(length)
+        genome_offsets.append(len(lengths))
+        metadata.append(
+            {
+                "genome": genome.genome,
+                "digest": genome.digest,
+                "description": genome.description,
+            }
+        )
+
+    encoded = [chrom.encode("utf-8") for chrom in vocabulary]
+    arrays = {
+        "genome_offsets": np.array(genome_offsets, dtype=np.int64),
+        "chrom_ids": np.array(chrom_ids, dtype=np.int32),
+        "lengths": np.array(lengths, dtype=np.int64),
+        "name_offsets": np.concatenate(
+            ([0], np.cumsum([len(name) for name in encoded], dtype=np.int64))
+        ),
+        "names": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(folder, f"{name}.npy"), array)
+    with open(os.path.join(folder, SEQCOL_GENOMES_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+
+class SeqColStore:
+    """
+    Refgenie seqcol genomes loaded from the binary cache.
+
+    Arrays are memory mapped, so loading takes milliseconds and processes share the pages.
+    Chrom sizes of a genome are decoded when they are used, and the ValidatorIndex of
+    all genomes is compiled once.
+    """
+
+    def __init__(self, folder: str):
+        """
+        Args:
+            folder: Cache folder written by write_seqcol_cache.
+        """
+        self.folder = folder
+        with open(os.path.join(folder, SEQCOL_GENOMES_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.genome_aliases: list[str | None] = [item["genome"] for item in metadata]
+        self.genome_digests: list[str] = [item["digest"] for item in metadata]
+        self.descriptions: list[str] = [item["description"] for item in metadata]
+
+        arrays = {
+            name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+            for name in SEQCOL_ARRAYS
+        }
+        self.genome_offsets = arrays["genome_offsets"]
+        self.chrom_ids = arrays["chrom_ids"]
+        self.lengths = arrays["lengths"]
+        self._name_offsets = arrays["name_offsets"]
+        self._names_blob = arrays["names"]
+
+        self._chrom_names: list[str] | None = None
+        self._models: tuple[GenomeModel, ...] | None = None
+        self._index: ValidatorIndex | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.genome_digests)
+
+    @property
+    def chrom_names(self) -> list[str]:
+        """
+        All chromosome names, positions are the chrom ids.
+        """
+        if self._chrom_names is None:
+            blob = self._names_blob.tobytes()
+            offsets = self._name_offsets.tolist()
+            self._chrom_names = [
+                blob[start:stop].decode("utf-8")
+                for start, stop in zip(offsets[:-1], offsets[1:])
+            ]
+        return self._chrom_names
+
+    def chrom_sizes(self, genome_id: int) -> dict[str, int]:
+        """
+        Chrom sizes of one genome.
+
+        Args:
+            genome_id: Position of the genome in genome_digests.
+
+        Returns:
+            Dictionary containing chroms (keys) and lengths (values).
+        """
+        start = self.genome_offsets[genome_id]
+        stop = self.genome_offsets[genome_id + 1]
+        names = self.chrom_names
+        return dict(
+            zip(
+                [names[chrom_id] for chrom_id in self.chrom_ids[start:stop].tolist()],
+                self.lengths[start:stop].tolist(),
+            )
+        )
+
+    def genome_models(self) -> list[GenomeModel]:
+        """
+        Genome models of all genomes, with chrom sizes loaded on first use.
+
+        Returns:
+            New list of the (shared) genome models.
+        """
+        if self._models is None:
+            self._models = tuple(
+                GenomeModel(
+                    genome_alias=alias,
+                    chrom_sizes_file=functools.partial(self.chrom_sizes, genome_id),
+                    genome_digest=digest,
+                )
+                for genome_id, (alias, digest) in enumerate(
+                    zip(self.genome_aliases, self.genome_digests)
+                )
+            )
+        return list(self._models)
+
+    def validator_index(self) -> ValidatorIndex:
+        """
+        ValidatorIndex of all genomes, compiled from the arrays without building chrom sizes dicts.
+
+        Returns:
+            Shared ValidatorIndex.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = ValidatorIndex.from_arrays(
+                    genome_digests=self.genome_digests,
+                    chrom_names=self.chrom_names,
+                    n_chroms=np.diff(self.genome_offsets),
+                    chrom_ids=self.chrom_ids,
+                    lengths=self.lengths,
+                )
+        return self._index
+
+
+def _remove_stale_caches(folder: str) -> None:
+    """
+    Remove caches built from older versions of the JSON file. Errors are ignored,
+    since another process may remove them at the same time.
+
+    Args:
+        folder: Current cache folder, which is kept.
+    """
+    parent_folder = os.path.dirname(folder)
+    current = os.path.basename(folder)
+    for name in os.listdir(parent_folder):
+        if not name.startswith(SEQCOL_CACHE_PREFIX) or current in name:
+            continue
+        path = os.path.join(parent_folder, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith(".lock"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_seqcol_store(json_path: str) -> SeqColStore:
+    """
+    Load the binary cache of a genome_seqcol.json file, building it first if it doesn't exist.
+
+    The cache is identified by the fingerprint of the JSON file, so it's rebuilt when the JSON
+    file changes. One store is shared per process.
+
+    Args:
+        json_path: Path to the genome_seqcol.json file.
+
+    Returns:
+        SeqColStore of the JSON file.
+    """
+    # bedboss.utils imports the validator, so it can't be imported at module level
+    from bedboss.utils import build_cache_folder, file_fingerprint
+
+    folder = os.path.join(
+        os.path.dirname(os.path.abspath(json_path)),
+        f"{SEQCOL_CACHE_PREFIX}v{SEQCOL_CACHE_VERSION}_{file_fingerprint(json_path)}",
+    )
+    with _STORES_LOCK:
+        store = _STORES.get(folder)
+        if store is None:
+            if not os.path.exists(folder):
+                _LOGGER.info(f"Building binary cache of '{json_path}'...")
+                build_cache_folder(
+                    folder,
+                    lambda tmp_folder: write_seqcol_cache(
+                        read_seq_col_from_json(json_path), tmp_folder
+                    ),
+                )
+                _remove_stale_caches(folder)
+            store = SeqColStore(folder)
+            _STORES[folder] = store
+    return store
+
+
+def get_seqcol_store() -> SeqColStore:
+    """
+    Refgenie seqcol genomes of the bedboss cache, downloaded if they are not cached yet.
+
+    Returns:
+        Shared SeqColStore.
+    """
+    return load_seqcol_store(get_seq_col_json())
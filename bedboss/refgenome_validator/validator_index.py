@@ -0,0 +1,369 @@
+import numpy as np
+
+from bedboss.refgenome_validator.genome_model import GenomeModel
+from bedboss.refgenome_validator.models import (
+    ChromLengthStats,
+    ChromNameStats,
+    CompatibilityConcise,
+    CompatibilityStats,
+    RatingModel,
+    SequenceFitStats,
+)
+
+# points of a genome that shares no chromosome names with the bed file
+UNMATCHED_POINTS = 10
+
+
+def _range_points(values: np.ndarray) -> np.ndarray:
+    """
+    Points of xs or oobr sensitivity, as in ReferenceValidator.calculate_rating.
+
+    Args:
+        values: Sensitivity of every genome.
+
+    Returns:
+        Points of every genome.
+    """
+    return np.select(
+        [values < 0.3, values < 0.5, values < 0.7, values < 1],
+        [6, 5, 4, 3],
+        default=0,
+    )
+
+
+class ValidatorIndex:
+    """
+    Chromosome sizes of all genome models, compiled for compatibility scoring of a bed file
+    against every genome at once.
+
+    All chromosome names are mapped to one vocabulary, and the genome x chromosome length
+    matrix is stored in sparse CSC form (column offsets, genome ids and lengths). The columns
+    are an inverted index from chromosome name to the genomes that contain it: only genomes
+    sharing at least one chromosome name with a bed file are scored, and all other genomes
+    get a generated tier 4 record. Total length and number of chromosomes of each genome are
+    computed once. Statistics are the same as ReferenceValidator.calculate_chrom_stats and
+    calculate_rating compute per genome.
+    """
+
+    def __init__(self, genome_models: list[GenomeModel]):
+        """
+        Args:
+            genome_models: Genome models to index.
+        """
+        vocabulary: dict[str, int] = {}
+        counts = []
+        chrom_ids = []
+        lengths = []
+        for model in genome_models:
+            counts.append(len(model.chrom_sizes))
+            for chrom, length in model.chrom_sizes.items():
+                chrom_ids.append(vocabulary.setdefault(chrom, len(vocabulary)))
+                lengths.append(int(length))
+
+        self._compile(
+            genome_digests=[model.genome_digest for model in genome_models],
+            vocabulary=vocabulary,
+            n_chroms=np.array(counts, dtype=np.int64),
+            chrom_ids=np.array(chrom_ids, dtype=np.int64),
+            lengths=np.array(lengths, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        genome_digests: list[str],
+        chrom_names: list[str],
+        n_chroms: np.ndarray,
+        chrom_ids: np.ndarray,
+        lengths: np.ndarray,
+    ) -> "ValidatorIndex":
+        """
+        Build the index from chrom sizes of all genomes in flat arrays (e.g. the seqcol cache).
+
+        Args:
+            genome_digests: Genome digests.
+            chrom_names: All chromosome names, positions are the chrom ids.
+            n_chroms: Number of chromosomes of each genome.
+            chrom_ids: Chrom id of every chromosome, genome by genome.
+            lengths: Length of every chromosome, genome by genome.
+
+        Returns:
+            ValidatorIndex of the genomes.
+        """
+        index = cls.__new__(cls)
+        index._compile(
+            genome_digests=list(genome_digests),
+            vocabulary={chrom: chrom_id for chrom_id, chrom in enumerate(chrom_names)},
+            n_chroms=np.asarray(n_chroms, dtype=np.int64),
+            chrom_ids=np.asarray(chrom_ids, dtype=np.int64),
+            lengths=np.asarray(lengths, dtype=np.int64),
+        )
+        return index
+
+    def _compile(
+        self,
+        genome_digests: list[str],
+        vocabulary: dict[str, int],
+        n_chroms: np.ndarray,
+        chrom_ids: np.ndarray,
+        lengths: np.ndarray,
+    ) -> None:
+        """
+        Compile the sparse genome x chromosome length matrix.
+
+        Args:
+            genome_digests: Genome digests.
+            vocabulary: Dict of chromosome name and chrom id.
+            n_chroms: Number of chromosomes of each genome.
+            chrom_ids: Chrom id of every chromosome, genome by genome.
+            lengths: Length of every chromosome, genome by genome.
+        """
+        self.genome_digests = genome_digests
+        self.vocabulary = vocabulary
+        self.n_chroms = n_chroms
+        rows = np.repeat(np.arange(len(genome_digests)), n_chroms)
+        self.total_lengths = np.bincount(
+            rows, weights=lengths, minlength=len(genome_digests)
+        )
+
+        # entries sorted by chromosome: genomes and lengths of each chromosome are contiguous
+        order = np.argsort(chrom_ids, kind="stable")
+        self.genome_ids = rows[order]
+        self.lengths = lengths[order]
+        self.indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(chrom_ids, minlength=len(vocabulary))))
+        )
+
+    def __len__(self) -> int:
+        return len(self.genome_digests)
+
+    def candidates(self, chroms) -> np.ndarray:
+        """
+        Genomes that contain at least one of the chromosome names.
+
+        Args:
+            chroms: Chromosome names.
+
+        Returns:
+            Sorted indices of genomes (positions in genome_digests).
+        """
+        columns = [
+            self.genome_ids[self.indptr[chrom_id] : self.indptr[chrom_id + 1]]
+            for chrom_id in (self.vocabulary.get(chrom) for chrom in chroms)
+            if chrom_id is not None
+        ]
+        if not columns:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(columns))
+
+    def compute(self, bed_chrom_sizes: dict[str, int]) -> dict[str, np.ndarray]:
+        """
+        Compute compatibility statistics of a bed file against genomes that share
+        at least one chromosome name with it.
+
+        Args:
+            bed_chrom_sizes: Dict of a bedfile's chrom sizes (max end of each chromosome).
+
+        Returns:
+            Dict of statistic name and array with its value for every scored genome.
+            Indices of scored genomes are in 'genome_ids'.
+        """
+        n_query = len(bed_chrom_sizes)
+
+        # matrix entries of the query chromosomes, and the query end of each entry
+        entries = []
+        ends = []
+        for chrom, end in bed_chrom_sizes.items():
+            chrom_id = self.vocabulary.get(chrom)
+            if chrom_id is not None:
+                begin, stop = self.indptr[chrom_id], self.indptr[chrom_id + 1]
+                entries.append(np.arange(begin, stop))
+                ends.append(np.full(stop - begin, end, dtype=np.int64))
+        entries = np.concatenate(entries) if entries else np.array([], dtype=np.int64)
+        ends = np.concatenate(ends) if ends else np.array([], dtype=np.int64)
+        # scored genomes, and position of each entry's genome among them
+        candidates, genome_ids = np.unique(
+            self.genome_ids[entries], return_inverse=True
+        )
+        n_genomes = len(candidates)
+        lengths = self.lengths[entries]
+
+        # Layer 1: chrom names
+        q_and_m = np.bincount(genome_ids, minlength=n_genomes)
+        q_and_not_m = n_query - q_and_m
+        not_q_and_m = self.n_chroms[candidates] - q_and_m
+        xs = q_and_m / n_query
+        passed_chrom_names = q_and_not_m == 0
+
+        # Layer 2: chrom lengths, only meaningful for genomes that passed layer 1
+        num_of_chrom_beyond = np.bincount(
+            genome_ids[ends > lengths], minlength=n_genomes
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            oobr = (q_and_m - num_of_chrom_beyond) / q_and_m
+            # Layer 3: sequence fit, if any query chrom names were present
+            sequence_fit = (
+                np.bincount(genome_ids, weights=lengths, minlength=n_genomes)
+                / self.total_lengths[candidates]
+            )
+            percentage_genome_chrom_beyond = (
+                100 * num_of_chrom_beyond / self.n_chroms[candidates]
+            )
+        oobr = np.where(passed_chrom_names, oobr, np.nan)
+        sequence_fit = np.where(q_and_m > 0, sequence_fit, np.nan)
+
+        # Rating
+        points = _range_points(xs)
+        points += np.where(passed_chrom_names, _range_points(oobr), 0)
+        has_fit = ~np.isnan(sequence_fit) & (sequence_fit != 0)
+        points += np.where(
+            has_fit,
+            (sequence_fit < 0.90).astype(int) + 2 * (sequence_fit < 0.60),
+            4,
+        )
+        tier_ranking = np.select(
+            [points == 0, points <= 3, points <= 6], [1, 2, 3], default=4
+        )
+
+        return {
+            "genome_ids": candidates,
+            "xs": xs,
+            "q_and_m": q_and_m,
+            "q_and_not_m": q_and_not_m,
+            "not_q_and_m": not_q_and_m,
+            # chrom union in calculate_chrom_stats is the set of query chroms
+            "jaccard_index": xs,
+            "jaccard_index_binary": q_and_m / (q_and_m + not_q_and_m + q_and_not_m),
+            "passed_chrom_names": passed_chrom_names,
+            "oobr": oobr,
+            "num_of_chrom_beyond": num_of_chrom_beyond,
+            "percentage_bed_chrom_beyond": 100 * num_of_chrom_beyond / n_query,
+            "percentage_genome_chrom_beyond": percentage_genome_chrom_beyond,
+            "sequence_fit": sequence_fit,
+            "assigned_points": points,
+            "tier_ranking": tier_ranking,
+        }
+
+    def compatibility(
+        self, bed_chrom_sizes: dict[str, int], concise: bool = False
+    ) -> dict[str, CompatibilityStats] | dict[str, CompatibilityConcise]:
+        """
+        Compatibility of a bed file with all genomes.
+
+        Args:
+            bed_chrom_sizes: Dict of a bedfile's chrom sizes.
+            concise: If True, return CompatibilityConcise models.
+
+        Returns:
+            Dict of genome digest and its compatibility stats.
+        """
+        stats = self.compute(bed_chrom_sizes)
+        # plain Python values, so models are the same as from the per-genome calculation
+        columns = {
+            name: [None if value != value else value for value in values.tolist()]
+            for name, values in stats.items()
+        }
+        scored = {genome_id: i for i, genome_id in enumerate(columns["genome_ids"])}
+        n_query = len(bed_chrom_sizes)
+
+        result = {}
+        for genome_id, digest in enumerate(self.genome_digests):
+            i = scored.get(genome_id)
+            if i is None:
+                result[digest] = self._unmatched(genome_id, n_query, concise)
+            elif concise:
+                result[digest] = CompatibilityConcise(
+                    xs=columns["xs"][i],
+                    oobr=columns["oobr"][i],
+                    sequence_fit=columns["sequence_fit"][i],
+                    assigned_points=columns["assigned_points"][i],
+                    tier_ranking=columns["tier_ranking"][i],
+                )
+            else:
+                result[digest] = self._stats(columns, i)
+        return result
+
+    @staticmethod
+    def _stats(columns: dict[str, list], i: int) -> CompatibilityStats:
+        """
+        Compatibility stats of a scored genome.
+
+        Args:
+            columns: Statistics of scored genomes, as lists.
+            i: Position of the genome among scored genomes.
+
+        Returns:
+            CompatibilityStats of the genome.
+        """
+        passed = columns["passed_chrom_names"][i]
+        if passed:
+            length_stats = ChromLengthStats(
+                oobr=columns["oobr"][i],
+                beyond_range=columns["num_of_chrom_beyond"][i] > 0,
+                num_of_chrom_beyond=columns["num_of_chrom_beyond"][i],
+                percentage_bed_chrom_beyond=columns["percentage_bed_chrom_beyond"][i],
+                percentage_genome_chrom_beyond=columns[
+                    "percentage_genome_chrom_beyond"
+                ][i],
+            )
+        else:
+            length_stats = ChromLengthStats()
+
+        return CompatibilityStats(
+            chrom_name_stats=ChromNameStats(
+                xs=columns["xs"][i],
+                q_and_m=columns["q_and_m"][i],
+                q_and_not_m=columns["q_and_not_m"][i],
+                not_q_and_m=columns["not_q_and_m"][i],
+                jaccard_index=columns["jaccard_index"][i],
+                jaccard_index_binary=columns["jaccard_index_binary"][i],
+                passed_chrom_names=passed,
+            ),
+            chrom_length_stats=length_stats,
+            chrom_sequence_fit_stats=SequenceFitStats(
+                sequence_fit=columns["sequence_fit"][i]
+            ),
+            compatibility=RatingModel(
+                assigned_points=columns["assigned_points"][i],
+                tier_ranking=columns["tier_ranking"][i],
+            ),
+        )
+
+    def _unmatched(
+        self, genome_id: int, n_query: int, concise: bool
+    ) -> CompatibilityStats | CompatibilityConcise:
+        """
+        Compatibility of a genome that shares no chromosome names with the bed file:
+        xs is 0 (6 points) and there is no sequence fit (4 points), so it's always tier 4.
+
+        Args:
+            genome_id: Index of the genome.
+            n_query: Number of bed file chromosomes.
+            concise: If True, return CompatibilityConcise model.
+
+        Returns:
+            Compatibility stats of the genome.
+        """
+        if concise:
+            return CompatibilityConcise(
+                xs=0.0,
+                oobr=None,
+                sequence_fit=None,
+                assigned_points=UNMATCHED_POINTS,
+                tier_ranking=4,
+            )
+        return CompatibilityStats(
+            chrom_name_stats=ChromNameStats(
+                xs=0.0,
+                q_and_m=0.0,
+                q_and_not_m=float(n_query),
+                not_q_and_m=float(self.n_chroms[genome_id]),
+                jaccard_index=0.0,
+                jaccard_index_binary=0.0,
+                passed_chrom_names=False,
+            ),
+            chrom_length_stats=ChromLengthStats(),
+            chrom_sequence_fit_stats=SequenceFitStats(sequence_fit=None),
+            igd_stats=None,
+            compatibility=RatingModel(assigned_points=UNMATCHED_POINTS, tier_ranking=4),
+        )
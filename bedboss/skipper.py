@@ -1,5 +1,6 @@
 # This module will serve to skip samples that were already processed.
 import os
+import threading
 
 
 class Skipper:
@@ -11,6 +12,8 @@ class Skipper:
         self.file_fail_log_path = os.path.join(output_path, f"{name}_fail.log")
 
         self.info = self._read_log_file(self.file_path)
+        # Guards log writes when results are reported from several threads
+        self._lock = threading.Lock()
 
     def is_processed(self, sample_name: str) -> str | bool:
         """
@@ -37,10 +40,11 @@ class Skipper:
         """
         # line = f"{sample_name}\t{digest}\t{'success' if success else 'failed'}\n"
         line = f"{sample_name},{digest}\n"
-        with open(self.file_path, "a") as file:
-            file.write(line)
+        with self._lock:
+            with open(self.file_path, "a") as file:
+                file.write(line)
 
-        self.info[sample_name] = digest
+            self.info[sample_name] = digest
 
     def _create_log_file(self, file_path: str) -> None:
         """
@@ -101,5 +105,6 @@ class Skipper:
             error: Error message.
         """
         line = f"{sample_name},{error}\n"
-        with open(self.file_fail_log_path, "a") as file:
-            file.write(line)
+        with self._lock:
+            with open(self.file_fail_log_path, "a") as file:
+                file.write(line)
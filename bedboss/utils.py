@@ -1,11 +1,16 @@
+import fcntl
 import glob
 import gzip
+import hashlib
 import logging
 import os
+import shutil
+import tempfile
 import time
 import urllib.request
 from functools import lru_cache, wraps
 from io import StringIO
+from typing import Callable
 
 import pandas as pd
 import peprs
@@ -16,7 +21,7 @@ from pephubclient.files_manager import FilesManager
 from peprs.const import SAMPLE_RAW_DICT_KEY
 from pypiper import PipelineManager
 
-from bedboss.const import MAX_FILE_SIZE_QC, MIN_REGION_WIDTH
+from bedboss.const import MAX_FILE_SIZE_QC, MIN_REGION_WIDTH, QC_PREFIX_SIZE
 from bedboss.exceptions import QualityException
 from bedboss.refgenome_validator.main import ReferenceValidator
 
@@ -245,6 +250,20 @@ def calculate_time(func):
     return wrapper
 
 
+def prefix_mean_region_width(content: str) -> float:
+    """
+    Mean region width of the first rows of a bed file.
+
+    Args:
+        content: Beginning of the bed file. The last row is ignored, since it may be incomplete.
+
+    Returns:
+        Mean region width.
+    """
+    df = pd.read_csv(StringIO(content), sep="\t", header=None)
+    return (df.iloc[:, 2] - df.iloc[:, 1])[:-1].mean()
+
+
 def run_initial_qc(url: str, min_region_width: int = MIN_REGION_WIDTH) -> int:
     """
     Run initial QC on the bed file.
@@ -286,10 +305,9 @@ def run_initial_qc(url: str, min_region_width: int = MIN_REGION_WIDTH) -> int:
     try:
         with urllib.request.urlopen(url) as response:
             with gzip.GzipFile(fileobj=response) as f:
-                content = f.read(10240).decode()  # Read first 10KB after decompression
+                content = f.read(QC_PREFIX_SIZE).decode()
 
-        df = pd.read_csv(StringIO(content), sep="\t", header=None)
-        mean_width = (df.iloc[:, 2] - df.iloc[:, 1])[:-1].mean()
+        mean_width = prefix_mean_region_width(content)
 
     except Exception as err:
         _LOGGER.warning(
@@ -306,3 +324,56 @@ def run_initial_qc(url: str, min_region_width: int = MIN_REGION_WIDTH) -> int:
 
     _LOGGER.info(f"Initial QC passed for {url}")
     return file_size
+
+
+def file_fingerprint(file_path: str) -> str:
+    """
+    Cheap fingerprint of a file, based on its path, size and modification time.
+
+    Args:
+        file_path: Path to the file.
+
+    Returns:
+        Short hex fingerprint.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    return hashlib.md5(
+        f"{file_path}:{stat.st_size}:{int(stat.st_mtime)}".encode()
+    ).hexdigest()[:12]
+
+
+def build_cache_folder(folder: str, build: Callable[[str], None]) -> str:
+    """
+    Build a cache folder once, even if several processes need it at the same time.
+
+    The first process takes a file lock and builds the content in a temporary folder,
+    which is then renamed to the final path. Others wait for the lock and reuse the result.
+    An existing folder is therefore always complete.
+
+    Args:
+        folder: Path to the cache folder.
+        build: Function that writes the content into the folder it is given.
+
+    Returns:
+        Path to the cache folder.
+    """
+    if os.path.exists(folder):
+        return folder
+
+    parent_folder = os.path.dirname(os.path.abspath(folder))
+    os.makedirs(parent_folder, exist_ok=True)
+    with open(f"{folder}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(folder):
+                tmp_folder = tempfile.mkdtemp(dir=parent_folder)
+                try:
+                    build(tmp_folder)
+                    os.rename(tmp_folder, folder)
+                except BaseException:
+                    shutil.rmtree(tmp_folder, ignore_errors=True)
+                    raise
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return folder
@@ -0,0 +1,143 @@
+# Counts how many times the BED file is opened for reading while one sample goes through
+# the run_all stages: bedmaker (classifier, QC, bigBed), bedstat and the reference
+# validator. Nothing is uploaded, so no database is needed.
+# Opens are traced with strace, so reads by gtars (Rust) and by regionstat.R are counted
+# too. strace must be installed, and R for the default (non-native) statistics.
+#
+# python scripts/profiling/bed_parse_count.py --bed test/data/bed/hg38/GSM6732293_Con_liver-IP2.bed --genome hg38
+# python scripts/profiling/bed_parse_count.py --bed ... --native-stats
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+TRACED_ENV = "BED_PARSE_COUNT_TRACED"
+# opened (and failing) in the traced process between stages, so opens can be split by stage
+STAGE_MARKER = "/bed_parse_count_stage/"
+
+OPEN_PATTERN = re.compile(
+    r'^(\d+)\s+(?:open|openat|openat2)\((?:[^,]+, )?"([^"]+)", ([^,)]+)'
+)
+EXECVE_PATTERN = re.compile(r'^(\d+)\s+execve\("([^"]+)"')
+
+
+def run_stages(bed: str, genome: str, native_stats: bool, outfolder: str) -> None:
+    """Run the run_all stages, marking the start of each stage with an open of STAGE_MARKER."""
+    from bedboss.bedmaker.bedmaker import make_all
+    from bedboss.bedstat.bedstat import bedstat
+    from bedboss.refgenome_validator.main import ReferenceValidator
+
+    def stage(name: str) -> None:
+        try:
+            open(f"{STAGE_MARKER}{name}")
+        except OSError:
+            pass
+
+    stage("bedmaker")
+    bed_metadata = make_all(
+        input_file=bed,
+        input_type="bed",
+        output_path=outfolder,
+        genome=genome,
+    )
+
+    stage("bedstat")
+    bedstat(
+        bedfile=bed_metadata.bed_file,
+        genome=genome,
+        outfolder=outfolder,
+        bed_digest=bed_metadata.bed_digest,
+        native_stats=native_stats,
+        parsed_bed=bed_metadata.parsed_bed,
+        use_cache=False,
+    )
+
+    stage("validator")
+    ReferenceValidator().determine_compatibility(
+        bedfile=bed_metadata.bed_object, concise=True
+    )
+    stage("done")
+
+
+def count_opens(trace_path: str) -> Counter:
+    """
+    Count read-only opens of BED files in the strace output, by stage and program.
+
+    Args:
+        trace_path: Output file of strace -f.
+
+    Returns:
+        Counter of (stage, program) pairs.
+    """
+    programs = {}
+    opens = Counter()
+    stage = None
+    with open(trace_path) as f:
+        for line in f:
+            match = EXECVE_PATTERN.match(line)
+            if match:
+                programs[match.group(1)] = os.path.basename(match.group(2))
+                continue
+            match = OPEN_PATTERN.match(line)
+            if not match:
+                continue
+            pid, path, flags = match.groups()
+            if path.startswith(STAGE_MARKER):
+                stage = path[len(STAGE_MARKER) :]
+            elif (
+                stage
+                and stage != "done"
+                and path.endswith((".bed", ".bed.gz"))
+                and "O_WRONLY" not in flags
+                and "O_RDWR" not in flags
+                and "ENOENT" not in line
+            ):
+                opens[(stage, programs.get(pid, "python"))] += 1
+    return opens
+
+
+def main(bed: str, genome: str, native_stats: bool) -> None:
+    if os.environ.get(TRACED_ENV):
+        with tempfile.TemporaryDirectory() as outfolder:
+            run_stages(bed, genome, native_stats, outfolder)
+        return
+
+    if not shutil.which("strace"):
+        sys.exit("strace is required to count opens made by gtars and R")
+
+    with tempfile.TemporaryDirectory() as trace_folder:
+        trace_path = os.path.join(trace_folder, "trace.txt")
+        subprocess.run(
+            [
+                "strace",
+                "-f",
+                "-qq",
+                "-e",
+                "trace=open,openat,openat2,execve",
+                "-o",
+                trace_path,
+                sys.executable,
+                *sys.argv,
+            ],
+            env={**os.environ, TRACED_ENV: "1"},
+            check=True,
+        )
+        opens = count_opens(trace_path)
+
+    for (stage, program), count in sorted(opens.items()):
+        print(f"{stage:<10} {program:<10} {count} opens")
+    print(f"total: {sum(opens.values())} opens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bed", required=True)
+    parser.add_argument("--genome", default="hg38")
+    parser.add_argument("--native-stats", action="store_true")
+    args = parser.parse_args()
+    main(os.path.abspath(args.bed), args.genome, args.native_stats)
@@ -0,0 +1,56 @@
+# Memory benchmark for create_gc_plot: renders the GC plot for many consecutive
+# samples and prints the resident memory, which should stay flat.
+#
+# python scripts/profiling/gc_plot_memory.py --samples 10000
+
+import argparse
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from bedboss.bedstat.gc_content import create_gc_plot
+from bedboss.bedstat.models import GCContentSummary
+from bedboss.const import GC_HISTOGRAM_BINS
+
+
+def rss_mb() -> float:
+    """Current resident memory in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 1024 / 1024
+
+
+def main(samples: int, report_every: int):
+    rng = np.random.default_rng(0)
+    bin_edges = np.linspace(0, 1, GC_HISTOGRAM_BINS + 1).tolist()
+
+    with tempfile.TemporaryDirectory() as outfolder:
+        start = time.time()
+        for i in range(samples):
+            counts = np.histogram(
+                rng.beta(4, 5, size=1000), bins=GC_HISTOGRAM_BINS, range=(0, 1)
+            )[0]
+            summary = GCContentSummary(
+                mean=0.45, count=1000, bin_edges=bin_edges, counts=counts.tolist()
+            )
+            create_gc_plot(
+                bed_id=f"sample_{i % 10}",
+                gc_summary=summary,
+                outfolder=outfolder,
+                gc_mean=summary.mean,
+            )
+            if i % report_every == 0 or i == samples - 1:
+                print(
+                    f"{i + 1:>6} samples  rss: {rss_mb():8.1f} MB  "
+                    f"elapsed: {time.time() - start:8.1f} s"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=10_000)
+    parser.add_argument("--report-every", type=int, default=500)
+    args = parser.parse_args()
+    main(args.samples, args.report_every)
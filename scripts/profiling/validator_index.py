@@ -0,0 +1,100 @@
+# Microbenchmark of reference genome compatibility scoring: per-genome loop
+# (calculate_chrom_stats + calculate_rating) vs. the compiled ValidatorIndex.
+# Synthetic genome models mimic refgenie seqcol genomes (a few hundred genomes,
+# up to thousands of contigs each).
+#
+# python scripts/profiling/validator_index.py --genomes 500 --beds 50
+
+import argparse
+import time
+
+import numpy as np
+
+from bedboss.refgenome_validator.genome_model import GenomeModel
+from bedboss.refgenome_validator.main import ReferenceValidator
+
+
+def make_genomes(n_genomes: int, rng: np.random.Generator) -> list[GenomeModel]:
+    """Synthetic genome models with shared chrom names and random contigs."""
+    genomes = []
+    for i in range(n_genomes):
+        prefix = ["chr", "", "NC_0000"][i % 3]
+        chrom_sizes = {
+            f"{prefix}{c}": int(rng.integers(10**7, 2.5 * 10**8)) for c in range(1, 23)
+        }
+        for c in range(int(rng.integers(0, 3000))):
+            chrom_sizes[f"contig_{i % 50}_{c}"] = int(rng.integers(10**3, 10**6))
+        genomes.append(
+            GenomeModel(
+                genome_alias=f"genome_{i}",
+                chrom_sizes_file=chrom_sizes,
+                genome_digest=f"digest_{i}",
+            )
+        )
+    return genomes
+
+
+def make_beds(n_beds: int, rng: np.random.Generator) -> list[dict[str, int]]:
+    """Synthetic bed chrom sizes (max end per chromosome)."""
+    return [
+        {
+            f"{['chr', ''][b % 2]}{c}": int(rng.integers(10**6, 2 * 10**8))
+            for c in range(1, int(rng.integers(2, 23)))
+        }
+        for b in range(n_beds)
+    ]
+
+
+def loop_compatibility(validator: ReferenceValidator, bed_chrom_info: dict) -> dict:
+    """Per-genome compatibility, as computed before the index."""
+    result = {}
+    for genome_model in validator.genome_models:
+        stats = validator.calculate_chrom_stats(
+            bed_chrom_info, genome_model.chrom_sizes
+        )
+        stats.compatibility = validator.calculate_rating(stats)
+        result[genome_model.genome_digest] = stats
+    return result
+
+
+def main(n_genomes: int, n_beds: int):
+    rng = np.random.default_rng(0)
+    validator = ReferenceValidator(genome_models=make_genomes(n_genomes, rng))
+    beds = make_beds(n_beds, rng)
+
+    start = time.perf_counter()
+    index = validator.index
+    print(
+        f"Index built in {time.perf_counter() - start:.3f} s: {len(index)} genomes, "
+        f"{len(index.vocabulary)} chrom names, {len(index.lengths)} entries"
+    )
+
+    start = time.perf_counter()
+    expected = [loop_compatibility(validator, bed) for bed in beds]
+    loop_time = (time.perf_counter() - start) / n_beds
+
+    start = time.perf_counter()
+    full = [validator.determine_compatibility(bed) for bed in beds]
+    index_time = (time.perf_counter() - start) / n_beds
+
+    start = time.perf_counter()
+    for bed in beds:
+        index.compute(bed)
+    arrays_time = (time.perf_counter() - start) / n_beds
+
+    assert full == expected, "Index results differ from the per-genome loop"
+    print(f"Per-genome loop:        {loop_time * 1000:8.2f} ms / bed")
+    print(
+        f"Index (pydantic models): {index_time * 1000:8.2f} ms / bed ({loop_time / index_time:.1f}x)"
+    )
+    print(
+        f"Index (arrays only):     {arrays_time * 1000:8.2f} ms / bed ({loop_time / arrays_time:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--genomes", type=int, default=500)
+    parser.add_argument("--beds", type=int, default=20)
+    args = parser.parse_args()
+    main(args.genomes, args.beds)
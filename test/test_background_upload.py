@@ -0,0 +1,19 @@
+from bedboss.background_upload import BackgroundUploader
+
+
+def test_background_uploader():
+    uploaded = []
+
+    def fail():
+        raise ValueError("s3 is not available")
+
+    uploader = BackgroundUploader(depth=1)
+    uploader.submit("sample1", "digest1", lambda: uploaded.append("digest1"))
+    uploader.submit("sample2", "digest2", fail)
+    uploader.submit("sample3", "digest3", lambda: uploaded.append("digest3"))
+    results = uploader.poll() + uploader.close()
+
+    assert uploaded == ["digest1", "digest3"]
+    assert [result.key for result in results] == ["sample1", "sample2", "sample3"]
+    assert results[1].error == "s3 is not available"
+    assert results[0].error is None and results[2].error is None
@@ -1,5 +1,6 @@
 import os
 
+import pandas as pd
 import pytest
 
 from bedboss.bedclassifier import (
@@ -248,6 +249,114 @@ class TestBedClassifier:
         bedclass = get_bed_classification(bed=values[0])
         assert bedclass == values[1]
 
+    @pytest.mark.parametrize("chunksize", [1, 2, 3, 100_000])
+    @pytest.mark.parametrize(
+        "bed",
+        [
+            FILE_PATH_UNZIPPED,
+            BED1,
+            BED2,
+            BED3,
+            BED_4_PLUS_5,
+            BED_4_PLUS_6,
+            BED_6_PLUS_4,
+            BED_7_PLUS_3,
+            BED_7_01,
+            BED_7_02,
+            BED_7_03,
+            BED_10_PLUS_0,
+            BED_12_PLUS_0,
+            BED_12_PLUS_3,
+            BED_NARROWPEAK,
+            BED_NONSTRICT_NARROWPEAK,
+            BED_RNA_ELEMENTS,
+            BED_BROADPEAK,
+            BED_GAPPED_PEAK,
+            BED_GAPPED_PEAK_RS,
+        ],
+    )
+    def test_streaming_classification(self, bed, chunksize):
+        assert get_bed_classification(
+            bed=bed, chunksize=chunksize
+        ) == get_bed_classification(bed=bed)
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 3])
+    @pytest.mark.parametrize(
+        "rows",
+        [
+            # empty column in the middle, that has values only in later rows
+            ["chr1\t1\t5\t\t0\t+", "chr1\t2\t6\t\t0\t+", "chr1\t3\t7\tx\t0\t+"],
+            ["chr1\t1\t5\t\t0\t+", "chr1\t2\t6\t\t0\t+", "chr1\t3\t7\t\t0\t+"],
+            # missing value makes an int column float in the whole file
+            ["chr1\t1\t5\tx\t0\t+\t1\t2\t0\t3", "chr1\t2\t6\tx\t0\t+\t1\t2\t0\t"],
+            # float and int chunks of peak columns
+            [
+                "chr1\t1\t5\tx\t0\t.\t1\t-1\t-1\t3",
+                "chr1\t2\t6\tx\t0\t.\t1.5\t-1\t-1\t4",
+            ],
+            # header line
+            ["track name=x", "chr1\t1\t5", "chr1\t2\t6"],
+            ["chr1\t1\t5\tx\t2000", "chr1\t2\t6\tx\t10"],
+            ["chr1\t-1\t5", "chr1\t2\t6"],
+        ],
+    )
+    def test_streaming_classification_edge_cases(self, tmp_path, rows, chunksize):
+        bed = tmp_path / "test.bed"
+        bed.write_text("\n".join(rows) + "\n")
+
+        assert get_bed_classification(
+            bed=str(bed), chunksize=chunksize
+        ) == get_bed_classification(bed=str(bed))
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-16"])
+    def test_header_rows_parsed_once(self, tmp_path, monkeypatch, encoding):
+        bed = tmp_path / "test.bed"
+        bed.write_text(
+            "track name=x\n# comment\nchr1\t1\t5\tx\nchr1\t2\t6\ty\n",
+            encoding=encoding,
+        )
+        read_csv = pd.read_csv
+        calls = []
+
+        def _read_csv(*args, **kwargs):
+            calls.append(kwargs)
+            return read_csv(*args, **kwargs)
+
+        monkeypatch.setattr(pd, "read_csv", _read_csv)
+
+        bedclass = get_bed_classification(bed=str(bed))
+
+        assert bedclass == BedClassificationOutput(
+            bed_compliance="bed4+0",
+            data_format=DATA_FORMAT.UCSC_BED,
+            compliant_columns=4,
+            non_compliant_columns=0,
+        )
+        assert len(calls) == 1
+        assert calls[0]["skiprows"] == 2
+
+    @pytest.mark.parametrize("streaming_size", [0, 10**12])
+    def test_parse_bed(self, monkeypatch, streaming_size):
+        import numpy as np
+        from gtars.models import RegionSet
+
+        from bedboss.bedmaker import bedmaker
+        from bedboss.bedstat.native_stats import read_region_arrays
+
+        monkeypatch.setattr(bedmaker, "CLASSIFIER_STREAMING_SIZE", streaming_size)
+
+        parsed_bed, bedclass = bedmaker.parse_bed(
+            BED_NARROWPEAK, RegionSet(BED_NARROWPEAK)
+        )
+
+        assert parsed_bed.data is None
+        assert bedclass == get_bed_classification(bed=BED_NARROWPEAK)
+        regions = read_region_arrays(parsed_bed)
+        expected = read_region_arrays(BED_NARROWPEAK)
+        assert regions.chrom_names == expected.chrom_names
+        assert np.array_equal(regions.starts, expected.starts)
+        assert np.array_equal(regions.ends, expected.ends)
+
     @pytest.mark.skip(reason="Not implemented")
     def test_from_PEPhub_beds(
         self,
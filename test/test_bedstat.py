@@ -0,0 +1,186 @@
+import numpy as np
+import pytest
+
+from bedboss.bedstat import gc_content
+from bedboss.bedstat.genome_annotation import (
+    GenomeAnnotation,
+    load_genome_annotation,
+    merge_intervals,
+    subtract_intervals,
+)
+from bedboss.bedstat.native_stats import calc_region_stats, region_arrays_from_frame
+from bedboss.bedstat.result_cache import (
+    clear_bedstat_cache,
+    evict_bedstat_cache,
+    load_cached_stats,
+    save_cached_stats,
+)
+
+GTF = (
+    '1\tens\tgene\t1001\t5000\t.\t+\t.\tgene_id "A"; gene_biotype "protein_coding";\n'
+    '1\tens\texon\t1001\t1200\t.\t+\t.\tgene_id "A"; gene_biotype "protein_coding";\n'
+    '1\tens\tfive_prime_utr\t1001\t1050\t.\t+\t.\tgene_id "A"; gene_biotype "protein_coding";\n'
+    '1\tens\texon\t4000\t5000\t.\t+\t.\tgene_id "A"; gene_biotype "protein_coding";\n'
+    '1\tens\tthree_prime_utr\t4800\t5000\t.\t+\t.\tgene_id "A"; gene_biotype "protein_coding";\n'
+    '1\tens\tgene\t10001\t20000\t.\t-\t.\tgene_id "B"; gene_biotype "protein_coding";\n'
+    '1\tens\tgene\t30001\t40000\t.\t-\t.\tgene_id "C"; gene_biotype "lncRNA";\n'
+)
+
+
+@pytest.fixture
+def annotation(tmp_path):
+    gtf_path = tmp_path / "annotation.gtf"
+    gtf_path.write_text(GTF)
+    return GenomeAnnotation.from_gtf(str(gtf_path))
+
+
+class TestNativeStats:
+    def test_merge_intervals(self):
+        starts, ends = merge_intervals(
+            np.array([5, 1, 10, 20]), np.array([8, 5, 12, 25])
+        )
+        assert starts.tolist() == [1, 10, 20]
+        assert ends.tolist() == [8, 12, 25]
+
+    def test_subtract_intervals(self):
+        starts, ends = subtract_intervals(
+            np.array([0, 100]),
+            np.array([50, 200]),
+            np.array([10, 150]),
+            np.array([20, 160]),
+        )
+        assert starts.tolist() == [0, 20, 100, 160]
+        assert ends.tolist() == [10, 50, 150, 200]
+
+    def test_annotation(self, annotation):
+        exon_starts, _ = annotation.partition_intervals("exon", "chr1")
+        _, intron_ends = annotation.partition_intervals("intron", "chr1")
+
+        assert annotation.tss_positions("chr1").tolist() == [1000, 19999]
+        assert exon_starts.tolist() == [1050, 3999]
+        assert intron_ends.tolist() == [3999, 20000]
+
+    def test_region_stats(self, annotation):
+        regions = region_arrays_from_frame(
+            ["chr1"] * 6 + ["chr2"],
+            np.array([950, 1500, 1020, 4900, 12000, 60000, 5]),
+            np.array([960, 1600, 1030, 4950, 12100, 60100, 10]),
+        )
+        stats = calc_region_stats(regions, digest="digest", annotation=annotation)
+
+        assert stats["number_of_regions"] == 7
+        assert stats["mean_region_width"] == 53.57
+        assert stats["promoterCore_frequency"] == 1
+        assert stats["fiveUTR_frequency"] == 1
+        assert stats["threeUTR_frequency"] == 1
+        assert stats["intron_frequency"] == 2
+        assert stats["intergenic_frequency"] == 2
+        assert stats["exon_frequency"] == 0
+
+    def test_annotation_index(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+        gtf_path = tmp_path / "annotation.gtf"
+        gtf_path.write_text(GTF)
+
+        annotation = load_genome_annotation("test_genome", str(gtf_path))
+
+        assert isinstance(annotation.tss, np.memmap)
+        assert annotation.tss_positions("chr1").tolist() == [1000, 19999]
+        exon_starts, _ = annotation.partition_intervals("exon", "chr1")
+        assert exon_starts.tolist() == [1050, 3999]
+
+
+class TestGCContent:
+    def test_calculate_gc_content(self, tmp_path, monkeypatch):
+        rng = np.random.default_rng(0)
+        sequences = {
+            "chr1": "".join(rng.choice(list("ACGTacgtN"), 1003)),
+            "chr2": "".join(rng.choice(list("ACGT"), 77)),
+        }
+        fasta_path = tmp_path / "genome.fa"
+        fasta_path.write_text(
+            "".join(
+                f">{chrom} description\n"
+                + "\n".join(seq[i : i + 60] for i in range(0, len(seq), 60))
+                + "\n"
+                for chrom, seq in sequences.items()
+            )
+        )
+        monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+        monkeypatch.setattr(
+            gc_content, "get_genome_fasta_file", lambda *args, **kwargs: str(fasta_path)
+        )
+        monkeypatch.setattr(gc_content, "GC_CHUNK_SIZE", 3)
+
+        chroms = ["chr1", "chr1", "chr1", "chr1", "chr2", "chr2", "chr3"]
+        starts = np.array([0, 7, 100, 990, 3, 70, 0])
+        ends = np.array([1, 64, 613, 1003, 4, 100, 10])
+        regions = region_arrays_from_frame(chroms, starts, ends)
+        values_path = str(tmp_path / "gc.npy")
+
+        summary = gc_content.calculate_gc_content(
+            regions, genome="test_genome", values_path=values_path
+        )
+
+        expected = [
+            sum(base in "GCgc" for base in sequences[chrom][start:end])
+            / (min(end, len(sequences[chrom])) - start)
+            for chrom, start, end in zip(chroms[:-1], starts, ends)
+        ]
+        values = np.load(values_path)
+        assert summary.count == 6
+        assert sum(summary.counts) == 6
+        assert summary.mean == pytest.approx(np.mean(expected))
+        assert np.allclose(values[:-1], expected)
+        assert np.isnan(values[-1])
+
+
+class TestResultCache:
+    def test_cache_round_trip(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+        first_run = tmp_path / "run1" / "digest1"
+        first_run.mkdir(parents=True)
+        (first_run / "digest1.json").write_text('{"regions_no": [10]}')
+        (first_run / "digest1_gccontent.png").write_bytes(b"png")
+        data = {
+            "gc_content": 0.4,
+            "gccontent": {
+                "name": "gccontent",
+                "path": str(first_run / "digest1_gccontent.png"),
+            },
+        }
+
+        assert load_cached_stats("digest1", "stamp", str(first_run)) is None
+        save_cached_stats("digest1", "stamp", str(first_run), data)
+
+        second_run = tmp_path / "run2" / "digest1"
+        cached = load_cached_stats("digest1", "stamp", str(second_run))
+        assert cached["gccontent"]["path"] == str(second_run / "digest1_gccontent.png")
+        assert (second_run / "digest1_gccontent.png").read_bytes() == b"png"
+        assert (second_run / "digest1.json").exists()
+        assert load_cached_stats("digest1", "other_stamp", str(second_run)) is None
+
+        save_cached_stats("digest2", "stamp", str(first_run), data)
+        assert evict_bedstat_cache(max_size=0) == 2
+        save_cached_stats("digest2", "stamp", str(first_run), data)
+        assert evict_bedstat_cache(max_age=3600) == 0
+        assert clear_bedstat_cache(digest="digest2") == 1
+        assert load_cached_stats("digest2", "stamp", str(second_run)) is None
+
+    def test_cache_replace(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+        outfolder = tmp_path / "run" / "digest1"
+        outfolder.mkdir(parents=True)
+        (outfolder / "digest1.json").write_text('{"regions_no": [10]}')
+
+        # result without GC content is cached, and completed later
+        save_cached_stats("digest1", "stamp", str(outfolder), {"regions_no": 10})
+        save_cached_stats("digest1", "stamp", str(outfolder), {"gc_content": 0.4})
+        assert "gc_content" not in load_cached_stats("digest1", "stamp", str(outfolder))
+
+        save_cached_stats(
+            "digest1", "stamp", str(outfolder), {"gc_content": 0.4}, replace=True
+        )
+        assert load_cached_stats("digest1", "stamp", str(outfolder)) == {
+            "gc_content": 0.4
+        }
@@ -0,0 +1,24 @@
+from bedboss.checkpoints import StageCheckpoint
+
+
+def test_stage_checkpoint(tmp_path):
+    inputs = {"genome": "hg38", "lite": False}
+    checkpoint = StageCheckpoint(str(tmp_path), "digest1", inputs=inputs)
+    assert not checkpoint.is_done("bedstat")
+
+    checkpoint.save("bedstat", {"gc_content": 0.41})
+
+    resumed = StageCheckpoint(str(tmp_path), "digest1", inputs=inputs)
+    assert resumed.is_done("bedstat")
+    assert resumed.get("bedstat") == {"gc_content": 0.41}
+    assert not resumed.is_done("validation")
+
+    changed_inputs = StageCheckpoint(
+        str(tmp_path), "digest1", inputs={"genome": "mm10"}
+    )
+    assert not changed_inputs.is_done("bedstat")
+
+    resumed.clear()
+    assert not StageCheckpoint(str(tmp_path), "digest1", inputs=inputs).is_done(
+        "bedstat"
+    )
@@ -0,0 +1,81 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bedboss.exceptions import FetchException, QualityException
+from bedboss.fetcher import fetch_file
+
+GOOD_BED = b"".join(
+    f"chr1\t{i * 1000}\t{i * 1000 + 500}\n".encode() for i in range(100)
+)
+# mean region width is 1, far below MIN_REGION_WIDTH
+NARROW_BED = b"chr1\t1\t2\n" * 500000
+
+
+@pytest.fixture
+def server():
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            body = NARROW_BED if self.path == "/narrow.bed" else GOOD_BED
+            self.send_response(200)
+            if self.path == "/truncated.bed":
+                # connection is closed before the announced length is sent
+                self.send_header("Content-Length", str(len(body) * 2))
+            else:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except OSError:
+                # client stopped reading (QC abort)
+                pass
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{http_server.server_address[1]}", requested
+    http_server.shutdown()
+
+
+def spooled_files(spool_folder):
+    return [
+        os.path.join(root, file_name)
+        for root, _, files in os.walk(spool_folder)
+        for file_name in files
+    ]
+
+
+def test_fetch_file_uses_spooled_copy(server, tmp_path):
+    base_url, requested = server
+
+    fetched = fetch_file(f"{base_url}/good.bed", spool_folder=str(tmp_path))
+    again = fetch_file(f"{base_url}/good.bed", spool_folder=str(tmp_path))
+
+    assert requested == ["/good.bed"]
+    assert again == fetched
+    with open(fetched.path, "rb") as f:
+        assert f.read() == GOOD_BED
+
+
+def test_fetch_file_aborts_on_failed_qc(server, tmp_path):
+    base_url, _ = server
+
+    with pytest.raises(QualityException):
+        fetch_file(f"{base_url}/narrow.bed", spool_folder=str(tmp_path))
+    assert spooled_files(tmp_path) == []
+
+
+def test_fetch_file_truncated_download(server, tmp_path):
+    base_url, _ = server
+
+    with pytest.raises(FetchException):
+        fetch_file(f"{base_url}/truncated.bed", spool_folder=str(tmp_path))
+    assert spooled_files(tmp_path) == []
@@ -0,0 +1,99 @@
+import os
+import threading
+
+import pytest
+
+from bedboss.bbuploader import prefetch
+from bedboss.bbuploader.prefetch import Prefetcher
+from bedboss.fetcher import FetchedFile
+
+
+@pytest.fixture
+def fetched(monkeypatch, tmp_path):
+    """
+    Replace fetch_file with a download that waits until its url is released,
+    and record started downloads.
+    """
+    started = []
+    released = {}
+    lock = threading.Lock()
+
+    def fetch_file(url, spool_folder=None):
+        with lock:
+            started.append(url)
+            event = released.setdefault(url, threading.Event())
+        assert event.wait(5)
+        path = os.path.join(str(tmp_path), url.rsplit("/", 1)[-1])
+        with open(path, "w") as f:
+            f.write("chr1\t1\t100\n")
+        return FetchedFile(url=url, path=path, digest=url, file_size=100)
+
+    def release(url):
+        with lock:
+            released.setdefault(url, threading.Event()).set()
+
+    monkeypatch.setattr(prefetch, "fetch_file", fetch_file)
+    return started, release
+
+
+def wait_started(started, count):
+    for _ in range(500):
+        if len(started) >= count:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_prefetcher_window(fetched, tmp_path):
+    started, release = fetched
+    prefetcher = Prefetcher(spool_folder=str(tmp_path), window=2)
+    for i in range(4):
+        prefetcher.schedule(f"http://host/{i}.bed")
+    wait_started(started, 2)
+    assert sorted(started) == ["http://host/0.bed", "http://host/1.bed"]
+
+    release("http://host/0.bed")
+    prefetcher.get("http://host/0.bed")
+    wait_started(started, 3)
+    assert started[2] == "http://host/2.bed"
+
+    for i in range(1, 4):
+        release(f"http://host/{i}.bed")
+    prefetcher.close()
+
+
+def test_prefetcher_disk_budget(fetched, tmp_path):
+    started, release = fetched
+    prefetcher = Prefetcher(spool_folder=str(tmp_path), window=4, disk_budget=150)
+    prefetcher.schedule("http://host/0.bed", expected_size=100)
+    prefetcher.schedule("http://host/1.bed", expected_size=100)
+    wait_started(started, 1)
+    threading.Event().wait(0.1)
+    assert started == ["http://host/0.bed"]
+
+    release("http://host/0.bed")
+    release("http://host/1.bed")
+    prefetcher.get("http://host/0.bed")
+    assert prefetcher.get("http://host/1.bed").path.endswith("1.bed")
+    prefetcher.close()
+
+
+def test_prefetcher_cancel_and_close(fetched, tmp_path):
+    started, release = fetched
+    prefetcher = Prefetcher(spool_folder=str(tmp_path), window=1)
+    prefetcher.schedule("http://host/0.bed")
+    prefetcher.schedule("http://host/1.bed")
+    wait_started(started, 1)
+
+    # pending download is not started
+    prefetcher.cancel("http://host/1.bed")
+    # file of a running download is removed when it finishes
+    prefetcher.cancel("http://host/0.bed")
+    release("http://host/0.bed")
+    prefetcher.schedule("http://host/2.bed")
+    wait_started(started, 2)
+    assert started == ["http://host/0.bed", "http://host/2.bed"]
+
+    # close removes files that were not taken
+    release("http://host/2.bed")
+    prefetcher.close()
+    assert os.listdir(str(tmp_path)) == []
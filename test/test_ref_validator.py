@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 from bedboss.refgenome_validator.main import ReferenceValidator
 
 FILE_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -23,3 +25,176 @@ def test_main():
     # result
 
     assert dict_result
+
+
+CHROM_SIZES_DIR = os.path.join(
+    os.path.dirname(FILE_DIR), "bedboss", "refgenome_validator", "chrom_sizes"
+)
+
+
+def test_validator_index_matches_per_genome_stats():
+    from bedboss.refgenome_validator.genome_model import GenomeModel
+
+    genome_models = [
+        GenomeModel(
+            genome_alias=file_name,
+            chrom_sizes_file=os.path.join(CHROM_SIZES_DIR, file_name),
+            genome_digest=file_name,
+        )
+        for file_name in sorted(os.listdir(CHROM_SIZES_DIR))
+    ]
+    validator = ReferenceValidator(genome_models=genome_models)
+    bed_chrom_sizes = [
+        {"chr1": 1000, "chr2": 5000, "chrX": 100},
+        {"chr1": 248956422, "chr2": 10**10},
+        {"1": 1000, "MT": 100},
+        {"chr1": 1000, "unknown_contig": 100},
+        {"not_in_any_genome": 10},
+    ]
+
+    for bed_chrom_info in bed_chrom_sizes:
+        result = validator.determine_compatibility(bed_chrom_info)
+        for genome_model in genome_models:
+            expected = validator.calculate_chrom_stats(
+                bed_chrom_info, genome_model.chrom_sizes
+            )
+            if (
+                expected.chrom_name_stats.passed_chrom_names
+                and not expected.chrom_length_stats.beyond_range
+            ):
+                expected.igd_stats = validator.get_igd_overlaps(bed_chrom_info)
+            expected.compatibility = validator.calculate_rating(expected)
+            assert result[genome_model.genome_digest] == expected
+
+    index = validator.index
+    assert len(index.candidates(["not_in_any_genome"])) == 0
+    hg38_candidates = [index.genome_digests[i] for i in index.candidates(["chr1"])]
+    assert "ucsc_hg38.chrom.sizes" in hg38_candidates
+    assert "ensembl_hg38.chrom.sizes" not in hg38_candidates
+
+
+def test_seqcol_store_matches_json(tmp_path):
+    from bedboss.refgenome_validator.refgenie_chrom_sizes import (
+        Genomes,
+        save_seq_col_to_json,
+    )
+    from bedboss.refgenome_validator.seqcol_cache import load_seqcol_store
+    from bedboss.refgenome_validator.validator_index import ValidatorIndex
+
+    genomes = Genomes(
+        genomes=[
+            {
+                "genome": "g1",
+                "digest": "d1",
+                "description": "",
+                "collection": [
+                    {"name": "chr1", "length": 1000},
+                    {"name": "chr2", "length": 500},
+                ],
+            },
+            {
+                "genome": None,
+                "digest": "d2",
+                "description": "",
+                "collection": [
+                    {"name": "1", "length": 900},
+                    {"name": "chr2", "length": 600},
+                ],
+            },
+        ]
+    )
+    json_path = str(tmp_path / "genome_seqcol.json")
+    save_seq_col_to_json(genomes, output_path=json_path)
+
+    store = load_seqcol_store(json_path)
+    assert load_seqcol_store(json_path) is store
+    assert [model.genome_alias for model in store.genome_models()] == ["g1", None]
+    assert [model.chrom_sizes for model in store.genome_models()] == [
+        {"chr1": 1000, "chr2": 500},
+        {"1": 900, "chr2": 600},
+    ]
+
+    bed_chrom_sizes = {"chr1": 2000, "chr2": 100}
+    assert store.validator_index().compatibility(bed_chrom_sizes) == ValidatorIndex(
+        store.genome_models()
+    ).compatibility(bed_chrom_sizes)
+
+
+def test_seq_col_download_resumes_and_refreshes(tmp_path):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from bedboss.exceptions import BedBossException
+    from bedboss.refgenome_validator.refgenie_chrom_sizes import (
+        SEQ_COL_JOURNAL_SUFFIX,
+        read_seq_col_from_json,
+        refresh_seq_col_json,
+    )
+
+    genomes = {"d1": [["chr1", 100]], "d2": [["chr1", 200], ["chr2", 50]]}
+    unavailable = {"d2"}
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/v4/genomes"):
+                body = {
+                    "items": [
+                        {
+                            "digest": digest,
+                            "aliases": [f"g_{digest}"],
+                            "description": "",
+                        }
+                        for digest in genomes
+                    ]
+                }
+            else:
+                digest = self.path.split("/")[3].split("?")[0]
+                requested.append(digest)
+                if digest in unavailable:
+                    self.send_error(404)
+                    return
+                body = [{"name": n, "length": l} for n, l in genomes[digest]]
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    json_path = str(tmp_path / "genome_seqcol.json")
+
+    try:
+        with pytest.raises(BedBossException):
+            refresh_seq_col_json(json_path, base_url=base_url, workers=2)
+        assert os.path.exists(json_path + SEQ_COL_JOURNAL_SUFFIX)
+
+        # resumed: only the failed genome is fetched again
+        unavailable.clear()
+        requested.clear()
+        refresh_seq_col_json(json_path, base_url=base_url, workers=2)
+        assert requested == ["d2"]
+        assert not os.path.exists(json_path + SEQ_COL_JOURNAL_SUFFIX)
+
+        # incremental refresh: only new genomes are fetched
+        genomes["d3"] = [["1", 300]]
+        requested.clear()
+        result = refresh_seq_col_json(json_path, base_url=base_url, workers=2)
+        assert requested == ["d3"]
+    finally:
+        server.shutdown()
+
+    assert read_seq_col_from_json(json_path) == result
+    assert [(g.genome, g.digest) for g in result.genomes] == [
+        ("g_d1", "d1"),
+        ("g_d2", "d2"),
+        ("g_d3", "d3"),
+    ]
+    assert result.genomes[1].collection[1].length == 50
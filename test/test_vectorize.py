@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from bedboss.qdrant_index.vectorize import _mean_embeddings
+
+
+def test_mean_embeddings():
+    weights = np.random.default_rng(0).random((10, 4), dtype=np.float32)
+    token_ids = [np.array([1, 2, 3]), np.array([5]), np.array([0, 0, 9, 4])]
+
+    vectors = _mean_embeddings(weights, token_ids)
+
+    assert vectors.shape == (3, 4)
+    for ids, vector in zip(token_ids, vectors):
+        np.testing.assert_allclose(vector, weights[ids].mean(axis=0), rtol=1e-6)
+
+
+def test_mean_embeddings_matches_encoder(tmp_path):
+    region2vec = pytest.importorskip("geniml.region2vec.main")
+    from gtars.models import RegionSet
+    from gtars.tokenizers import Tokenizer
+
+    universe = tmp_path / "universe.bed"
+    universe.write_text(
+        "".join(f"chr1\t{i * 1000}\t{i * 1000 + 500}\n" for i in range(20))
+    )
+    bed_files = []
+    for n_regions in (1, 3, 7):
+        bed_file = tmp_path / f"regions_{n_regions}.bed"
+        bed_file.write_text(
+            "".join(
+                f"chr1\t{i * 2000 + 100}\t{i * 2000 + 300}\n" for i in range(n_regions)
+            )
+        )
+        bed_files.append(str(bed_file))
+
+    encoder = region2vec.Region2VecExModel(
+        tokenizer=Tokenizer.from_bed(str(universe)), embedding_dim=8
+    )
+    # the same model attributes vectorize_region uses
+    weights = encoder._model.projection.weight.detach().cpu().numpy()
+    region_sets = [RegionSet(bed_file) for bed_file in bed_files]
+    token_ids = [
+        np.asarray(encoder.tokenizer.encode(region_set), dtype=np.int64)
+        for region_set in region_sets
+    ]
+
+    vectors = _mean_embeddings(weights, token_ids)
+
+    for region_set, vector in zip(region_sets, vectors):
+        np.testing.assert_allclose(
+            vector, np.mean(encoder.encode(region_set), axis=0), rtol=1e-5
+        )